@@ -0,0 +1,70 @@
+# bench_collection.py
+# Stage 10 multi-file collection: serial vs one file per worker process (collection_settings).
+# Writes --pairs Orders/JobTickets exports, parses them both ways and checks the merged
+# frames are identical.
+#
+# Usage: python benchmarks/bench_collection.py [--pairs 4] [--items 20000] [--workers 1,2,4]
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import importlib
+from xml.sax.saxutils import escape
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "pipeline"))
+sys.path.insert(0, BENCH_DIR)
+
+import pandas as pd
+from bench_orders_xml import write_orders_xml
+from bench_job_tickets import ticket_payload
+
+collect = importlib.import_module("10_DataCollection")
+
+def write_pair(folder, n, items):
+    date_range = f"202501{n + 1:02d}_0000_to_202501{n + 1:02d}_2359"
+    orders_path = os.path.join(folder, f"Orders_{date_range}.xml")
+    tickets_path = os.path.join(folder, f"JobTickets_{date_range}.xml")
+    write_orders_xml(orders_path, items, 3)
+    rng = random.Random(n)
+    with open(tickets_path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<Response><Items>\n')
+        for i in range(items // 3): f.write(f"<Item_{i}>{escape(repr(ticket_payload(i, rng)))}</Item_{i}>\n")
+        f.write("</Items></Response>\n")
+    return orders_path, tickets_path
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=4)
+    parser.add_argument("--items", type=int, default=20000, help="Order line items per Orders file")
+    parser.add_argument("--workers", default="1,2,4")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        pairs = [write_pair(folder, n, args.items) for n in range(args.pairs)]
+        orders_paths, tickets_paths = [o for o, _ in pairs], [t for _, t in pairs]
+        rows, baseline = [], None
+        for workers in (int(w) for w in args.workers.split(",")):
+            settings = {'collection_mode': 'serial' if workers == 1 else 'parallel', 'collection_workers': workers}
+            with open(os.devnull, "w") as devnull:
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    start = time.perf_counter()
+                    orders, tickets = collect.collect_source_files(orders_paths, tickets_paths, settings)
+                    elapsed = time.perf_counter() - start
+                finally:
+                    sys.stdout = stdout
+            merged = (pd.concat(orders, ignore_index=True), pd.concat(tickets, ignore_index=True))
+            if baseline is None: baseline = merged
+            same = all(a.equals(b) for a, b in zip(baseline, merged))
+            rows.append((workers, elapsed, same))
+
+    print(f"\n{args.pairs} file pairs, {args.items} order items each, {collect.available_cpus()} CPU(s)\n")
+    print(f"{'workers':>7} {'time s':>8} {'speed-up':>9} {'identical':>10}")
+    for workers, elapsed, same in rows:
+        print(f"{workers:>7} {elapsed:8.2f} {rows[0][1] / elapsed:8.1f}x {str(same):>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# bench_duplicate_check.py
+# Stage 1b's duplicate-ingest safeguard: the old check (first 1000 tickets, = ANY(array))
+# vs find_existing_tickets (every ticket COPYed into a temp table, one indexed join against
+# jobs). Loads a synthetic report into a scratch schema of the configured database, then
+# checks a file whose tickets half overlap what is already there.
+#
+# Usage: python benchmarks/bench_duplicate_check.py [--rows 110000]
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_ingest import create_scratch_schema, ingest, synthetic_report, utils_boxes, utils_ui
+
+SCHEMA = "bench_duplicate_check"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=110000) # ~100k distinct tickets
+    args = parser.parse_args()
+    utils_ui.print_info = lambda *a, **k: None
+
+    df = synthetic_report(args.rows)
+    tickets = df['job_ticket_number'].dropna().astype(str).unique().tolist()
+    loaded = df[df['job_ticket_number'].isin(set(tickets[::2]))] # Every other ticket already in the DB
+    conn = ingest.psycopg2.connect(**ingest.database.connection_params())
+    try:
+        create_scratch_schema(conn, SCHEMA)
+        with conn.cursor() as cur:
+            cur.execute(f"SET search_path TO {SCHEMA}")
+            ingest.ingest_bulk(cur, loaded, utils_boxes.box_columns(loaded), ingest.new_stats())
+        conn.commit()
+
+        with conn.cursor() as cur:
+            cur.execute(f"SET search_path TO {SCHEMA}")
+            start = time.perf_counter()
+            cur.execute("SELECT job_ticket_number FROM jobs WHERE job_ticket_number = ANY(%s)", (tickets[:1000],))
+            old_found = len(cur.fetchall())
+            old_elapsed = time.perf_counter() - start
+        conn.rollback()
+
+        with conn.cursor() as cur:
+            cur.execute(f"SET search_path TO {SCHEMA}")
+            start = time.perf_counter()
+            new_found = len(ingest.find_existing_tickets(cur, tickets))
+            new_elapsed = time.perf_counter() - start
+        conn.rollback()
+    finally:
+        with conn.cursor() as cur: cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.commit(); conn.close()
+
+    expected = loaded.dropna(subset=['order_number'])['job_ticket_number'].nunique() # Rows without an order are never ingested
+    print(f"\n{len(tickets)} tickets in file, {expected} already in the database\n")
+    print(f"{'check':<22} {'time s':>8} {'found':>8}")
+    print(f"{'ANY, first 1000':<22} {old_elapsed:8.3f} {old_found:8}")
+    print(f"{'temp table join':<22} {new_elapsed:8.3f} {new_found:8}  {'exact' if new_found == expected else 'MISMATCH'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# bench_imposition.py
+# Compares Stage 80 sheet assembly paths on a synthetic gang-run bundle:
+#   merge   - standardize_pages + impose_content (merge_transformed_page per placement)
+#   xobject - standardize_cards + impose_cards (one Form XObject per card, cm + Do per slot)
+#   stream  - impose_streaming (lazy sources, sheets + marks written to disk one at a time)
+# Each path runs in its own process so the peak RSS it reports is its own.
+#
+# Usage: python benchmarks/bench_imposition.py [--cards 6250] [--jobs 25] [--shapes 150] [--paths merge,xobject,stream]
+import os
+import io
+import sys
+import time
+import random
+import argparse
+import tempfile
+import importlib
+import multiprocessing
+
+PIPELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pipeline")
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "resources")
+sys.path.insert(0, PIPELINE_DIR)
+
+from pypdf import PdfReader, PdfWriter
+from reportlab.pdfgen import canvas
+
+impose = importlib.import_module("80_GR_Imposition_5x5_BB_BC")
+
+def build_bundle(folder, profile, total_cards, jobs, shapes):
+    """Writes `jobs` press files of front/back artwork whose page counts add up to `total_cards`."""
+    w, h = profile['card_width_pts'], profile['card_height_pts']
+    per_job = [total_cards // jobs + (1 if i < total_cards % jobs else 0) for i in range(jobs)]
+    rng = random.Random(7)
+    for j, pages in enumerate(per_job):
+        packet = io.BytesIO()
+        c = canvas.Canvas(packet, pagesize=(w, h))
+        for side in range(2):
+            for _ in range(shapes):
+                c.setFillColorCMYK(rng.random(), rng.random(), rng.random(), 0)
+                c.circle(rng.uniform(0, w), rng.uniform(0, h), rng.uniform(2, 20), stroke=0, fill=1)
+            c.setFont("Helvetica-Bold", 14); c.drawString(20, h - 40, f"JOB {j:03d} SIDE {side + 1}")
+            c.showPage()
+        c.save(); packet.seek(0)
+        art = PdfReader(packet)
+        writer = PdfWriter()
+        for n in range(pages): writer.add_page(art.pages[n % 2])
+        with open(os.path.join(folder, f"JOB{j:03d}.pdf"), "wb") as f: writer.write(f)
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder))
+
+def run_path(path, files, folder, profile, queue):
+    out_path = os.path.join(folder, f"_{path}.pdf")
+    config = {'marks_template': os.path.join(RESOURCES_DIR, "25up_marks_template_13x19.pdf")}
+    start = time.perf_counter()
+    if path == "stream":
+        impose.impose_streaming(folder, out_path, profile, "BENCH", config)
+    else:
+        if path == "merge":
+            writer = impose.impose_content(impose.standardize_pages(files, profile), profile)
+        else:
+            writer = PdfWriter()
+            impose.impose_cards(impose.standardize_cards(files, profile, writer), profile, writer)
+        writer = impose.apply_finishing(writer, profile, "BENCH", config)
+        with open(out_path, "wb") as f: writer.write(f)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, len(PdfReader(out_path).pages), os.path.getsize(out_path), impose.peak_rss_mb()))
+    os.remove(out_path)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, default=6250, help="Total card pages in the bundle")
+    parser.add_argument("--jobs", type=int, default=25)
+    parser.add_argument("--shapes", type=int, default=150, help="Vector shapes per artwork side (content complexity)")
+    parser.add_argument("--paths", default="merge,xobject,stream", help="Comma-separated assembly paths to run")
+    args = parser.parse_args()
+
+    profile = impose.load_and_plan({'imposition_profile': os.path.join(RESOURCES_DIR, "TXRH BB 25up GangRun.json")})
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        files = build_bundle(folder, profile, args.cards, args.jobs, args.shapes)
+        print(f"\nBundle: {args.cards} cards in {len(files)} files, {args.shapes} shapes per side\n")
+
+        ctx = multiprocessing.get_context("spawn")
+        for path in args.paths.split(","):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=run_path, args=(path, files, folder, profile, queue))
+            proc.start(); results[path] = queue.get(); proc.join()
+
+    print(f"\n{'path':<8} {'sheets':>6} {'time s':>9} {'sheets/s':>9} {'size MB':>9} {'peak RSS MB':>12}")
+    for path, (elapsed, sheets, size, peak) in results.items():
+        print(f"{path:<8} {sheets:>6} {elapsed:9.2f} {sheets / elapsed:9.1f} {size / 1e6:9.2f} {peak or 0:12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# bench_ingest.py
+# Stage 1b database ingest, row-by-row vs bulk (COPY + set-based merges), on a synthetic
+# consolidated report. Each path loads into its own scratch schema of the configured
+# database (DB_* env vars, as the pipeline uses); the schemas are dropped afterwards.
+# Also checks both paths leave identical tables and report the same stats, on a first
+# load, a reload of the same rows (everything unchanged: no writes) and a reload with
+# some rows edited (only those are updated).
+#
+# Usage: python benchmarks/bench_ingest.py [--rows 20000] [--paths row,bulk]
+import os
+import sys
+import time
+import random
+import argparse
+import importlib
+
+PIPELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pipeline")
+sys.path.insert(0, PIPELINE_DIR)
+
+import pandas as pd
+import utils_ui
+import utils_boxes
+
+ingest = importlib.import_module("15_DataIngest")
+from shared_lib import schema # Path set up by the ingest module
+
+# Table contents by natural key (serial ids differ between paths)
+SNAPSHOT_SQL = {
+    'orders': "SELECT order_number, order_date, ship_date, ship_to_company, ship_to_name, address1, address2, address3, address4, city, state, zip, country, row_fingerprint FROM orders ORDER BY order_number",
+    'jobs': "SELECT j.job_ticket_number, o.order_number, j.project_description, j.general_description, j.paper_description, j.press_instructions, j.bindery_instructions, j.shipping_instructions, j.special_instructions, j.row_fingerprint FROM jobs j JOIN orders o ON o.id = j.order_id ORDER BY 1",
+    'items': "SELECT i.order_item_id, j.job_ticket_number, i.product_id, i.product_name, i.product_description, i.sku, i.sku_description, i.quantity_ordered, i.cost_center, i.file_url, i.row_fingerprint FROM items i JOIN jobs j ON j.id = i.job_id ORDER BY 1",
+    'item_boxes': "SELECT order_item_id, box_sequence, barcode_value FROM item_boxes ORDER BY 1, 2",
+}
+
+def synthetic_report(rows, seed=3):
+    """Rows shaped like Stage 1's report: ~3 lines per order, some orders/jobs repeated across lines."""
+    rng = random.Random(seed)
+    records = []
+    for n in range(rows):
+        order = 7000000 + n // 3
+        qty = rng.choice([250, 500, 1000, 2500, 4000])
+        boxes = {250: 1, 500: 1, 1000: 2, 2500: 4, 4000: 8}[qty]
+        record = {
+            'job_ticket_number': f"{500000 + n // 3}-{n % 3 + 1:02d}" if n % 11 else f"{500000 + n // 3}-01",
+            'product_id': str(rng.choice([1, 2, 4, 27, 166])), 'quantity_ordered': qty, 'order_number': str(order),
+            'order_item_id': str(90000000 + n), 'order_date': pd.Timestamp('2025-01-06 09:30') + pd.Timedelta(minutes=n),
+            'ship_date': pd.Timestamp('2025-01-13') + pd.Timedelta(days=n % 2), 'cost_center': f"{n % 600:04d} - Store",
+            'sku': f"SKU-{n % 40}", 'ship_to_name': f"Manager {n % 7}", 'ship_attn': None, 'ship_to_company': f"Store {n % 600}",
+            'address1': f"{n} Main St\twith tab", 'address2': None, 'address3': '', 'address4': None, 'city': 'Louisville',
+            'state': 'KY', 'zip': '40202', 'country': 'US', 'special_instructions': 'Leave at dock\\back door',
+            'product_name': f"Product {n % 5}", 'general_description': 'Qty 500 - print 4/4', 'paper_description': '16pt Silk',
+            'press_instructions': 'Gang run.\nTrim', 'bindery_instructions': None, 'job_ticket_shipping_instructions': 'Ship with order',
+            'sku_description': 'Variant', 'product_description': 'Bounce back card', '1-up_output_file_url': f"https://example.com/{n}.pdf",
+            'job_ticket_project_description': f"Project {n // 3}",
+        }
+        for i in range(utils_boxes.DEFAULT_BOX_COLUMNS):
+            record[utils_boxes.box_column(i)] = f"{90000000 + n}{utils_boxes.box_suffix(i)}" if i < boxes else None
+        records.append(record)
+    df = pd.DataFrame(records)
+    df.loc[df.sample(frac=0.01, random_state=seed).index, 'order_number'] = None # Rows the ingest skips
+    return df
+
+def edited_report(df, seed=5):
+    """`df` with ~2% of rows edited (an order, job or item field each)."""
+    rng = random.Random(seed)
+    df = df.copy()
+    for n in rng.sample(range(len(df)), len(df) // 50):
+        column = rng.choice(['ship_to_company', 'special_instructions', 'quantity_ordered'])
+        df.loc[n, column] = 250 if column == 'quantity_ordered' else f"Edited {n}"
+    return df
+
+def create_scratch_schema(conn, name):
+    """An empty schema `name` with the production tables (shared_lib.schema migrations)."""
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {name} CASCADE; CREATE SCHEMA {name}; SET search_path TO {name};")
+    schema.apply_migrations(conn) # Unqualified DDL: lands in the scratch schema
+
+def run_path(conn, scratch, path, df):
+    cur = conn.cursor()
+    cur.execute(f"SET search_path TO {scratch}")
+    stats = ingest.new_stats()
+    box_cols = utils_boxes.box_columns(df)
+    start = time.perf_counter()
+    (ingest.ingest_bulk if path == 'bulk' else ingest.ingest_rows)(cur, df, box_cols, stats)
+    conn.commit()
+    elapsed = time.perf_counter() - start
+    cur.execute(f"SET search_path TO {scratch}")
+    snapshot = {}
+    for table, sql in SNAPSHOT_SQL.items():
+        cur.execute(sql); snapshot[table] = cur.fetchall()
+    cur.close()
+    return elapsed, stats, snapshot
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--paths", default="row,bulk")
+    args = parser.parse_args()
+    utils_ui.print_info = lambda *a, **k: None
+
+    df = synthetic_report(args.rows)
+    loads = (("first", df), ("reload", df), ("edited", edited_report(df))) # Reloads: same rows, then some changed
+    conn = ingest.psycopg2.connect(**ingest.database.connection_params())
+    results = {}
+    try:
+        for path in args.paths.split(","):
+            scratch = f"bench_ingest_{path}"
+            create_scratch_schema(conn, scratch)
+            results[path] = [run_path(conn, scratch, path, load) for _, load in loads]
+    finally:
+        with conn.cursor() as cur:
+            for path in args.paths.split(","): cur.execute(f"DROP SCHEMA IF EXISTS bench_ingest_{path} CASCADE")
+        conn.commit(); conn.close()
+
+    print(f"\n{args.rows} report rows ({df['order_number'].notna().sum()} ingestable)\n")
+    print(f"{'path':<6} {'load':<7} {'time s':>8} {'rows/s':>9}  new/updated/unchanged")
+    for path, runs in results.items():
+        for (label, _), (elapsed, stats, _) in zip(loads, runs):
+            counts = '  '.join(f"{t} {stats[f'{t}_new']}/{stats[f'{t}_updated']}/{stats[f'{t}_unchanged']}" for t in ingest.ENTITY_TABLES)
+            print(f"{path:<6} {label:<7} {elapsed:8.2f} {args.rows / elapsed:9.0f}  {counts}")
+    if len(results) > 1:
+        base_path, base = next(iter(results.items()))
+        for path, runs in list(results.items())[1:]:
+            same = all(a[1] == b[1] and a[2] == b[2] for a, b in zip(base, runs))
+            print(f"\n{path} vs {base_path}: tables and stats {'identical' if same else 'DIFFER'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# bench_job_lookup.py
+# Shipping station lookup latency: order_service.get_job_details (one CTE query) vs the
+# previous four-query sequence (job, then order on a miss, then its jobs, then items/boxes)
+# followed by the weight rules reload it did on every scan.
+# Seeds a scratch schema of the configured database with a synthetic Stage 1 report, then
+# times lookups by job ticket, by order number and of unknown IDs, each through the pool.
+# Also checks both return the same response for every lookup. The schema is dropped afterwards.
+#
+# Usage: python benchmarks/bench_job_lookup.py [--rows 50000] [--lookups 2000]
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+SCHEMA = "bench_job_lookup"
+os.environ['PGOPTIONS'] = f"-c search_path={SCHEMA}" # Every pooled connection works in the scratch schema
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_ingest import create_scratch_schema, ingest, synthetic_report, utils_boxes, utils_ui
+from shared_lib.database import db_connection, get_real_dict_cursor
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shipping_web_app"))
+from app.services import order_service
+from app.services.reference_data import load_reference_data, get_mixed_box_info
+
+def legacy_job_details(lookup_id):
+    """The four-query lookup get_job_details used before the CTE, reloading the weight rules per call."""
+    with db_connection() as conn:
+        cur = get_real_dict_cursor(conn)
+        cur.execute("""
+            SELECT j.id as job_id, j.order_id, j.job_ticket_number, o.order_number,
+                   o.ship_to_company, o.ship_to_name, o.address1, o.city, o.state, o.zip, o.country
+            FROM jobs j JOIN orders o ON j.order_id = o.id
+            WHERE j.job_ticket_number = %s
+        """, (lookup_id,))
+        header = cur.fetchone()
+        if header:
+            target_job_ids, ref = [header['job_id']], header['job_ticket_number']
+        else:
+            cur.execute("""
+                SELECT id, order_number, ship_to_company, ship_to_name, address1, city, state, zip, country
+                FROM orders WHERE order_number = %s
+            """, (lookup_id,))
+            header = cur.fetchone()
+            if not header: return None, f"ID {lookup_id} not found."
+            cur.execute("SELECT id FROM jobs WHERE order_id = %s", (header['id'],))
+            target_job_ids, ref = [r['id'] for r in cur.fetchall()], header['order_number']
+        response = {
+            "order_number": ref, "related_order_number": header['order_number'],
+            "ship_to": {"name": header['ship_to_name'], "company": header['ship_to_company'], "address1": header['address1'],
+                        "city": header['city'], "state": header['state'], "zip": header['zip'], "country": header['country'],
+                        "account_number": "Y76383"},
+            "reference2": ref,
+        }
+        if target_job_ids:
+            cur.execute("""
+                SELECT b.barcode_value, b.status, i.sku, i.sku_description, i.order_item_id,
+                       i.quantity_ordered, i.cost_center, i.product_id, j.job_ticket_number
+                FROM item_boxes b
+                JOIN items i ON b.order_item_id = i.order_item_id
+                JOIN jobs j ON i.job_id = j.id
+                WHERE i.job_id = ANY(%s)
+                ORDER BY j.job_ticket_number, i.order_item_id, b.box_sequence
+            """, (target_job_ids,))
+            rows = cur.fetchall()
+            reference = load_reference_data(conn)
+            seen, weights = {}, {}
+            response['expected_barcodes'] = []
+            for row in rows:
+                response['expected_barcodes'].append(row['barcode_value'])
+                oid = row['order_item_id']
+                if oid not in seen:
+                    weights[oid], instructions = get_mixed_box_info(reference['product_map'], reference['rules'],
+                        row['quantity_ordered'], row['cost_center'], row['sku'], row['product_id'])
+                    seen[oid] = {"job_ticket": row['job_ticket_number'], "sku": row['sku'], "sku_description": row['sku_description'],
+                                 "quantity_ordered": row['quantity_ordered'], "cost_center": row['cost_center'],
+                                 "barcodes": [], "packaging_instructions": instructions}
+                n = len(seen[oid]['barcodes'])
+                seen[oid]['barcodes'].append({"value": row['barcode_value'], "status": row['status'],
+                                              "estimated_weight": weights[oid][n] if n < len(weights[oid]) else 1.0})
+            response['line_items'] = list(seen.values())
+        return response, None
+
+def seed_reference_data(cur):
+    """Categories for the synthetic product IDs (27 and 166 stay unmapped) and a rule per quantity."""
+    cur.execute("INSERT INTO product_categories VALUES ('1', 'Cards'), ('2', 'Cards'), ('4', 'Flyers');")
+    for category in ('Cards', 'Flyers'):
+        for qty, white, blue in ((250, 1, 0), (500, 1, 0), (1000, 2, 0), (2500, 3, 1), (4000, 6, 2)):
+            cur.execute("INSERT INTO product_shipping_rules VALUES (%s, %s, 2.5, 2.5, 4.0, %s, %s);", (category, qty, white, blue))
+    cur.execute("INSERT INTO shipping_cartons VALUES ('S1', 0.5, 12, 9, 6), ('M1', 0.8, 16, 12, 8);")
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+    utils_ui.print_info = lambda *a, **k: None
+
+    df = synthetic_report(args.rows)
+    with db_connection() as conn:
+        create_scratch_schema(conn, SCHEMA)
+        with conn.cursor() as cur:
+            ingest.ingest_bulk(cur, df, utils_boxes.box_columns(df), ingest.new_stats())
+            seed_reference_data(cur)
+        conn.commit()
+        with conn.cursor() as cur: cur.execute("ANALYZE;") # Planner stats as autovacuum would leave them
+        conn.commit()
+
+    try:
+        rng = random.Random(7)
+        tickets = df['job_ticket_number'].dropna().unique().tolist()
+        orders = df['order_number'].dropna().unique().tolist()
+        lookups = [rng.choice(tickets) if n % 5 < 3 else rng.choice(orders) if n % 5 < 4 else f"MISSING-{n}"
+                   for n in range(args.lookups)] # 60% tickets, 20% orders, 20% unknown
+
+        timings, responses = {}, {}
+        for name, lookup in (("4 queries", legacy_job_details), ("1 query (CTE)", order_service.get_job_details)):
+            for lookup_id in lookups[:50]: lookup(lookup_id) # Warm the pool and caches
+            times, results = [], []
+            for lookup_id in lookups:
+                start = time.perf_counter()
+                results.append(lookup(lookup_id))
+                times.append((time.perf_counter() - start) * 1000)
+            timings[name], responses[name] = times, results
+    finally:
+        with db_connection() as conn:
+            with conn.cursor() as cur: cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            conn.commit()
+
+    print(f"\n{args.rows} report rows seeded, {len(lookups)} lookups (60% ticket, 20% order, 20% unknown)\n")
+    print(f"{'lookup':<15} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for name, times in timings.items():
+        print(f"{name:<15} {percentile(times, 50):8.3f} {percentile(times, 99):8.3f} {statistics.mean(times):8.3f}")
+    old, new = responses.values()
+    print(f"\nResponses {'identical' if old == new else 'DIFFER'} for all {len(lookups)} lookups")
+
+if __name__ == "__main__":
+    main()
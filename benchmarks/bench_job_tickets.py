@@ -0,0 +1,93 @@
+# bench_job_tickets.py
+# Stage 10 JobTickets payload decoding on a synthetic export shaped like Marcom's
+# (each <Items> child holds the repr of a ticket dict):
+#   eval   - the previous path: eval() of every payload
+#   serial - utils_payload.extract_fields, only the used fields decoded
+#   pooled - parse_job_tickets_xml end to end (process pool above the item threshold)
+# Also checks that the decoded fields match what eval produced.
+#
+# Usage: python benchmarks/bench_job_tickets.py [--items 20000]
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+import tempfile
+import importlib
+from xml.sax.saxutils import escape
+
+PIPELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pipeline")
+sys.path.insert(0, PIPELINE_DIR)
+
+import utils_ui
+import utils_payload
+
+collect = importlib.import_module("10_DataCollection")
+
+def ticket_payload(n, rng):
+    """A ticket dict about the size and shape of a real one (~4 KB of repr)."""
+    created = datetime.datetime(2025, 1, 6, 9, 30, tzinfo=datetime.timezone.utc) + datetime.timedelta(minutes=n)
+    return {
+        'ID': 8000000 + n,
+        'JobTicketNumber': f"{500000 + n // 3}-{n % 3 + 1:02d}",
+        'ProjectDescription': f"Bounce Back 4x6 – Store {n % 600} \"Grand Opening\"",
+        'CreateDate': created, 'DueDate': created.date() + datetime.timedelta(days=5), 'LeadTime': datetime.timedelta(days=5),
+        'Status': {'ID': 3, 'Name': 'Submitted', 'IsFinal': False},
+        'Customer': {'ID': 412, 'Name': "Texas Roadhouse", 'Contacts': [{'Name': f"Contact {i}", 'Phone': None, 'Email': f"c{i}@example.com"} for i in range(4)]},
+        'JobTicketInstructions': {
+            'GeneralDescription': f"Qty {rng.choice([250, 500, 1000])} - print 4/4 on 12pt",
+            'PaperDescription': rng.choice(["12pt Gloss Cover", "16pt Silk", "100# Gloss Text"]),
+            'PressInstructions': "Gang run.\nTrim to 4x6, 'no bleed' on back",
+            'BinderyInstructions': None if n % 5 else "Shrink wrap in 50s",
+            'ShippingInstructions': "Ship with order",
+            'Notes': [f"Revision {i}: approved {created.isoformat()}" for i in range(3)],
+        },
+        'Attributes': [{'Name': f"Attr{i}", 'Value': rng.random(), 'Visible': bool(i % 2), 'Modified': created} for i in range(12)],
+        'History': [{'Date': created + datetime.timedelta(hours=i), 'User': f"user{i}", 'Action': 'Updated (auto)'} for i in range(8)],
+        'Weight': 12.5, 'Pages': -2, 'Thumbnail': b'\x89PNG\r\n', 'Tags': ('gang', 'rush'), 'Proof': None,
+    }
+
+def write_tickets_xml(path, items):
+    rng = random.Random(5)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<Response><Items>\n')
+        for n in range(items): f.write(f"<Item_{n}>{escape(repr(ticket_payload(n, rng)))}</Item_{n}>\n")
+        f.write("</Items></Response>\n")
+
+def used_fields(data):
+    instructions = data.get('JobTicketInstructions') or {}
+    return {'JobTicketNumber': data.get('JobTicketNumber'), 'ProjectDescription': data.get('ProjectDescription'),
+            'JobTicketInstructions': {k: instructions.get(k) for k in collect.JOB_TICKET_FIELDS['JobTicketInstructions']}}
+
+def eval_fields(content):
+    """The previous implementation's decode step."""
+    return used_fields(eval(content, {"__builtins__": {}}, {'datetime': datetime, 'date': datetime.date, 'timedelta': datetime.timedelta, 'True': True, 'False': False, 'None': None}))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=20000)
+    args = parser.parse_args()
+    utils_ui.print_info = lambda *a, **k: None
+
+    with tempfile.TemporaryDirectory() as folder:
+        xml_path = os.path.join(folder, "JobTickets_bench.xml")
+        write_tickets_xml(xml_path, args.items)
+        size_mb = os.path.getsize(xml_path) / 1e6
+        import xml.etree.ElementTree as ET
+        contents = [item.text for item in ET.parse(xml_path).getroot().find('Items')]
+
+        start = time.perf_counter(); expected = [eval_fields(c) for c in contents]; t_eval = time.perf_counter() - start
+        start = time.perf_counter(); got = utils_payload.extract_batch(contents, collect.JOB_TICKET_FIELDS); t_serial = time.perf_counter() - start
+        start = time.perf_counter(); df = collect.parse_job_tickets_xml(xml_path); t_pooled = time.perf_counter() - start
+
+    mismatches = sum(1 for e, g in zip(expected, got) if isinstance(g, Exception) or e != used_fields(g))
+    workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    print(f"\nExport: {args.items} items, {size_mb:.1f} MB, {workers} CPU(s); field mismatches vs eval: {mismatches}; rows: {len(df)}\n")
+    print(f"{'path':<8} {'time s':>8} {'items/s':>9} {'speed-up':>9}")
+    for name, t in [("eval", t_eval), ("serial", t_serial), ("pooled", t_pooled)]:
+        print(f"{name:<8} {t:8.2f} {args.items / t:9.0f} {t_eval / t:8.1f}x")
+    print("(pooled includes reading the XML)")
+
+if __name__ == "__main__":
+    main()
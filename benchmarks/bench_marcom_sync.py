@@ -0,0 +1,153 @@
+# bench_marcom_sync.py
+# Marcom packing-slip sync: the background worker (batched claims, concurrent calls over one
+# pooled session, retries) vs the legacy close_shipment loop in z_reference/old_webapp/app.py
+# (one unpooled requests.post per line item, in sequence, no retries). Both talk to a local
+# stub of the PackingSlip SOAP service with a fixed latency, a share of transient 503s and a
+# SOAP fault for some line items. Shipments are seeded as PENDING in a scratch schema of the
+# configured database; the worker drains them. Also checks every shipment ends SUCCESS, or
+# FAILED exactly when it has a faulting line item, and no line item got two packing slips.
+#
+# Usage: python benchmarks/bench_marcom_sync.py [--shipments 100] [--items 3] [--latency 0.05]
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SCHEMA = "bench_marcom_sync"
+os.environ['PGOPTIONS'] = f"-c search_path={SCHEMA}" # Every pooled connection works in the scratch schema
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import requests
+from shared_lib import schema
+from shared_lib.database import db_connection
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shipping_web_app"))
+from app.services import marcom_sync_service as marcom
+
+SUCCESS_BODY = b"""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>
+<CreatePackingSlipByLineItemResponse><Result><Status>ProcessComplete</Status></Result></CreatePackingSlipByLineItemResponse>
+</soap:Body></soap:Envelope>"""
+FAULT_BODY = b"""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>
+<soap:Fault><faultcode>soap:Client</faultcode><faultstring>Line item is already shipped</faultstring></soap:Fault>
+</soap:Body></soap:Envelope>"""
+
+class StubMarcom(BaseHTTPRequestHandler):
+    """PackingSlip.asmx stand-in. Line items ending in 13 fault; others 503 at transient_rate."""
+    latency, transient_rate = 0.05, 0.05
+    rng = random.Random(11)
+    created = Counter() # line item -> packing slips created
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        line_item = re.search(rb'<ID type="Printable">([^<]+)</ID>', body).group(1).decode()
+        time.sleep(self.latency)
+        with self.lock: transient = self.rng.random() < self.transient_rate
+        if transient:
+            status, reply = 503, b"Service Unavailable"
+        elif line_item.endswith('13'):
+            status, reply = 500, FAULT_BODY
+        else:
+            status, reply = 200, SUCCESS_BODY
+            with self.lock: self.created[line_item] += 1
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args):
+        pass
+
+def seed(shipments, items_per):
+    """PENDING shipments with tracking numbers and their line items. Returns {order_item_id: shipment_id}."""
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA};")
+        conn.commit()
+        schema.apply_migrations(conn)
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO shipments (shipment_uid, tracking_number, marcom_sync_status)
+                SELECT 'SHIP_BENCH_' || n, '1ZBENCH' || n, 'PENDING' FROM generate_series(1, %s) n
+            """, (shipments,))
+            cur.execute("""
+                INSERT INTO shipment_items (shipment_id, order_item_id)
+                SELECT s.id, (90000000 + (s.id - 1) * %s + k)::text FROM shipments s, generate_series(1, %s) k
+                RETURNING order_item_id, shipment_id
+            """, (items_per, items_per))
+            lines = dict(cur.fetchall())
+        conn.commit()
+    return lines
+
+def legacy_sync(url, lines):
+    """close_shipment's loop: one requests.post per line item, no session, no retries."""
+    statuses = Counter()
+    for line_item in lines:
+        payload = marcom.generate_marcom_xml_payload(line_item, "1ZLEGACY", "token", marcom.MARCOM_CARRIER)
+        headers = {'Content-Type': 'text/xml; charset=utf-8', 'SOAPAction': marcom.MARCOM_SOAP_ACTION}
+        try:
+            res = requests.post(url, data=payload.encode('utf-8'), headers=headers)
+            statuses["SUCCESS" if "ProcessComplete" in res.text else "FAILED"] += 1
+        except Exception:
+            statuses["ERROR"] += 1
+    return statuses
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shipments", type=int, default=100)
+    parser.add_argument("--items", type=int, default=3, help="Line items per shipment")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub response time, seconds")
+    parser.add_argument("--transient-rate", type=float, default=0.05, help="Share of calls answered 503")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    StubMarcom.latency, StubMarcom.transient_rate = args.latency, args.transient_rate
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubMarcom)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/trans/1.0/PackingSlip.asmx"
+
+    try:
+        lines = seed(args.shipments, args.items)
+        start = time.perf_counter()
+        legacy = legacy_sync(url, list(lines))
+        legacy_secs = time.perf_counter() - start
+        StubMarcom.created.clear()
+
+        client = marcom.MarcomClient(url=url, token="token", concurrency=args.concurrency, simulation=False)
+        start = time.perf_counter()
+        batches = 0
+        while marcom.sync_batch(client): batches += 1
+        worker_secs = time.perf_counter() - start
+        client.close()
+
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, marcom_sync_status FROM shipments")
+                final = dict(cur.fetchall())
+            conn.rollback()
+    finally:
+        server.shutdown()
+        with db_connection() as conn:
+            with conn.cursor() as cur: cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            conn.commit()
+
+    faulting = {lines[li] for li in lines if li.endswith('13')}
+    expected = {sid: ('FAILED' if sid in faulting else 'SUCCESS') for sid in final}
+    duplicates = sum(1 for n in StubMarcom.created.values() if n > 1)
+    n = len(lines)
+    print(f"\n{args.shipments} shipments x {args.items} line items, stub latency {args.latency * 1000:.0f} ms, "
+          f"{args.transient_rate:.0%} transient 503s\n")
+    print(f"legacy (sequential)   {legacy_secs:7.2f} s  {n / legacy_secs:7.1f} items/s  {dict(legacy)}")
+    print(f"worker (x{args.concurrency:<2})         {worker_secs:7.2f} s  {n / worker_secs:7.1f} items/s  {batches} batches")
+    print(f"\nworker accounting: {dict(sorted(client.stats.items()))}")
+    print(f"shipments: {dict(Counter(final.values()))}, as expected: {final == expected}, duplicate packing slips: {duplicates}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# bench_orders_xml.py
+# Throughput and memory of Stage 10's Orders XML parser on synthetic exports:
+#   stream - iter_orders_xml, chunks consumed and dropped (parser overhead only)
+#   frame  - parse_orders_xml, the full DataFrame Stage 10 keeps
+# Each run happens in its own process so the peak RSS it reports is its own; a flat
+# 'stream' peak across sizes shows parsing memory does not grow with the file.
+#
+# Usage: python benchmarks/bench_orders_xml.py [--items 20000,100000,300000] [--per-order 3]
+import os
+import sys
+import time
+import random
+import resource
+import argparse
+import tempfile
+import importlib
+import multiprocessing
+from xml.sax.saxutils import escape
+
+PIPELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pipeline")
+sys.path.insert(0, PIPELINE_DIR)
+
+def write_orders_xml(path, items, per_order):
+    """Writes an Orders export shaped like Marcom's, with `items` line items in orders of ~`per_order`."""
+    rng = random.Random(11)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<Response><Orders><Order>\n')
+        written = 0; order = 0
+        while written < items:
+            order += 1
+            lines = min(rng.randint(1, per_order * 2 - 1), items - written)
+            f.write(f"<Item><OrderNumber>{7000000 + order}</OrderNumber><CreateDate>2025-01-{6 + order % 3:02d}T{order % 24:02d}:15:00</CreateDate><OrderDetails><OrderDetail>\n")
+            for n in range(lines):
+                written += 1
+                pid = rng.choice([1, 2, 4, 27, 166, 200, 5, 156])
+                f.write(
+                    f"<Item><ID><_value_1>{90000000 + written}</_value_1></ID>"
+                    f"<SupplierWorkOrder><Name>{500000 + order}-{n + 1:02d}</Name></SupplierWorkOrder>"
+                    f"<Department><Number>{rng.randint(1, 600):04d} - Store</Number></Department>"
+                    f"<ProductID><_value_1>{pid}</_value_1></ProductID><ProductName>Product {pid}</ProductName>"
+                    f"<ProductDescription>{escape('Bounce back card & envelope')}</ProductDescription>"
+                    f"<SKU><Name>SKU-{pid}-{rng.randint(1, 40)}</Name></SKU><SKUDescription>Variant</SKUDescription>"
+                    f"<Quantity>{rng.choice([250, 500, 1000])}</Quantity>"
+                    f"<Shipping><Date>2025-01-10T00:00:00</Date><Instructions>Leave at dock</Instructions>"
+                    f"<Address><Attn>Manager</Attn><CompanyName>Store {written % 600}</CompanyName><Address1>{written} Main St</Address1>"
+                    f"<Address2/><Address3/><City>Louisville</City><State>KY</State><Zip>40202</Zip><Country>US</Country></Address></Shipping>"
+                    f"<OutputFileURL><Item><URL>https://example.com/{written}_defaultImposition_.pdf</URL></Item>"
+                    f"<Item><URL>https://example.com/{written}.pdf</URL></Item></OutputFileURL></Item>\n"
+                )
+            f.write("</OrderDetail></OrderDetails></Item>\n")
+        f.write("</Order></Orders></Response>\n")
+
+def run_path(path, xml_path, queue):
+    collect = importlib.import_module("10_DataCollection")
+    import utils_ui
+    utils_ui.print_info = lambda *a, **k: None # Keep the timing about parsing
+    start = time.perf_counter()
+    if path == "stream":
+        records = sum(len(chunk) for chunk in collect.iter_orders_xml(xml_path))
+    else:
+        records = len(collect.parse_orders_xml(xml_path))
+    elapsed = time.perf_counter() - start
+    queue.put((records, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", default="20000,100000,300000", help="Comma-separated line-item counts")
+    parser.add_argument("--per-order", type=int, default=3, help="Average line items per order")
+    parser.add_argument("--paths", default="stream,frame")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for items in (int(n) for n in args.items.split(",")):
+            xml_path = os.path.join(folder, f"Orders_{items}.xml")
+            write_orders_xml(xml_path, items, args.per_order)
+            size_mb = os.path.getsize(xml_path) / 1e6
+            for path in args.paths.split(","):
+                queue = ctx.Queue()
+                proc = ctx.Process(target=run_path, args=(path, xml_path, queue))
+                proc.start(); records, elapsed, peak = queue.get(); proc.join()
+                rows.append((items, size_mb, path, records, elapsed, peak))
+            os.remove(xml_path)
+
+    print(f"\n{'items':>8} {'XML MB':>8} {'path':<7} {'records':>8} {'time s':>8} {'records/s':>10} {'peak RSS MB':>12}")
+    for items, size_mb, path, records, elapsed, peak in rows:
+        print(f"{items:>8} {size_mb:8.1f} {path:<7} {records:>8} {elapsed:8.2f} {records / elapsed:10.0f} {peak:12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+# bench_ups_watcher.py
+# Label-to-tracking latency: the UPS .out watcher (file events, and its polling fallback) vs
+# the legacy loop in z_reference/process_ups_output.py (glob every 10 s, one connection per
+# pass, one commit per file). A temporary folder stands in for WorldShip's output folder:
+# bursts of .out files are written into it (each written in two parts, as a slow writer would)
+# for shipments seeded in a scratch schema of the configured database. Latency runs from a
+# file's final write to its tracking numbers being committed. Also checks every shipment got
+# its tracking numbers and every file was archived. The schema is dropped afterwards.
+# Before timing, it checks the watcher's behaviour against a temporary folder (there is no
+# test suite): a file written in two parts is stored once, .Out in any case is picked up, a
+# shipment not in the DB stays put and is retried at the rescan, a DB failure leaves files in
+# place, a locked file does not hold up the rest of its burst, a burst is one transaction,
+# and the .out and its .xml are both archived.
+# Exits 1 if a check fails, or if any mode left a shipment untracked or a file unarchived.
+#
+# Usage: python benchmarks/bench_ups_watcher.py [--bursts 5] [--burst-size 40] [--modes events,poll,legacy] [--checks-only]
+import os
+import sys
+import io
+import json
+import glob
+import time
+import shutil
+import argparse
+import queue
+import contextlib
+import tempfile
+import threading
+
+SCHEMA = "bench_ups_watcher"
+os.environ['PGOPTIONS'] = f"-c search_path={SCHEMA}" # Every pooled connection works in the scratch schema
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared_lib import schema
+from shared_lib.database import db_connection, DatabaseUnavailable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shipping_web_app"))
+from app.services import ups_output_service as ups
+
+OUT_TEMPLATE = """<?xml version="1.0" encoding="windows-1252"?>
+<OpenShipments xmlns="x-schema:OpenShipments.xdr">
+    <OpenShipment ProcessStatus="Processed">
+        <ProcessMessage>
+            <TrackingNumbers>
+                <TrackingNumber>{tracking}</TrackingNumber>
+            </TrackingNumbers>
+        </ProcessMessage>
+    </OpenShipment>
+</OpenShipments>
+"""
+
+def write_out(folder, name, tracking, parts=1):
+    text = OUT_TEMPLATE.format(tracking=tracking)
+    path = os.path.join(folder, name)
+    with open(path, "w") as f:
+        f.write(text if parts == 1 else text[:60])
+    return path, text
+
+def tracking_of(uid):
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT tracking_number FROM shipments WHERE shipment_uid = %s", (uid,))
+            row = cur.fetchone()
+        conn.rollback()
+    return row[0] if row else None
+
+def add_shipments(*uids):
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.executemany("INSERT INTO shipments (shipment_uid, marcom_sync_status) VALUES (%s, 'PROCESSING')", [(u,) for u in uids])
+        conn.commit()
+
+@contextlib.contextmanager
+def database_down():
+    """The processor's db_connection() fails, as when Postgres is unreachable."""
+    @contextlib.contextmanager
+    def unavailable():
+        raise DatabaseUnavailable("database down (check)")
+        yield
+    saved, ups.db_connection = ups.db_connection, unavailable
+    try: yield
+    finally: ups.db_connection = saved
+
+def run_checks(report):
+    """The watcher's file handling against a temporary folder. Prints to `report`, returns the failed checks."""
+    failures = []
+    def check(name, ok):
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}", file=report)
+        if not ok: failures.append(name)
+
+    folder = tempfile.mkdtemp(prefix="ups_checks_")
+    processed = os.path.join(folder, 'processed')
+    try:
+        proc = ups.UpsOutputProcessor(folder)
+        archived = lambda name: os.path.exists(os.path.join(processed, name))
+        in_place = lambda name: os.path.exists(os.path.join(folder, name))
+
+        add_shipments("SHIP_CHK_PARTS")
+        path, text = write_out(folder, "SHIP_CHK_PARTS.out", "1ZCHKPARTS", parts=2)
+        first = proc.process([path])
+        with open(path, "a") as f: f.write(text[60:])
+        second = proc.process([path, path]) # Two events for the finished file
+        check("file written in two parts is stored once, when complete",
+              first == [] and second == ["SHIP_CHK_PARTS"] and proc.stats['updated'] == 1
+              and tracking_of("SHIP_CHK_PARTS") == "1ZCHKPARTS" and archived("SHIP_CHK_PARTS.out"))
+
+        add_shipments("SHIP_CHK_CASE")
+        write_out(folder, "SHIP_CHK_CASE.Out", "1ZCHKCASE")
+        queued = queue.Queue()
+        ups._QueueHandler(folder, queued).dispatch(type("Event", (), {"is_directory": False, "src_path": os.path.join(folder, "SHIP_CHK_CASE.Out")})())
+        check(".Out in any case is scanned, queued and stored",
+              proc.scan() == [os.path.join(folder, "SHIP_CHK_CASE.Out")] and queued.qsize() == 1
+              and proc.process(proc.scan()) == ["SHIP_CHK_CASE"] and archived("SHIP_CHK_CASE.Out"))
+
+        path, _ = write_out(folder, "SHIP_CHK_LATE.out", "1ZCHKLATE")
+        missing = proc.process([path])
+        add_shipments("SHIP_CHK_LATE")
+        before_rescan = proc.process([path]) # Unchanged file: skipped without a query
+        proc.forget_skipped()
+        after_rescan = proc.process(proc.scan())
+        check("shipment not in DB: file stays, retried at the rescan",
+              missing == [] and before_rescan == [] and after_rescan == ["SHIP_CHK_LATE"] and archived("SHIP_CHK_LATE.out"))
+
+        add_shipments("SHIP_CHK_DOWN")
+        path, _ = write_out(folder, "SHIP_CHK_DOWN.out", "1ZCHKDOWN")
+        watcher = ups.UpsOutputWatcher(proc, use_events=False)
+        with database_down():
+            watcher._run_batch([path])
+        left = in_place("SHIP_CHK_DOWN.out") and tracking_of("SHIP_CHK_DOWN") is None
+        check("DB failure leaves the file in place for retry", left and proc.process([path]) == ["SHIP_CHK_DOWN"])
+
+        add_shipments("SHIP_CHK_LOCK_A", "SHIP_CHK_LOCK_B")
+        paths = [write_out(folder, f"SHIP_CHK_LOCK_{k}.out", f"1ZCHKLOCK{k}")[0] for k in "AB"]
+        parse = ups.parse_out_file
+        def locked(path): # WorldShip still holds A
+            if "LOCK_A" in path: raise PermissionError(13, "The process cannot access the file", path)
+            return parse(path)
+        ups.parse_out_file = locked
+        try: stored = proc.process(paths)
+        finally: ups.parse_out_file = parse
+        check("a locked file waits alone; the rest of the burst is stored, the file on its next event",
+              stored == ["SHIP_CHK_LOCK_B"] and in_place("SHIP_CHK_LOCK_A.out") and proc.process(paths[:1]) == ["SHIP_CHK_LOCK_A"])
+
+        uids = [f"SHIP_CHK_BURST_{k}" for k in range(10)]
+        add_shipments(*uids)
+        for uid in uids:
+            write_out(folder, f"{uid}.out", f"1ZBURST{uid[-1]}")
+            with open(os.path.join(folder, f"{uid}.xml"), "w") as f: f.write("<OpenShipments/>")
+        batches = proc.stats['batches']
+        done = proc.process(proc.scan())
+        check("a burst is stored in one transaction", done == sorted(uids) and proc.stats['batches'] == batches + 1)
+        check(".out and its .xml are both archived",
+              all(archived(f"{u}.out") and archived(f"{u}.xml") and not in_place(f"{u}.xml") for u in uids))
+    finally:
+        shutil.rmtree(folder)
+    return failures
+
+def legacy_pass(folder, committed):
+    """z_reference/process_ups_output.py's process_files(), recording each commit time."""
+    out_files = glob.glob(os.path.join(folder, "*.out"))
+    if not out_files: return
+    with db_connection() as conn:
+        for filepath in out_files:
+            shipment_uid = os.path.splitext(os.path.basename(filepath))[0]
+            tracking_numbers = ups.parse_out_file(filepath)
+            cur = conn.cursor()
+            cur.execute("SELECT id FROM shipments WHERE shipment_uid = %s", (shipment_uid,))
+            if cur.fetchone():
+                cur.execute("""
+                    UPDATE shipments SET tracking_number = %s, tracking_numbers = %s, marcom_sync_status = 'PENDING',
+                        marcom_response_message = 'Ready for sync', updated_at = NOW()
+                    WHERE shipment_uid = %s
+                """, (tracking_numbers[0], json.dumps(tracking_numbers), shipment_uid))
+                conn.commit()
+                committed[shipment_uid] = time.monotonic()
+                shutil.move(filepath, os.path.join(folder, 'processed', os.path.basename(filepath)))
+            cur.close()
+
+def run_mode(mode, folder, uids, bursts, burst_size, gap):
+    committed = {}
+    stop = threading.Event()
+    if mode == 'legacy':
+        os.makedirs(os.path.join(folder, 'processed'), exist_ok=True)
+        def loop():
+            while not stop.is_set():
+                legacy_pass(folder, committed)
+                stop.wait(10)
+        thread = threading.Thread(target=loop)
+    else:
+        watcher = ups.UpsOutputWatcher(ups.UpsOutputProcessor(folder), use_events=(mode == 'events'),
+                                       on_batch=lambda done: committed.update((uid, time.monotonic()) for uid in done))
+        stop = watcher._stop
+        thread = threading.Thread(target=watcher.run)
+    thread.start()
+    time.sleep(1) # Watcher up, first rescan done
+
+    written = {}
+    for b in range(bursts):
+        for uid in uids[b * burst_size:(b + 1) * burst_size]:
+            text = OUT_TEMPLATE.format(tracking=f"1Z{uid[-8:]}")
+            with open(os.path.join(folder, f"{uid}.out"), "w") as f: # Two writes, like a slow writer
+                f.write(text[:60]); f.flush(); time.sleep(0.001); f.write(text[60:])
+            written[uid] = time.monotonic()
+        time.sleep(gap)
+    deadline = time.monotonic() + 15
+    while len(committed) < len(written) and time.monotonic() < deadline: time.sleep(0.05)
+    stop.set()
+    thread.join()
+    return [(committed[uid] - written[uid]) * 1000 for uid in written if uid in committed], len(written)
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--burst-size", type=int, default=40)
+    parser.add_argument("--gap", type=float, default=2.0, help="Seconds between bursts")
+    parser.add_argument("--modes", default="events,poll,legacy")
+    parser.add_argument("--checks-only", action="store_true", help="Run the behaviour checks, skip the timings")
+    args = parser.parse_args()
+    modes = args.modes.split(",")
+    if 'events' in modes and ups.Observer is None:
+        print("Library 'watchdog' not found: skipping the events mode.")
+        modes.remove('events')
+
+    results = {}
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA};")
+        conn.commit()
+        schema.apply_migrations(conn)
+    try:
+        print("\nWatcher checks")
+        report = sys.stdout
+        with contextlib.redirect_stdout(io.StringIO()): # Per-file progress lines
+            failures = run_checks(report)
+        if args.checks_only: modes = []
+        for mode in modes:
+            n = args.bursts * args.burst_size
+            uids = [f"SHIP_BENCH_{mode.upper()}_{k:06d}" for k in range(n)]
+            with db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.executemany("INSERT INTO shipments (shipment_uid, marcom_sync_status) VALUES (%s, 'PROCESSING')", [(u,) for u in uids])
+                conn.commit()
+            folder = tempfile.mkdtemp(prefix=f"ups_{mode}_")
+            try:
+                with contextlib.redirect_stdout(io.StringIO()): # Per-file progress lines
+                    latencies, expected = run_mode(mode, folder, uids, args.bursts, args.burst_size, args.gap)
+                left = [f for f in os.listdir(folder) if f.endswith('.out')]
+            finally:
+                shutil.rmtree(folder)
+            with db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT count(*) FROM shipments WHERE shipment_uid = ANY(%s) AND tracking_number = '1Z' || right(shipment_uid, 8)", (uids,))
+                    tracked = cur.fetchone()[0]
+                conn.rollback()
+            results[mode] = (latencies, expected, tracked, len(left))
+    finally:
+        with db_connection() as conn:
+            with conn.cursor() as cur: cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            conn.commit()
+
+    if results:
+        print(f"\n{args.bursts} bursts of {args.burst_size} .out files, {args.gap}s apart\n")
+        print(f"{'mode':<8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}  tracked  files left")
+    for mode, (latencies, expected, tracked, left) in results.items():
+        print(f"{mode:<8} {percentile(latencies, 50) if latencies else 0:9.1f} {percentile(latencies, 99) if latencies else 0:9.1f} "
+              f"{max(latencies, default=0):9.1f}  {tracked:>3}/{expected:<3}  {left}")
+        if tracked != expected or left: failures.append(f"{mode}: {tracked}/{expected} tracked, {left} files left")
+    if failures:
+        print(f"\nFAILED: {'; '.join(failures)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
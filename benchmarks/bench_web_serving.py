@@ -0,0 +1,172 @@
+# bench_web_serving.py
+# Shipping App throughput under several stations at once: the production profile (gunicorn,
+# shipping_web_app/serve.py) vs the development server run.py starts (Werkzeug, debug mode).
+# Seeds a scratch schema of the configured database with a synthetic Stage 1 report, starts
+# each server on a local port and, while --streams live feed streams stay open, drives it with
+# --clients concurrent clients: job lookups (GET /api/order/<id>) for --duration seconds, then
+# shipment closes (POST /api/shipment/process, every box of a job not shipped before) for as
+# long again. Reports requests/second and latency percentiles per endpoint, and any errors.
+# Shipment XML goes to a temporary folder. The schema is dropped afterwards.
+#
+# Usage: python benchmarks/bench_web_serving.py [--clients 16] [--duration 10] [--streams 8] [--modes dev,gunicorn]
+import os
+import sys
+import time
+import queue
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import requests
+from bench_ingest import create_scratch_schema, ingest, synthetic_report, utils_boxes, utils_ui
+from bench_job_lookup import seed_reference_data, percentile
+from shared_lib.database import db_connection
+
+SCHEMA = "bench_web_serving"
+os.environ['PGOPTIONS'] = f"-c search_path={SCHEMA}" # After bench_job_lookup's own; every connection, here and in the servers
+
+WEB_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shipping_web_app")
+DEV_SERVER = "import sys; sys.path.insert(0, sys.argv[1]); from run import app; app.run(port=int(sys.argv[2]), debug=True, use_reloader=False)"
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(mode, port, workdir):
+    if mode == 'dev':
+        cmd = [sys.executable, "-c", DEV_SERVER, WEB_APP, str(port)]
+    else:
+        cmd = [sys.executable, os.path.join(WEB_APP, "serve.py"), "--bind", f"127.0.0.1:{port}",
+               "--chdir", workdir, "--pythonpath", WEB_APP]
+    proc = subprocess.Popen(cmd, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/api/metrics", timeout=1).ok: return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"{mode} server did not come up on port {port}")
+
+def hold_streams(base, n, stop):
+    """n open live feed streams (station pages), read until stop is set."""
+    def station():
+        try:
+            with requests.get(f"{base}/api/activity/stream", stream=True, timeout=(5, None)) as r:
+                for _ in r.iter_content(chunk_size=None):
+                    if stop.is_set(): return
+        except requests.RequestException:
+            pass # The server going away
+    threads = [threading.Thread(target=station, daemon=True) for _ in range(n)]
+    for t in threads: t.start()
+    return threads
+
+def drive(clients, duration, request):
+    """Runs `request(session)` from `clients` threads for `duration` seconds. Returns (latencies ms, statuses, seconds)."""
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    deadline = time.monotonic() + duration
+    def client():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                status = request(session)
+            except StopIteration:
+                return
+            except requests.RequestException as e:
+                status = type(e).__name__
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[status] += 1
+    start = time.monotonic()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return latencies, statuses, time.monotonic() - start
+
+def run_mode(mode, args, tickets, unshipped):
+    workdir = tempfile.mkdtemp(prefix=f"web_{mode}_")
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = start_server(mode, port, workdir)
+    stop = threading.Event()
+    try:
+        hold_streams(base, args.streams, stop)
+        rng = random.Random(5)
+        lookup = lambda s: s.get(f"{base}/api/order/{rng.choice(tickets)}", timeout=30).status_code
+        def ship(s):
+            try:
+                ticket, barcodes = unshipped.get_nowait()
+            except queue.Empty:
+                raise StopIteration
+            body = {"orders": [{"order_number": ticket, "ship_to": {"name": "Bench Station"}}],
+                    "scanned_boxes": barcodes, "package_list": [{"id": "S1"}]}
+            return s.post(f"{base}/api/shipment/process", json=body, timeout=30).status_code
+        for _ in range(20): lookup(requests) # Warm up: pools, caches, prepared statements
+        results = {"GET /api/order/<id>": drive(args.clients, args.duration, lookup),
+                   "POST /api/shipment/process": drive(args.clients, args.duration, ship)}
+    finally:
+        stop.set()
+        proc.terminate()
+        proc.wait(timeout=20)
+        shutil.rmtree(workdir)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=60000, help="Synthetic report rows (jobs to ship run out otherwise)")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per endpoint and mode")
+    parser.add_argument("--streams", type=int, default=8, help="Live feed streams held open meanwhile")
+    parser.add_argument("--modes", default="dev,gunicorn")
+    args = parser.parse_args()
+    modes = args.modes.split(",")
+    utils_ui.print_info = lambda *a, **k: None
+    if 'gunicorn' in modes and sys.platform == 'win32':
+        print("gunicorn does not run on Windows: skipping it.")
+        modes.remove('gunicorn')
+
+    df = synthetic_report(args.rows)
+    with db_connection() as conn:
+        create_scratch_schema(conn, SCHEMA)
+        with conn.cursor() as cur:
+            ingest.ingest_bulk(cur, df, utils_boxes.box_columns(df), ingest.new_stats())
+            seed_reference_data(cur)
+            cur.execute("ANALYZE;")
+            cur.execute("""
+                SELECT j.job_ticket_number, array_agg(b.barcode_value ORDER BY b.barcode_value)
+                FROM jobs j JOIN items i ON i.job_id = j.id JOIN item_boxes b ON b.order_item_id = i.order_item_id
+                GROUP BY j.job_ticket_number ORDER BY j.job_ticket_number
+            """)
+            jobs = cur.fetchall()
+        conn.commit()
+
+    results = {}
+    try:
+        tickets = [t for t, _ in jobs]
+        for k, mode in enumerate(modes):
+            unshipped = queue.Queue()
+            for job in jobs[k::len(modes)]: unshipped.put(job) # Each mode ships its own jobs
+            results[mode] = run_mode(mode, args, tickets, unshipped)
+    finally:
+        with db_connection() as conn:
+            with conn.cursor() as cur: cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            conn.commit()
+
+    print(f"\n{len(jobs)} jobs seeded, {args.clients} clients, {args.streams} live feed streams open\n")
+    print(f"{'server':<9} {'endpoint':<27} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for mode, by_endpoint in results.items():
+        for endpoint, (latencies, statuses, secs) in by_endpoint.items():
+            if not latencies: continue
+            print(f"{mode:<9} {endpoint:<27} {len(latencies) / secs:8.1f} {percentile(latencies, 50):8.1f} "
+                  f"{percentile(latencies, 95):8.1f} {percentile(latencies, 99):8.1f}  {dict(statuses)}")
+
+if __name__ == "__main__":
+    main()
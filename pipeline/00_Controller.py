@@ -3,14 +3,27 @@ import os
 import sys
 import subprocess
 import glob
-import shutil
 import datetime
 import yaml
 import logging
 import traceback
 import json
 import re
+import io
+import time
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 import utils_ui  # <--- New UI Utility
+import utils_io
+
+# Child output lines are printed + logged under this lock so parallel stages never interleave mid-line
+_OUTPUT_LOCK = threading.Lock()
+
+# --- Execution Modes ---
+EXECUTION_MODE_SUBPROCESS = "subprocess" # Each stage in a fresh interpreter (isolation)
+EXECUTION_MODE_IN_PROCESS = "in_process" # Stage mains imported and called with parsed objects
+_execution_mode = EXECUTION_MODE_SUBPROCESS
 
 # --- Helper: Strip ANSI Codes ---
 def strip_ansi(text):
@@ -50,10 +63,31 @@ def setup_controller_logging(log_dir):
     utils_ui.setup_logging(log_file)
     logging.info(f"Controller logging initialized. Log file: {log_file}")
 
+    # In-process stages reset the root logger, so their output is logged through a dedicated one
+    stage_logger = logging.getLogger("controller.stage")
+    stage_logger.handlers = list(logging.getLogger().handlers)
+    stage_logger.setLevel(logging.INFO)
+    stage_logger.propagate = False
+
 # --- Execution Engine ---
-def run_script(script_path, args=None):
+def emit_line(line, prefix=None):
+    """Prints one line of child output to the console and the log file as a single unit."""
+    with _OUTPUT_LOCK:
+        if utils_ui.console:
+            from rich.text import Text
+            text = Text.from_ansi(line)
+            if prefix: text = Text(f"[{prefix}] ", style="dim") + text
+            utils_ui.console.print(text)
+        else:
+            print(f"[{prefix}] {line}" if prefix else line)
+        
+        # Also log to file - BUT STRIP ANSI CODES FIRST
+        logging.info(f"[{prefix}] {strip_ansi(line)}" if prefix else strip_ansi(line))
+
+def run_script(script_path, args=None, prefix=None):
     """
     Executes a script and streams stdout in real-time.
+    `prefix` tags every output line (used when several scripts run at once).
     """
     if not os.path.exists(script_path): 
         raise FileNotFoundError(f"Script not found: {script_path}")
@@ -88,28 +122,19 @@ def run_script(script_path, args=None):
         logging.info(f"--- Real-time Output from {script_name} ---")
         
         # Read line by line
+        # We don't use print_info here to avoid adding "ℹ" to every line of child output
         for line in process.stdout:
-            line = line.rstrip()
-            # Print to console directly (utils_ui handles rich printing if enabled)
-            # We don't use print_info here to avoid adding "ℹ" to every line of child output
-            if utils_ui.console:
-                from rich.text import Text
-                utils_ui.console.print(Text.from_ansi(line))
-            else:
-                print(line)
-            
-            # Also log to file - BUT STRIP ANSI CODES FIRST
-            logging.info(strip_ansi(line))
+            emit_line(line.rstrip(), prefix)
         
         process.wait() 
         logging.info(f"--- End of Output from {script_name} ---")
 
         if process.returncode != 0:
-            utils_ui.print_error(f"FATAL ERROR in {script_name}")
+            utils_ui.print_error(f"FATAL ERROR in {script_name}" + (f" ({prefix})" if prefix else ""))
             logging.error(f"Return Code: {process.returncode}")
             raise Exception(f"Script {script_name} failed with exit code {process.returncode}.")
         
-        utils_ui.print_success(f"{script_name} completed.")
+        utils_ui.print_success(f"{script_name} completed." + (f" ({prefix})" if prefix else ""))
         return True
         
     except FileNotFoundError: 
@@ -120,6 +145,137 @@ def run_script(script_path, args=None):
         logging.error(traceback.format_exc())
         raise
 
+class StageOutput(io.TextIOBase):
+    """
+    Stands in for sys.stdout/sys.stderr while a stage runs in-process: every complete
+    line goes to the real console and to the controller log, like subprocess output does.
+    """
+    encoding = "utf-8"
+
+    def __init__(self, stream, logger):
+        self._stream, self._logger, self._buffer = stream, logger, ""
+
+    def writable(self): return True
+    def isatty(self): return False # Stages fall back to plain output, as when piped
+
+    def write(self, text):
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines: self._emit(line)
+        return len(text)
+
+    def flush(self):
+        if self._buffer: self._emit(self._buffer); self._buffer = ""
+        self._stream.flush()
+
+    def _emit(self, line):
+        with _OUTPUT_LOCK:
+            self._stream.write(line + "\n")
+            self._logger.info(strip_ansi(line))
+
+def load_stage_module(script_path):
+    """Imports a stage script as a module (once), registered under its file name."""
+    name = os.path.splitext(os.path.basename(script_path))[0]
+    module = sys.modules.get(name)
+    if module is not None and os.path.abspath(getattr(module, '__file__', '')) == os.path.abspath(script_path):
+        return module
+
+    script_dir = os.path.dirname(os.path.abspath(script_path))
+    if script_dir not in sys.path: sys.path.insert(0, script_dir)
+    spec = importlib.util.spec_from_file_location(name, script_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try: spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]; raise
+    return module
+
+def run_script_in_process(script_path, entry, call_args):
+    """
+    Runs `entry(*call_args)` from a stage script inside the controller process.
+    Output is captured like run_script's, and sys.exit() becomes a stage failure.
+    """
+    if not os.path.exists(script_path): 
+        raise FileNotFoundError(f"Script not found: {script_path}")
+    script_name = os.path.basename(script_path)
+    logging.info(f"--- RUNNING SCRIPT IN-PROCESS: {script_name}.{entry} ---")
+
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    saved_stdout, saved_stderr = sys.stdout, sys.stderr
+    output = StageOutput(saved_stdout, logging.getLogger("controller.stage"))
+    exit_code = 0
+    try:
+        sys.stdout = sys.stderr = output
+        try:
+            getattr(load_stage_module(script_path), entry)(*call_args)
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception:
+            traceback.print_exc(); exit_code = 1
+        finally:
+            output.flush()
+    finally:
+        sys.stdout, sys.stderr = saved_stdout, saved_stderr
+        # Stages call utils_ui.setup_logging(None), which replaces the root handlers
+        root.handlers = saved_handlers; root.setLevel(saved_level)
+
+    logging.info(f"--- End of Output from {script_name} ---")
+    if exit_code != 0:
+        utils_ui.print_error(f"FATAL ERROR in {script_name}")
+        logging.error(f"Return Code: {exit_code}")
+        raise Exception(f"Script {script_name} failed with exit code {exit_code}.")
+
+    utils_ui.print_success(f"{script_name} completed.")
+    return True
+
+def run_stage(script_path, args, entry="main", call_args=None):
+    """
+    Runs a pipeline stage in the configured execution mode: as a subprocess with
+    command-line `args`, or in-process as `entry(*call_args)` with parsed objects.
+    """
+    if _execution_mode == EXECUTION_MODE_IN_PROCESS:
+        return run_script_in_process(script_path, entry, args if call_args is None else call_args)
+    return run_script(script_path, args)
+
+def run_scripts_parallel(jobs, max_workers=None):
+    """
+    Runs independent scripts concurrently, each in its own interpreter, and prints a
+    timing summary. `jobs` is a list of (label, script_path, args). Threads only pump
+    the child pipes; the work itself happens in the child processes, at most
+    `max_workers` (default: available cores) at a time. Raises after all jobs finish if any failed.
+    """
+    if not max_workers:
+        max_workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    results = {}
+
+    def run_job(label, script_path, args):
+        start = time.perf_counter()
+        try:
+            run_script(script_path, args, prefix=label)
+            results[label] = (True, time.perf_counter() - start)
+        except Exception:
+            results[label] = (False, time.perf_counter() - start)
+
+    utils_ui.print_info(f"Running {len(jobs)} jobs across {min(max_workers, len(jobs))} workers...")
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for label, script_path, args in jobs: pool.submit(run_job, label, script_path, args)
+    wall = time.perf_counter() - wall_start
+
+    utils_ui.print_section("Timing Summary")
+    for label, _, _ in jobs:
+        ok, elapsed = results.get(label, (False, 0.0))
+        line = f"{label:<40} {elapsed:8.1f}s  {'OK' if ok else 'FAILED'}"
+        (utils_ui.print_info if ok else utils_ui.print_error)(line); logging.info(line)
+    total = sum(elapsed for _, elapsed in results.values())
+    summary = f"Wall time {wall:.1f}s for {total:.1f}s of work ({total / wall if wall else 0:.1f}x)."
+    utils_ui.print_info(summary); logging.info(summary)
+
+    failed = [label for label, (ok, _) in results.items() if not ok]
+    if failed: raise Exception(f"{len(failed)} of {len(jobs)} jobs failed: {', '.join(sorted(failed))}")
+    return True
+
 # --- Main Workflow ---
 def main_workflow():
     """Orchestrates the entire multi-stage workflow."""
@@ -135,6 +291,15 @@ def main_workflow():
 
     config = load_config(config_file_path)
     paths = config.get('paths', {}); script_paths = paths.get('scripts', {})
+
+    global _execution_mode
+    _execution_mode = config.get('controller_settings', {}).get('execution_mode', EXECUTION_MODE_SUBPROCESS)
+    utils_ui.print_info(f"Stage execution mode: {_execution_mode}")
+    # Stages hand off Parquet frames; the .xlsx workbooks are exports for people
+    excel_export = config.get('controller_settings', {}).get('excel_export', utils_io.EXCEL_EXPORT_BACKGROUND)
+    try: utils_io.set_excel_export(excel_export)
+    except ValueError as e: utils_ui.print_error(str(e)); sys.exit(1)
+    utils_ui.print_info(f"Excel export: {excel_export}")
     
     stage1_paths = paths.get('stage1_collect', {})
     
@@ -206,11 +371,10 @@ def main_workflow():
 
         remapping_map = config.get('product_id_remapping', {})
         s1_args = [s1_staging_dir, json.dumps(file_paths_map), json.dumps(remapping_map)]
-        run_script(script_paths['collect'], s1_args) 
+        run_stage(script_paths['collect'], s1_args, call_args=[s1_staging_dir, file_paths_map, remapping_map])
         
-        consolidated_reports = glob.glob(os.path.join(s1_staging_dir, 'MarcomOrderDate*.xlsx'))
+        consolidated_reports = utils_io.find_workbooks(os.path.join(s1_staging_dir, 'MarcomOrderDate*.xlsx')) # Newest first
         if not consolidated_reports: raise FileNotFoundError(f"No consolidated report (MarcomOrderDate*.xlsx) found in Stage 1 output: {s1_staging_dir}")
-        consolidated_reports.sort(key=os.path.getmtime, reverse=True)
         consolidated_report_path = consolidated_reports[0]
         utils_ui.print_success(f"Found consolidated report: {os.path.basename(consolidated_report_path)}")
 
@@ -218,7 +382,7 @@ def main_workflow():
         if 'ingest' in script_paths:
             utils_ui.print_section("Stage 1.5: Database Ingest")
             s15_args = [s1_staging_dir]
-            run_script(script_paths['ingest'], s15_args)
+            run_stage(script_paths['ingest'], s15_args, entry='ingest_data')
 
         # --- Dynamic Path Generation ---
         utils_ui.print_info("Setting up dynamic job folders...")
@@ -266,8 +430,8 @@ def main_workflow():
         # --- Move consolidated report ---
         try:
             final_consolidated_path = os.path.join(data_files_logs_dir, os.path.basename(consolidated_report_path))
-            if os.path.exists(consolidated_report_path):
-                shutil.move(consolidated_report_path, final_consolidated_path)
+            if utils_io.workbook_exists(consolidated_report_path):
+                utils_io.move_workbook(consolidated_report_path, final_consolidated_path)
                 consolidated_report_path = final_consolidated_path
                 utils_ui.print_info(f"Moved report to Data/Logs: {os.path.basename(final_consolidated_path)}")
             else:
@@ -280,7 +444,7 @@ def main_workflow():
         try:
             base, ext = os.path.splitext(consolidated_report_path)
             new_report_path = f"{base}_UNSORTED{ext}"
-            shutil.move(consolidated_report_path, new_report_path)
+            utils_io.move_workbook(consolidated_report_path, new_report_path)
             # utils_ui.print_info(f"Renamed original report to: {os.path.basename(new_report_path)}")
             consolidated_report_path_unsorted = new_report_path 
         except Exception as rename_err:
@@ -294,31 +458,29 @@ def main_workflow():
         utils_ui.print_section("Stage 2a: Data Sorting")
         # config_file_path already defined
         s2a_args = [ consolidated_report_path_unsorted, data_files_logs_dir, config_file_path ]
-        run_script(script_paths['sort'], s2a_args) # Calls 20a_DataSorter.py
+        run_stage(script_paths['sort'], s2a_args, call_args=[consolidated_report_path_unsorted, data_files_logs_dir, config]) # Calls 20a_DataSorter.py
 
         # --- Handoff 2a -> 2b ---
-        categorized_reports = glob.glob(os.path.join(data_files_logs_dir, '*_CATEGORIZED.xlsx'))
+        categorized_reports = utils_io.find_workbooks(os.path.join(data_files_logs_dir, '*_CATEGORIZED.xlsx'))
         if not categorized_reports: 
             raise FileNotFoundError(f"No categorized report found in: {data_files_logs_dir}")
-        categorized_reports.sort(key=os.path.getmtime, reverse=True)
         categorized_report_path = categorized_reports[0]
         # utils_ui.print_success(f"Categorized file: {os.path.basename(categorized_report_path)}")
 
         # --- Stage 2b: Data Bundling ---
         utils_ui.print_section("Stage 2b: Data Bundling")
         s2b_args = [ categorized_report_path, data_files_logs_dir, config_file_path ]
-        run_script(script_paths['bundle'], s2b_args) # Calls 20b_DataBundler.py
+        run_stage(script_paths['bundle'], s2b_args, call_args=[categorized_report_path, data_files_logs_dir, config]) # Calls 20b_DataBundler.py
         
         # --- Move original source files ---
         utils_ui.print_info("Archiving source files...")
 # No changes needed here, logic is compatible.
         
         # --- Handoff 2b -> 2c ---
-        bundled_reports = glob.glob(os.path.join(data_files_logs_dir, 'MarcomOrderDate*.xlsx'))
+        bundled_reports = utils_io.find_workbooks(os.path.join(data_files_logs_dir, 'MarcomOrderDate*.xlsx'))
         bundled_reports = [f for f in bundled_reports if "_UNSORTED" not in f and "_CATEGORIZED" not in f]
         if not bundled_reports: raise FileNotFoundError(f"No FINAL bundled report found in: {data_files_logs_dir}")
         
-        bundled_reports.sort(key=os.path.getmtime, reverse=True)
         bundled_report_path = bundled_reports[0]
         utils_ui.print_success(f"FINAL Bundled Report: {os.path.basename(bundled_report_path)}")
 
@@ -334,12 +496,12 @@ def main_workflow():
         # --- Stage 2c: PDF Runlist Generation ---
         utils_ui.print_section("Stage 2c: PDF Runlist Generation")
         s2c_args = [bundled_report_path, dynamic_job_folder, json.dumps(config), json.dumps(fragmentation_map)]
-        run_script(script_paths['pdfgen'], s2c_args)
+        run_stage(script_paths['pdfgen'], s2c_args, call_args=[bundled_report_path, dynamic_job_folder, config, fragmentation_map])
 
         # --- Stage 3a.1: Acquire Job Assets ---
         utils_ui.print_section("Stage 3a.1: Acquire Job Assets")
         s3a1_args = [bundled_report_path, oneup_files_dir]
-        run_script(script_paths['acquire_assets'], s3a1_args)
+        run_stage(script_paths['acquire_assets'], s3a1_args)
 
         # --- Stage 3a.2: Generate Job Tickets ---
         utils_ui.print_section("Stage 3a.2: Generate Job Tickets")
@@ -355,7 +517,7 @@ def main_workflow():
             job_tickets_dir,
             json.dumps(s3a_config_subset) 
         ]
-        run_script(script_paths['generate_tickets'], s3a2_args)
+        run_stage(script_paths['generate_tickets'], s3a2_args, call_args=[bundled_report_path, oneup_files_dir, job_tickets_dir, s3a_config_subset])
         
         # --- Stage 3b: Prepare Press Files ---
         utils_ui.print_section("Stage 3b: Prepare Press Files")
@@ -379,9 +541,15 @@ def main_workflow():
         s3b_config_subset['COLOR_PALETTE_PATH'] = paths.get('color_palette_path')
         s3b_config_subset['HALF_BOX_ICON_PATH'] = paths.get('half_box_icon_path')
         s3b_config_subset['FULL_BOX_ICON_PATH'] = paths.get('full_box_icon_path')
+        s3b_config_subset['press_file_mode'] = config.get('press_settings', {}).get('press_file_mode', 'reference')
 
-        s3b_args = [bundled_report_path, s3_files_dir, s3_originals_dir, json.dumps(s3b_config_subset)]
-        run_script(script_paths['pressprep'], s3b_args)
+        # "direct" imposition reads the 1-up artwork + bundle quantities itself, so no press files are written
+        imposition_mode = config.get('press_settings', {}).get('imposition_mode', 'folder')
+        if imposition_mode == 'direct':
+            utils_ui.print_info("Imposition mode 'direct': press files are not prepared, Stage 4 imposes from 1-up artwork.")
+        else:
+            s3b_args = [bundled_report_path, s3_files_dir, s3_originals_dir, json.dumps(s3b_config_subset)]
+            run_stage(script_paths['pressprep'], s3b_args, call_args=[bundled_report_path, s3_files_dir, s3_originals_dir, s3b_config_subset])
 
         # --- Handoff 3 -> 4: Find Gang Run Folders ---
         gang_run_folders = [] 
@@ -399,14 +567,22 @@ def main_workflow():
             utils_ui.print_section("Stage 4: Imposition")
             s4_config_subset = {
                  'imposition_profile': paths.get('imposition_profile_path'),
-                 'marks_template': paths.get('marks_template_path')
+                 'marks_template': paths.get('marks_template_path'),
+                 'imposition_assembly': config.get('press_settings', {}).get('imposition_assembly', 'stream')
             }
+            if imposition_mode == 'direct':
+                s4_config_subset.update(s3b_config_subset)
             s4_output_dir = os.path.join(production_imposed_dir, "Gang") 
             
-            for batch_folder in gang_run_folders:
-                utils_ui.print_info(f"Imposing batch: {os.path.basename(batch_folder)}")
+            # Batches are independent and write distinct files, so they run side by side
+            # (always as subprocesses, whatever the execution mode, to use every core)
+            s4_jobs = []
+            for batch_folder in sorted(gang_run_folders):
                 s4_args = [batch_folder, s4_output_dir, json.dumps(s4_config_subset)]
-                run_script(script_paths['impose'], s4_args)
+                if imposition_mode == 'direct':
+                    s4_args += ['--bundle-excel', bundled_report_path]
+                s4_jobs.append((os.path.basename(batch_folder), script_paths['impose'], s4_args))
+            run_scripts_parallel(s4_jobs, config.get('press_settings', {}).get('imposition_workers'))
 
         # --- Stage 5: Send Email Notification ---
         utils_ui.print_section("Stage 5: Email Notification")
@@ -422,13 +598,14 @@ def main_workflow():
                     original_dynamic_base_name, bundled_report_path, pdf_runlist_path,
                     oneup_files_dir, job_tickets_dir, config_file_path
                 ]
-                run_script(email_script_path, s5_args)
+                run_stage(email_script_path, s5_args, call_args=[s5_args])
 
         except Exception as email_err:
             utils_ui.print_error(f"Email notification FAILED: {email_err}")
             logging.error(traceback.format_exc())
         
         # --- Workflow Complete ---
+        utils_io.wait_for_exports()
         utils_ui.print_banner("Workflow Complete", f"All files in: {dynamic_job_folder}")
         logging.info("--- [ WORKFLOW COMPLETE ] ---")
 
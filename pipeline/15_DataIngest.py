@@ -1,23 +1,23 @@
 import pandas as pd
 import psycopg2
 import os
+import io
+import hashlib
 import sys
-import glob
+import time
 import argparse
 import datetime
 import argparse
 import datetime
 import yaml
 import utils_ui
+import utils_boxes
+from utils_io import find_workbooks, read_sheet
 
-# --- DB Configuration ---
-from dotenv import load_dotenv
-load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Project root, for shared_lib
+from shared_lib import database, schema
 
-DB_NAME = os.getenv("DB_NAME", "marcom_production_suite")
-DB_USER = os.getenv("DB_USER", "jimmyswindler")
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", "5432")
+# DB connection settings (DB_* in .env) and pooling live in shared_lib.database
 
 def load_config(config_path=None):
     if config_path is None:
@@ -33,99 +33,245 @@ def load_config(config_path=None):
         return {}
 
 
-def create_tables_if_not_exist(conn):
-    cur = conn.cursor()
-    # Item Boxes schema - supports dynamic sequence
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS item_boxes (
-            id SERIAL PRIMARY KEY,
-            order_item_id TEXT REFERENCES items(order_item_id) ON DELETE CASCADE,
-            box_sequence INT,
-            barcode_value TEXT,
-            UNIQUE(order_item_id, box_sequence)
-        );
-    """)
-    conn.commit()
-    cur.close()
-
-def connect_db():
-    try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            host=DB_HOST,
-            port=DB_PORT
-        )
-        create_tables_if_not_exist(conn)
-        return conn
-    except Exception as e:
-        utils_ui.print_error(f"Database connection/schema init failed: {e}")
-        return None
-
 def clean_value(val):
     """Handle NaN/Nat and string cleanup"""
     if pd.isna(val) or val == 'nan':
         return None
     return str(val).strip()
 
-def ingest_data(staging_dir):
-    utils_ui.print_banner("15 - Data Ingest (XLSX -> DB)")
-    
-    # 1. Find the report file
-    # Look for MarcomOrderDate*.xlsx or Consolidated_Report*.xlsx
-    # We want the most recent one.
-    search_patterns = [
-        os.path.join(staging_dir, "MarcomOrderDate*.xlsx"),
-        os.path.join(staging_dir, "Consolidated_Report*.xlsx")
-    ]
-    
-    found_files = []
-    for pattern in search_patterns:
-        found_files.extend(glob.glob(pattern))
-        
-    if not found_files:
-        utils_ui.print_error(f"No report file found in {staging_dir}")
-        sys.exit(1)
-        
-    # Sort by modification time, newest first
-    found_files.sort(key=os.path.getmtime, reverse=True)
-    target_file = found_files[0]
-    utils_ui.print_info(f"Ingesting file: {os.path.basename(target_file)}")
-    
+# --- Ingest Modes ---
+INGEST_MODE_BULK = "bulk" # COPY into temp staging tables, then one set-based merge per table
+INGEST_MODE_ROW = "row"   # Legacy: one round-trip per statement per row
+INGEST_MODES = (INGEST_MODE_BULK, INGEST_MODE_ROW)
+
+# Staging column -> (report column, kind). 'key' columns are cleaned like clean_value with ''
+# counting as missing (the row is skipped); 'text' keeps clean_value as is.
+STAGE_COLUMNS = {
+    'order_number': ('order_number', 'key'), 'order_date': ('order_date', 'timestamp'), 'ship_date': ('ship_date', 'timestamp'),
+    'ship_to_company': ('ship_to_company', 'text'), 'ship_to_name': ('ship_to_name', 'text'),
+    'address1': ('address1', 'text'), 'address2': ('address2', 'text'), 'address3': ('address3', 'text'), 'address4': ('address4', 'text'),
+    'city': ('city', 'text'), 'state': ('state', 'text'), 'zip': ('zip', 'text'), 'country': ('country', 'text'),
+    'job_ticket_number': ('job_ticket_number', 'key'), 'project_description': ('job_ticket_project_description', 'text'),
+    'general_description': ('general_description', 'text'), 'paper_description': ('paper_description', 'text'),
+    'press_instructions': ('press_instructions', 'text'), 'bindery_instructions': ('bindery_instructions', 'text'),
+    'shipping_instructions': ('job_ticket_shipping_instructions', 'text'), 'special_instructions': ('special_instructions', 'text'),
+    'order_item_id': ('order_item_id', 'key'), 'product_id': ('product_id', 'text'), 'product_name': ('product_name', 'text'),
+    'product_description': ('product_description', 'text'), 'sku': ('sku', 'text'), 'sku_description': ('sku_description', 'text'),
+    'quantity_ordered': ('quantity_ordered', 'int'), 'cost_center': ('cost_center', 'text'), 'file_url': ('1-up_output_file_url', 'text'),
+}
+STAGE_SQL_TYPES = {'key': 'TEXT', 'text': 'TEXT', 'timestamp': 'TIMESTAMP', 'int': 'INTEGER'}
+
+def _clean_column(values):
+    """clean_value over a whole column (missing -> NA)."""
+    missing = values.isna() | values.astype(object).eq('nan')
+    return values.astype(str).str.strip().mask(missing)
+
+def _copy_column(values):
+    """A column as COPY text-format fields: backslash escapes, NULL as \\N."""
+    text = values.astype(str)
+    for char, escape in (('\\', '\\\\'), ('\t', '\\t'), ('\n', '\\n'), ('\r', '\\r')):
+        text = text.str.replace(char, escape, regex=False)
+    return text.where(values.notna(), '\\N')
+
+def _copy_frame(cur, table, frame):
+    if frame.empty: return
+    fields = [_copy_column(frame[col]) for col in frame.columns]
+    lines = fields[0].str.cat(fields[1:], sep='\t') if len(fields) > 1 else fields[0]
+    cur.copy_expert(f"COPY {table} ({', '.join(frame.columns)}) FROM STDIN", io.StringIO('\n'.join(lines) + '\n'))
+
+def _stage_column(df, source, kind):
+    """A report column cleaned for staging (missing -> NA)."""
+    if source not in df.columns: return pd.Series(None, index=df.index, dtype=object)
+    values = df[source]
+    if kind == 'timestamp':
+        values = pd.to_datetime(values, errors='coerce')
+        return values.astype(str).where(values.notna())
+    if kind == 'int':
+        return pd.to_numeric(values, errors='coerce').fillna(0).astype('int64')
+    cleaned = _clean_column(values)
+    return cleaned.mask(cleaned == '') if kind == 'key' else cleaned
+
+# Table -> (natural key, staged columns stored with it). Parents are carried by natural key
+# and resolved to their id by join: jobs.order_id from order_number, items.job_id from job_ticket_number.
+ENTITY_TABLES = {
+    'orders': ('order_number', ['order_date', 'ship_date', 'ship_to_company', 'ship_to_name',
+                                'address1', 'address2', 'address3', 'address4', 'city', 'state', 'zip', 'country']),
+    'jobs': ('job_ticket_number', ['order_number', 'project_description', 'general_description', 'paper_description',
+                                   'press_instructions', 'bindery_instructions', 'shipping_instructions', 'special_instructions']),
+    'items': ('order_item_id', ['job_ticket_number', 'product_id', 'product_name', 'product_description',
+                                'sku', 'sku_description', 'quantity_ordered', 'cost_center', 'file_url']),
+}
+ENTITY_PARENTS = {'jobs': ('orders', 'order_number', 'order_id'), 'items': ('jobs', 'job_ticket_number', 'job_id')}
+FINGERPRINT_COLUMN = 'row_fingerprint' # md5 of the row's stored values; unchanged rows are never re-sent (schema migration 4)
+
+def new_stats():
+    return {f'{table}_{outcome}': 0 for table in ENTITY_TABLES for outcome in ('new', 'updated', 'unchanged')}
+
+def _fingerprints(frame):
+    """md5 per row over every column's text (missing values distinct from '')."""
+    fields = [frame[col].astype(str).where(frame[col].notna(), '\\N') for col in frame.columns]
+    text = fields[0].str.cat(fields[1:], sep='\x1f') if len(fields) > 1 else fields[0]
+    return [hashlib.md5(t.encode('utf-8')).hexdigest() for t in text]
+
+def report_entities(df, box_cols):
+    """
+    The report as one row per order / job / item / box, each with its fingerprint. Repeated
+    keys resolve as the original row-by-row upserts did: orders keep the first row's values
+    except ship_date/ship_to_name (the last row's), jobs and items keep the first row, box
+    barcodes the last. Rows without an order, jobs without a ticket and items without an id are skipped.
+    """
+    df = df.reset_index(drop=True)
+    rows = pd.DataFrame({name: _stage_column(df, source, kind) for name, (source, kind) in STAGE_COLUMNS.items()})
+    rows = rows[rows['order_number'].notna()]
+    with_job = rows[rows['job_ticket_number'].notna()]
+    with_item = with_job[with_job['order_item_id'].notna()]
+
+    entities = {}
+    for table, frame in (('orders', rows), ('jobs', with_job), ('items', with_item)):
+        key, columns = ENTITY_TABLES[table]
+        entities[table] = frame.drop_duplicates(key)[[key] + columns].reset_index(drop=True)
+    lasts = rows.drop_duplicates('order_number', keep='last').set_index('order_number')
+    for col in ('ship_date', 'ship_to_name'):
+        entities['orders'][col] = entities['orders']['order_number'].map(lasts[col])
+    for frame in entities.values():
+        frame[FINGERPRINT_COLUMN] = _fingerprints(frame)
+
+    boxes = []
+    for i, col_name in enumerate(box_cols):
+        barcodes = _clean_column(df[col_name]).reindex(with_item.index)
+        present = barcodes.notna() & (barcodes != '')
+        boxes.append(pd.DataFrame({'order_item_id': with_item['order_item_id'][present], 'box_sequence': i + 1,
+                                   'barcode_value': barcodes[present]}))
+    boxes = pd.concat(boxes) if boxes else pd.DataFrame(columns=['order_item_id', 'box_sequence', 'barcode_value'])
+    entities['item_boxes'] = boxes.sort_index(kind='stable').drop_duplicates(['order_item_id', 'box_sequence'], keep='last').reset_index(drop=True)
+    return entities
+
+def _sql_type(column):
+    if column in STAGE_COLUMNS: return STAGE_SQL_TYPES[STAGE_COLUMNS[column][1]]
+    return 'INTEGER' if column == 'box_sequence' else 'TEXT'
+
+def _param_row(columns):
+    """One row of %(name)s parameters, typed like the staging tables, for merge_sql's `source`."""
+    return "(SELECT " + ', '.join(f'%({col})s::{_sql_type(col)} AS {col}' for col in columns) + ")"
+
+def merge_sql(table, source):
+    """
+    Upsert of the rows in `source` (alias s: a staging table, or one row of parameters) whose
+    fingerprint differs from the stored one. Unchanged rows are filtered out before the INSERT,
+    so they cost no write at all; RETURNING gives one row per insert/update.
+    """
+    key, columns = ENTITY_TABLES[table]
+    targets, values, join = [key], [f's.{key}'], ''
+    for col in columns + [FINGERPRINT_COLUMN]:
+        if table in ENTITY_PARENTS and col == ENTITY_PARENTS[table][1]:
+            parent, parent_key, fk = ENTITY_PARENTS[table]
+            targets.append(fk); values.append('p.id')
+            join = f"JOIN {parent} p ON p.{parent_key} = s.{parent_key}"
+        else:
+            targets.append(col); values.append(f's.{col}')
+    return f"""
+        INSERT INTO {table} ({', '.join(targets)})
+        SELECT {', '.join(values)}
+        FROM {source} s
+        {join}
+        LEFT JOIN {table} t ON t.{key} = s.{key}
+        WHERE t.{FINGERPRINT_COLUMN} IS DISTINCT FROM s.{FINGERPRINT_COLUMN}
+        ON CONFLICT ({key}) DO UPDATE SET
+            {', '.join(f'{c} = EXCLUDED.{c}' for c in targets[1:])}
+        RETURNING (xmax = 0) AS inserted;
+    """
+
+MERGE_BOXES_SQL = """
+    INSERT INTO item_boxes (order_item_id, box_sequence, barcode_value)
+    SELECT s.order_item_id, s.box_sequence, s.barcode_value
+    FROM {source} s
+    LEFT JOIN item_boxes t ON t.order_item_id = s.order_item_id AND t.box_sequence = s.box_sequence
+    WHERE t.barcode_value IS DISTINCT FROM s.barcode_value
+    ON CONFLICT (order_item_id, box_sequence) DO UPDATE SET
+        barcode_value = EXCLUDED.barcode_value;
+"""
+
+def _count_merge(cur, table, staged, stats):
+    written = [inserted for (inserted,) in cur.fetchall()]
+    stats[f'{table}_new'] += sum(written)
+    stats[f'{table}_updated'] += len(written) - sum(written)
+    stats[f'{table}_unchanged'] += staged - len(written)
+
+def ingest_bulk(cur, df, box_cols, stats):
+    """Bulk path: COPY each table's rows into a temp table, then one INSERT ... SELECT per table."""
+    entities = report_entities(df, box_cols)
+    for table, frame in entities.items():
+        columns = ', '.join(f'{col} {_sql_type(col)}' for col in frame.columns)
+        cur.execute(f"CREATE TEMP TABLE ingest_{table} ({columns}) ON COMMIT DROP;")
+        _copy_frame(cur, f'ingest_{table}', frame)
+        cur.execute(f"ANALYZE ingest_{table};")
+    for table in ENTITY_TABLES:
+        cur.execute(merge_sql(table, f'ingest_{table}'))
+        _count_merge(cur, table, len(entities[table]), stats)
+    cur.execute(MERGE_BOXES_SQL.format(source='ingest_item_boxes'))
+
+EXISTING_TICKETS_SQL = """
+    SELECT t.job_ticket_number, o.order_number, o.order_date, o.ship_to_company, j.project_description
+    FROM ingest_tickets t
+    JOIN jobs j ON j.job_ticket_number = t.job_ticket_number
+    LEFT JOIN orders o ON o.id = j.order_id
+    ORDER BY t.job_ticket_number;
+"""
+
+def find_existing_tickets(cur, tickets):
+    """The file's (unique) job tickets that are already in jobs, with what they belong to (DataFrame)."""
+    cur.execute("CREATE TEMP TABLE ingest_tickets (job_ticket_number TEXT) ON COMMIT DROP;")
+    _copy_frame(cur, 'ingest_tickets', pd.DataFrame({'job_ticket_number': tickets}))
+    cur.execute("ANALYZE ingest_tickets;")
+    cur.execute(EXISTING_TICKETS_SQL)
+    return pd.DataFrame(cur.fetchall(), columns=[c[0] for c in cur.description])
+
+def save_duplicate_report(df_existing, staging_dir):
+    report_name = f'Duplicate_Ingest_Tickets_{datetime.datetime.now().strftime("%Y-%m-%d_%H%M%S")}.xlsx'
+    report_path = os.path.join(staging_dir, report_name)
     try:
-        df = pd.read_excel(target_file, engine='openpyxl')
+        df_existing.to_excel(report_path, index=False, engine='openpyxl')
+        preview = ', '.join(df_existing['job_ticket_number'].head(10))
+        more = f" (+{len(df_existing) - 10} more)" if len(df_existing) > 10 else ""
+        utils_ui.print_warning(f"  -> Already ingested: {preview}{more}")
+        utils_ui.print_warning(f"  -> Full list ({len(df_existing)} tickets) saved to: {report_path}")
     except Exception as e:
-        utils_ui.print_error(f"Failed to read Excel file: {e}")
-        sys.exit(1)
-        
-    conn = connect_db()
-    if not conn:
-        sys.exit(1)
-        
+        utils_ui.print_error(f"  -> Failed to save duplicate ingest report: {e}")
+
+def ingest_rows(cur, df, box_cols, stats):
+    """Row-by-row path (legacy): one statement per order/job/item/box."""
+    entities = report_entities(df, box_cols)
+    for table in ENTITY_TABLES:
+        frame = entities[table]
+        sql = merge_sql(table, _param_row(frame.columns))
+        for record in frame.astype(object).where(frame.notna(), None).to_dict('records'):
+            cur.execute(sql, record)
+            _count_merge(cur, table, 1, stats)
+
+    boxes = entities['item_boxes']
+    sql = MERGE_BOXES_SQL.format(source=_param_row(boxes.columns))
+    for record in boxes.astype(object).to_dict('records'):
+        cur.execute(sql, record)
+
+def ingest_report(conn, df, config, staging_dir):
+    """Duplicate safeguard, then the ingest itself, on a pooled connection."""
     # Create cursor
     cur = conn.cursor()
     
-    stats = {'orders_new': 0, 'jobs_new': 0, 'items_new': 0}
-    
-    stats = {'orders_new': 0, 'jobs_new': 0, 'items_new': 0}
+    stats = new_stats()
     
     # --- SAFEGUARD: Duplicate Ingest Check ---
-    # Check if a meaningful number of Job Tickets from this file ALREADY EXIST.
+    # Check whether any Job Tickets from this file ALREADY EXIST (every ticket, one join).
     if 'job_ticket_number' in df.columns:
         # Get unique tickets from file
         file_tickets = df['job_ticket_number'].dropna().astype(str).unique().tolist()
         if file_tickets:
-            # Check DB for these
-            # chunking to avoid huge massive WHERE IN clauses if tens of thousands
-            # but usually a few thousand is fine for postgres. limiting to first 1000 for safety check is enough context.
-            check_subset = file_tickets[:1000]
-            
-            cur.execute("SELECT job_ticket_number FROM jobs WHERE job_ticket_number = ANY(%s)", (check_subset,))
-            existing_tickets = [row[0] for row in cur.fetchall()]
+            df_existing = find_existing_tickets(cur, file_tickets)
+            existing_tickets = df_existing['job_ticket_number'].tolist()
             
             if existing_tickets:
                 # Collision detected!
-                config = load_config()
+                save_duplicate_report(df_existing, staging_dir)
                 # Look in 'paths' -> 'allow_duplicate_ingest' OR root level? User asked for it below dynamic_build_root.
                 # In config.yaml structure, dynamic_build_root is inside 'paths'.
                 # So we check config['paths']['allow_duplicate_ingest']
@@ -145,159 +291,20 @@ def ingest_data(staging_dir):
                     utils_ui.print_warning(f"Duplicate Data Detected ({len(existing_tickets)} matches), but 'allow_duplicate_ingest' is TRUE.")
                     utils_ui.print_warning("Proceeding in TESTING MODE.")
 
+    box_cols = utils_boxes.box_columns(df) # box_A, box_B, ... however many the report has
+    ingest_mode = (config.get('database_ingest') or {}).get('mode', INGEST_MODE_BULK)
+    if ingest_mode not in INGEST_MODES:
+        utils_ui.print_error(f"Unknown database_ingest.mode '{ingest_mode}' (expected one of {', '.join(INGEST_MODES)})")
+        sys.exit(1)
     try:
-        for idx, row in df.iterrows():
-            # --- ORDER ---
-            order_num = clean_value(row.get('order_number'))
-            if not order_num: continue # Skip minimal rows
-            
-            # Map columns
-            order_data = {
-                'order_number': order_num,
-                'order_date': row.get('order_date'), # timestamp?
-                'ship_date': row.get('ship_date'),
-                'ship_to_company': clean_value(row.get('ship_to_company')),
-                'ship_to_name': clean_value(row.get('ship_to_name')),
-                'address1': clean_value(row.get('address1')),
-                'address2': clean_value(row.get('address2')),
-                'address3': clean_value(row.get('address3')),
-                'address4': clean_value(row.get('address4')),
-                'city': clean_value(row.get('city')),
-                'state': clean_value(row.get('state')),
-                'zip': clean_value(row.get('zip')),
-                'country': clean_value(row.get('country')),
-            }
-            
-            # Insert Order (handle duplicates)
-            # using ON CONFLICT DO UPDATE to ensure we have the ID and latest data
-            insert_order_sql = """
-                INSERT INTO orders (
-                    order_number, order_date, ship_date, 
-                    ship_to_company, ship_to_name, 
-                    address1, address2, address3, address4, 
-                    city, state, zip, country
-                ) VALUES (
-                    %(order_number)s, %(order_date)s, %(ship_date)s,
-                    %(ship_to_company)s, %(ship_to_name)s,
-                    %(address1)s, %(address2)s, %(address3)s, %(address4)s,
-                    %(city)s, %(state)s, %(zip)s, %(country)s
-                )
-                ON CONFLICT (order_number) DO UPDATE SET
-                    ship_date = EXCLUDED.ship_date,
-                    ship_to_name = EXCLUDED.ship_to_name
-                RETURNING id;
-            """
-            cur.execute(insert_order_sql, order_data)
-            order_id = cur.fetchone()[0]
-            if cur.statusmessage.startswith("INSERT"): stats['orders_new'] += 1
-
-            # --- JOB ---
-            jt_num = clean_value(row.get('job_ticket_number'))
-            if not jt_num: continue
-            
-            job_data = {
-                'job_ticket_number': jt_num,
-                'order_id': order_id,
-                'project_description': clean_value(row.get('job_ticket_project_description', '')), # handle loose mapping
-                'general_description': clean_value(row.get('general_description')),
-                'paper_description': clean_value(row.get('paper_description')),
-                'press_instructions': clean_value(row.get('press_instructions')),
-                'bindery_instructions': clean_value(row.get('bindery_instructions')),
-                'shipping_instructions': clean_value(row.get('job_ticket_shipping_instructions')),
-                'special_instructions': clean_value(row.get('special_instructions'))
-            }
-
-            insert_job_sql = """
-                INSERT INTO jobs (
-                    job_ticket_number, order_id, 
-                    project_description, general_description,
-                    paper_description, press_instructions,
-                    bindery_instructions, shipping_instructions,
-                    special_instructions
-                ) VALUES (
-                    %(job_ticket_number)s, %(order_id)s,
-                    %(project_description)s, %(general_description)s,
-                    %(paper_description)s, %(press_instructions)s,
-                    %(bindery_instructions)s, %(shipping_instructions)s,
-                    %(special_instructions)s
-                )
-                ON CONFLICT (job_ticket_number) DO NOTHING
-                RETURNING id;
-            """
-            cur.execute(insert_job_sql, job_data)
-            res = cur.fetchone()
-            if res:
-                job_id = res[0]
-                stats['jobs_new'] += 1
-            else:
-                # Already exists, fetch ID
-                cur.execute("SELECT id FROM jobs WHERE job_ticket_number = %s", (jt_num,))
-                job_id = cur.fetchone()[0]
-                
-            # --- ITEM ---
-            item_id = clean_value(row.get('order_item_id'))
-            if not item_id: continue
-            
-            # Handle Quantity
-            try: q = int(row.get('quantity_ordered', 0))
-            except: q = 0
-            
-            item_data = {
-                'order_item_id': item_id,
-                'job_id': job_id,
-                'product_id': clean_value(row.get('product_id')),
-                'product_name': clean_value(row.get('product_name')),
-                'product_description': clean_value(row.get('product_description')),
-                'sku': clean_value(row.get('sku')),
-                'sku_description': clean_value(row.get('sku_description')),
-                'quantity_ordered': q,
-                'cost_center': clean_value(row.get('cost_center')),
-                'file_url': clean_value(row.get('1-up_output_file_url'))
-            }
-            
-            insert_item_sql = """
-                INSERT INTO items (
-                    order_item_id, job_id,
-                    product_id, product_name, product_description,
-                    sku, sku_description, quantity_ordered,
-                    cost_center, file_url
-                ) VALUES (
-                    %(order_item_id)s, %(job_id)s,
-                    %(product_id)s, %(product_name)s, %(product_description)s,
-                    %(sku)s, %(sku_description)s, %(quantity_ordered)s,
-                    %(cost_center)s, %(file_url)s
-                )
-                ON CONFLICT (order_item_id) DO NOTHING
-                RETURNING id;
-            """
-            cur.execute(insert_item_sql, item_data)
-            if cur.rowcount > 0:
-                stats['items_new'] += 1
-
-            # --- ITEM BOXES ---
-            # Box columns box_A through box_H
-            for i in range(8):
-                suffix = chr(65+i) # A, B, ...
-                col_name = f'box_{suffix}'
-                barcode_val = clean_value(row.get(col_name))
-                
-                if barcode_val:
-                    box_data = {
-                        'order_item_id': item_id,
-                        'box_sequence': i + 1,
-                        'barcode_value': barcode_val
-                    }
-                    insert_box_sql = """
-                        INSERT INTO item_boxes (order_item_id, box_sequence, barcode_value)
-                        VALUES (%(order_item_id)s, %(box_sequence)s, %(barcode_value)s)
-                        ON CONFLICT (order_item_id, box_sequence) DO UPDATE SET
-                            barcode_value = EXCLUDED.barcode_value;
-                    """
-                    cur.execute(insert_box_sql, box_data)
-
-
+        start = time.perf_counter()
+        if ingest_mode == INGEST_MODE_BULK: ingest_bulk(cur, df, box_cols, stats)
+        else: ingest_rows(cur, df, box_cols, stats)
         conn.commit()
-        utils_ui.print_success(f"Ingest Complete. New Records -> Orders: {stats['orders_new']}, Jobs: {stats['jobs_new']}, Items: {stats['items_new']}")
+        utils_ui.print_success("Ingest Complete.")
+        for table in ENTITY_TABLES:
+            utils_ui.print_info(f"  {table.capitalize()}: {stats[f'{table}_new']} inserted, {stats[f'{table}_updated']} updated, {stats[f'{table}_unchanged']} unchanged")
+        utils_ui.print_info(f"Ingested {len(df)} rows in {time.perf_counter() - start:.2f}s ({ingest_mode} mode).")
 
     except Exception as e:
         conn.rollback()
@@ -306,7 +313,44 @@ def ingest_data(staging_dir):
         sys.exit(1)
     finally:
         cur.close()
-        conn.close()
+
+def ingest_data(staging_dir):
+    utils_ui.print_banner("15 - Data Ingest (XLSX -> DB)")
+    
+    # 1. Find the report file
+    # Look for MarcomOrderDate*.xlsx or Consolidated_Report*.xlsx
+    # We want the most recent one.
+    search_patterns = [
+        os.path.join(staging_dir, "MarcomOrderDate*.xlsx"),
+        os.path.join(staging_dir, "Consolidated_Report*.xlsx")
+    ]
+    
+    found_files = find_workbooks(*search_patterns) # Newest first
+        
+    if not found_files:
+        utils_ui.print_error(f"No report file found in {staging_dir}")
+        sys.exit(1)
+        
+    target_file = found_files[0]
+    utils_ui.print_info(f"Ingesting file: {os.path.basename(target_file)}")
+    
+    try:
+        df = read_sheet(target_file, dtype=utils_boxes.box_dtype)
+    except Exception as e:
+        utils_ui.print_error(f"Failed to read Excel file: {e}")
+        sys.exit(1)
+        
+    config = load_config()
+    try:
+        with database.db_connection() as conn:
+            try: schema.apply_migrations(conn)
+            except psycopg2.Error as e:
+                utils_ui.print_error(f"Database schema init failed: {e}")
+                sys.exit(1)
+            ingest_report(conn, df, config, staging_dir)
+    except database.DatabaseUnavailable as e:
+        utils_ui.print_error(f"Database connection failed: {e}")
+        sys.exit(1)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
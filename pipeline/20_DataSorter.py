@@ -11,9 +11,11 @@ import argparse
 import time
 import datetime
 import utils_ui  # <--- New UI Utility
+from utils_io import read_sheet, write_workbook
 
 # --- CONFIGURATION ---
 def load_config_from_path(config_path=None):
+    if isinstance(config_path, dict): return config_path # Already parsed (in-process controller)
     if config_path is None or config_path == "config.yaml":
         script_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(script_dir)
@@ -63,8 +65,14 @@ def organize_by_product_id(input_file, config):
         if col_ord_date: date_cols_to_parse.append(col_ord_date)
         if col_ship_date: date_cols_to_parse.append(col_ship_date)
 
-        df = pd.read_excel(input_file, dtype=dtype_map, parse_dates=date_cols_to_parse) if input_file.endswith('.xlsx') \
-             else pd.read_csv(input_file, dtype=dtype_map, parse_dates=date_cols_to_parse)
+        if input_file.endswith('.xlsx'):
+            df = read_sheet(input_file, dtype=dtype_map)
+            for col in date_cols_to_parse:
+                if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+                    try: df[col] = pd.to_datetime(df[col])
+                    except (ValueError, TypeError): pass # Left as-is, like read_excel's parse_dates
+        else:
+            df = pd.read_csv(input_file, dtype=dtype_map, parse_dates=date_cols_to_parse)
         utils_ui.print_info(f"Loaded {len(df)} records")
     except Exception as e:
         utils_ui.print_error(f"Loading input file: {str(e)}")
@@ -272,13 +280,12 @@ def main(input_excel_path, output_dir, config_path):
             
         if not sheets_to_write:
             utils_ui.print_warning("No data to write. Creating empty file.")
-            pd.DataFrame().to_excel(final_output_path)
+            write_workbook(final_output_path, {'Sheet1': pd.DataFrame()})
         else:
-            with pd.ExcelWriter(final_output_path) as writer:
-                for sheet_name, df_sheet in sheets_to_write.items():
-                    if isinstance(df_sheet, pd.DataFrame):
-                        # utils_ui.print_info(f"  - Sheet: '{sheet_name}' ({len(df_sheet)} rows)")
-                        df_sheet.reindex(columns=original_columns).to_excel(writer, sheet_name=sheet_name, index=False)
+            write_workbook(final_output_path, {
+                sheet_name: df_sheet.reindex(columns=original_columns)
+                for sheet_name, df_sheet in sheets_to_write.items() if isinstance(df_sheet, pd.DataFrame)
+            })
         
         utils_ui.print_success(f"Categorization Complete: {os.path.basename(final_output_path)}")
         
@@ -11,6 +11,7 @@ import traceback
 import json
 import argparse
 import utils_ui 
+from utils_io import read_workbook, write_workbook
 
 # =========================================================
 # THE BUNDLING CONSTITUTION (IRON LAWS)
@@ -28,6 +29,7 @@ CONSTITUTION = {
 
 # --- CONFIGURATION ---
 def load_config_from_path(config_path=None):
+    if isinstance(config_path, dict): return config_path # Already parsed (in-process controller)
     if config_path is None or config_path == "config.yaml":
         script_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(script_dir)
@@ -778,27 +780,25 @@ def run_bundling_process(categorized_data_sheets, output_file, config):
     )
 
     utils_ui.print_info(f"Saving to {os.path.basename(output_file)}...")
-    with pd.ExcelWriter(output_file) as writer:
-        cols = set()
-        for d in list(output_sheets.values()) + list(all_bundles.values()): cols.update(d.columns)
-        final_cols = sorted(list(cols))
-        if '__IS_DISQUALIFIED' in final_cols: final_cols.remove('__IS_DISQUALIFIED')
-        
-        col_job_key = col_names.get('job_ticket_number')
-        for n in sorted(all_bundles.keys()): 
-            # Sort by Job Ticket Number only
-            if col_job_key and col_job_key in all_bundles[n].columns:
-                all_bundles[n] = all_bundles[n].sort_values(by=[col_job_key])
-                
-            all_bundles[n].reindex(columns=final_cols).to_excel(writer, sheet_name=n, index=False)
-        order = safe_get_list(config, 'sheet_output_order')
-        written = set()
-        for s in order:
-             if s in output_sheets:
-                 output_sheets[s].reindex(columns=final_cols).to_excel(writer, sheet_name=s, index=False)
-                 written.add(s)
-        for s in sorted(output_sheets.keys()):
-             if s not in written: output_sheets[s].reindex(columns=final_cols).to_excel(writer, sheet_name=s, index=False)
+    sheets = {}
+    cols = set()
+    for d in list(output_sheets.values()) + list(all_bundles.values()): cols.update(d.columns)
+    final_cols = sorted(list(cols))
+    if '__IS_DISQUALIFIED' in final_cols: final_cols.remove('__IS_DISQUALIFIED')
+    
+    col_job_key = col_names.get('job_ticket_number')
+    for n in sorted(all_bundles.keys()): 
+        # Sort by Job Ticket Number only
+        if col_job_key and col_job_key in all_bundles[n].columns:
+            all_bundles[n] = all_bundles[n].sort_values(by=[col_job_key])
+            
+        sheets[n] = all_bundles[n].reindex(columns=final_cols)
+    order = safe_get_list(config, 'sheet_output_order')
+    for s in order:
+         if s in output_sheets and s not in sheets: sheets[s] = output_sheets[s].reindex(columns=final_cols)
+    for s in sorted(output_sheets.keys()):
+         if s not in sheets: sheets[s] = output_sheets[s].reindex(columns=final_cols)
+    write_workbook(output_file, sheets)
 
     if bundle_ctr > initial_ctr: save_run_history(base_name, bundle_ctr - 1, history_path)
     return output_file, all_frag_maps
@@ -808,7 +808,7 @@ def main(input_path, output_dir, config_path):
     utils_ui.print_banner("20b - Auto Bundler")
     cfg = load_config_from_path(config_path)
     try:
-        dfs = pd.read_excel(input_path, sheet_name=None)
+        dfs = read_workbook(input_path)
         # Normalize cols logic similar to original
         for n, d in dfs.items(): 
             for c in ['order_number', 'job_ticket_number', 'product_id', 'sku']:
@@ -8,6 +8,7 @@ import time
 import json
 import argparse
 import utils_ui  # <--- New UI Utility
+from utils_io import read_workbook, workbook_exists
 
 # --- PDF Generation Libraries ---
 try:
@@ -190,12 +191,8 @@ def generate_pdf_run_list(excel_path, pdf_path, config, history, fragmentation_m
         return current_y, did_page_break
 
     try:
-        if not os.path.exists(excel_path): utils_ui.print_error(f"Excel file not found: {excel_path}"); return False
-        xls = pd.ExcelFile(excel_path)
-        
-        for sheet_name in xls.sheet_names:
-            try: df_sheet = xls.parse(sheet_name)
-            except Exception as e: utils_ui.print_warning(f"Cannot parse sheet '{sheet_name}'. {e}"); continue
+        if not workbook_exists(excel_path): utils_ui.print_error(f"Excel file not found: {excel_path}"); return False
+        for sheet_name, df_sheet in read_workbook(excel_path).items():
             if df_sheet.empty: continue
             
             # --- Get Dates ---
@@ -360,10 +357,10 @@ def main(bundled_excel_path, output_dir, central_config_json, fragmentation_map_
     utils_ui.setup_logging(None)
     utils_ui.print_banner("30 - PDF Runlist Generator")
 
-    try: central_config = json.loads(central_config_json)
+    try: central_config = central_config_json if isinstance(central_config_json, dict) else json.loads(central_config_json)
     except Exception as e: utils_ui.print_error(f"Config JSON Error: {e}"); sys.exit(1)
 
-    try: fragmentation_map = json.loads(fragmentation_map_json)
+    try: fragmentation_map = fragmentation_map_json if isinstance(fragmentation_map_json, dict) else json.loads(fragmentation_map_json)
     except Exception: fragmentation_map = {'store_report_map': {}, 'unclaimed_report_map': {}}
 
     register_custom_fonts(central_config)
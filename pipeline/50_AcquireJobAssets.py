@@ -10,6 +10,9 @@ import re
 import traceback
 
 import utils_ui 
+from utils_io import read_workbook
+
+ASSET_COLUMNS = ['job_ticket_number', '1-up_output_file_url'] # All this stage reads from the bundle
 
 def sanitize_filename(filename):
     filename = str(filename).replace('/', '-')
@@ -107,11 +110,9 @@ def main(input_excel_path, files_base_folder):
     try:
         os.makedirs(files_base_folder, exist_ok=True)
 
-        xls = pd.ExcelFile(input_excel_path)
-        for sheet_name in xls.sheet_names:
-            df = pd.read_excel(xls, sheet_name=sheet_name)
+        for sheet_name, df in read_workbook(input_excel_path, columns=ASSET_COLUMNS).items():
             
-            if df.empty: 
+            if df.index.empty: 
                 continue
 
             sanitized_sheet_name = sanitize_filename(sheet_name)
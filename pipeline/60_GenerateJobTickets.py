@@ -9,10 +9,12 @@ import sys
 import argparse
 import json 
 from itertools import groupby
-from datetime import datetime, timedelta
+from datetime import datetime
 from io import BytesIO
 
 import utils_ui
+import utils_calendar
+from utils_io import read_workbook
 
 # PDF Libraries
 try:
@@ -148,9 +150,7 @@ def extract_cost_center_number(cost_center):
     match = re.match(r'^(\d{1,4})', str(cost_center))
     return match.group(1).zfill(4)[:4] if match else "0000"
 
-def adjust_for_weekend(date):
-    if date.weekday() >= 5: return date + timedelta(days=(7 - date.weekday()))
-    return date
+def adjust_for_weekend(date): return utils_calendar.next_weekday(date)
 
 def format_zip_code(zip_code):
     if pd.isna(zip_code): return ""
@@ -452,7 +452,7 @@ def main(input_excel_path, files_base_folder, tickets_base_folder, central_confi
     utils_ui.print_banner("40b - Generate Job Tickets")
     start_time = time.time()
 
-    try: central_config = json.loads(central_config_json)
+    try: central_config = central_config_json if isinstance(central_config_json, dict) else json.loads(central_config_json)
     except Exception: utils_ui.print_error("Invalid Config JSON"); sys.exit(1)
 
     watermark_path = central_config.get('WATERMARK_PATH')
@@ -461,9 +461,7 @@ def main(input_excel_path, files_base_folder, tickets_base_folder, central_confi
     try:
         os.makedirs(tickets_base_folder, exist_ok=True)
 
-        xls = pd.ExcelFile(input_excel_path)
-        for sheet_name in xls.sheet_names:
-            df = pd.read_excel(xls, sheet_name=sheet_name)
+        for sheet_name, df in read_workbook(input_excel_path).items():
             if 'order_item_id' in df.columns:
                 df['order_item_id'] = df['order_item_id'].astype(str).str.strip().apply(lambda x: x[:-2] if x.endswith('.0') else x)
             
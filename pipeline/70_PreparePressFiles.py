@@ -11,6 +11,9 @@ import json
 from io import BytesIO
 
 import utils_ui
+import utils_boxes
+from utils_boxes import category_for_sheet
+from utils_io import read_workbook
 
 try:
     import fitz
@@ -24,6 +27,13 @@ except ImportError:
 
 GANG_RUN_TRIGGER = "-GR-"
 
+# Press file modes: "reference" writes each design once and points every copy at it,
+# "expanded" physically replicates the artwork pages per quantity (legacy).
+PRESS_FILE_MODE_REFERENCE = "reference"
+PRESS_FILE_MODE_EXPANDED = "expanded"
+SEGMENT_PAGES = 500 # Pages per stack segment (250 cards, front + back)
+BOX_DTYPES = utils_boxes.box_dtype # Box barcodes must stay text
+
 # Configuration for Header Pages
 HEADER_FONT_SIZE = 18
 HEADER_TOP_MARGIN = 72
@@ -158,40 +168,52 @@ def create_header_page(pdf_path, order_number=None, segment=None, total_segments
         if src_doc: src_doc.close()
 
 
+def create_header_blank():
+    xm = (HEADER_PAGE_WIDTH - HEADER_TRIM_WIDTH)/2; ym = (HEADER_PAGE_HEIGHT - HEADER_TRIM_HEIGHT)/2
+    blank = PageObject.create_blank_page(width=HEADER_PAGE_WIDTH, height=HEADER_PAGE_HEIGHT)
+    blank.trimbox = RectangleObject([xm, ym, HEADER_PAGE_WIDTH - xm, HEADER_PAGE_HEIGHT - ym])
+    return blank
+
+def create_segment_headers(orientation_path, total, order=None, qty=None, bg=None, store=None, icon_path=None, icon_cards=0, box_vals={}):
+    """Builds one header page per 500-page segment, assigning box barcodes to the segments that show an icon."""
+    sorted_vals = [box_vals.get(k) for k in utils_boxes.box_columns(list(box_vals))]
+    num_segments = (total + SEGMENT_PAGES - 1) // SEGMENT_PAGES
+    headers = []
+
+    bc_idx = 0
+    for i in range(num_segments):
+        seg_num = i + 1
+        will_draw = False
+        if total > 0:
+             # Logic must match create_header_page
+             will_draw = ((seg_num % 2 == 0) or (seg_num == num_segments))
+             if qty == 2500 and num_segments == 10:
+                 will_draw = (seg_num % 3 == 0) or (seg_num == num_segments)
+             
+             # New check: only draw if icon path exists
+             if not (icon_path and os.path.exists(icon_path)): will_draw = False
+
+        val = None
+        if will_draw and bc_idx < len(sorted_vals):
+            raw = sorted_vals[bc_idx]
+            if raw and str(raw).lower() != 'nan': val = raw
+            bc_idx += 1
+        
+        headers.append(create_header_page(orientation_path, order, seg_num, num_segments, qty, bg, store, icon_path, icon_cards, val))
+    return headers
+
 def add_segmented_headers_to_pdf(orientation_path, target_path, order=None, qty=None, bg=None, store=None, icon_path=None, icon_cards=0, box_vals={}):
     try:
         reader = PdfReader(target_path); total = len(reader.pages)
         if total == 0: return False
         
-        sorted_vals = [box_vals.get(k) for k in sorted(box_vals.keys())]
-        num_segments = (total + 499) // 500; writer = PdfWriter()
-        
-        xm = (HEADER_PAGE_WIDTH - HEADER_TRIM_WIDTH)/2; ym = (HEADER_PAGE_HEIGHT - HEADER_TRIM_HEIGHT)/2
-        blank = PageObject.create_blank_page(width=HEADER_PAGE_WIDTH, height=HEADER_PAGE_HEIGHT)
-        blank.trimbox = RectangleObject([xm, ym, HEADER_PAGE_WIDTH - xm, HEADER_PAGE_HEIGHT - ym])
-
-        bc_idx = 0
-        for i in range(num_segments):
-            seg_num = i + 1
-            will_draw = False
-            if total > 0:
-                 # Logic must match create_header_page
-                 will_draw = ((seg_num % 2 == 0) or (seg_num == num_segments))
-                 if qty == 2500 and num_segments == 10:
-                     will_draw = (seg_num % 3 == 0) or (seg_num == num_segments)
-                 
-                 # New check: only draw if icon path exists
-                 if not (icon_path and os.path.exists(icon_path)): will_draw = False
-
-            val = None
-            if will_draw and bc_idx < len(sorted_vals):
-                raw = sorted_vals[bc_idx]
-                if raw and str(raw).lower() != 'nan': val = raw
-                bc_idx += 1
-            
-            writer.add_page(create_header_page(orientation_path, order, seg_num, num_segments, qty, bg, store, icon_path, icon_cards, val))
+        headers = create_segment_headers(orientation_path, total, order, qty, bg, store, icon_path, icon_cards, box_vals)
+        writer = PdfWriter(); blank = create_header_blank()
+
+        for i, header in enumerate(headers):
+            writer.add_page(header)
             writer.add_page(blank)
-            for p in reader.pages[i*500:(i+1)*500]: writer.add_page(p)
+            for p in reader.pages[i*SEGMENT_PAGES:(i+1)*SEGMENT_PAGES]: writer.add_page(p)
 
         with open(target_path, "wb") as f: writer.write(f)
         return True
@@ -200,6 +222,34 @@ def add_segmented_headers_to_pdf(orientation_path, target_path, order=None, qty=
 def sanitize_filename(filename): return re.sub(r'[\\:*?"<>|]', '', str(filename).replace('/', '-')).strip()
 def natural_keys(text): return [int(c) if c.isdigit() else c for c in re.split(r'(\d+)', str(text))]
 
+def standardize_page_for_gang_run(original_page, page_number):
+    """Rotates a landscape card into portrait: odd pages (fronts) turn -90, even pages (backs) +90."""
+    width = float(original_page.mediabox.width)
+    height = float(original_page.mediabox.height)
+    new_page = PageObject.create_blank_page(width=height, height=width)
+    
+    if page_number % 2 != 0:
+        transform = Transformation().rotate(-90).translate(tx=0, ty=width)
+        recalculate_box = lambda box: RectangleObject((box.lower_left[1], width - box.upper_right[0], box.upper_right[1], width - box.lower_left[0]))
+    else:
+        transform = Transformation().rotate(90).translate(tx=height, ty=0)
+        recalculate_box = lambda box: RectangleObject((height - box.upper_right[1], box.lower_left[0], height - box.lower_left[1], box.upper_right[0]))
+    
+    boxes_to_transform = {
+        "mediabox": original_page.mediabox, 
+        "cropbox": getattr(original_page, "cropbox", original_page.mediabox),
+        "bleedbox": getattr(original_page, "bleedbox", original_page.mediabox), 
+        "trimbox": getattr(original_page, "trimbox", original_page.mediabox),
+        "artbox": getattr(original_page, "artbox", original_page.mediabox)
+    }
+    
+    for box_name, box_obj in boxes_to_transform.items():
+        if box_obj: # Ensure not None
+             setattr(new_page, box_name, recalculate_box(box_obj))
+    
+    new_page.merge_transformed_page(original_page, transform)
+    return new_page
+
 def standardize_pdf_for_gang_run(pdf_path):
     try:
         reader_check = PdfReader(pdf_path)
@@ -209,41 +259,67 @@ def standardize_pdf_for_gang_run(pdf_path):
         writer = PdfWriter()
         reader = PdfReader(pdf_path)
         for i, original_page in enumerate(reader.pages):
-            page_number = i + 1
-            width = float(original_page.mediabox.width)
-            height = float(original_page.mediabox.height)
-            new_page = PageObject.create_blank_page(width=height, height=width)
-            
-            if page_number % 2 != 0:
-                transform = Transformation().rotate(-90).translate(tx=0, ty=width)
-                recalculate_box = lambda box: RectangleObject((box.lower_left[1], width - box.upper_right[0], box.upper_right[1], width - box.lower_left[0]))
-            else:
-                transform = Transformation().rotate(90).translate(tx=height, ty=0)
-                recalculate_box = lambda box: RectangleObject((height - box.upper_right[1], box.lower_left[0], height - box.lower_left[1], box.upper_right[0]))
-            
-            boxes_to_transform = {
-                "mediabox": original_page.mediabox, 
-                "cropbox": getattr(original_page, "cropbox", original_page.mediabox),
-                "bleedbox": getattr(original_page, "bleedbox", original_page.mediabox), 
-                "trimbox": getattr(original_page, "trimbox", original_page.mediabox),
-                "artbox": getattr(original_page, "artbox", original_page.mediabox)
-            }
-            
-            for box_name, box_obj in boxes_to_transform.items():
-                if box_obj: # Ensure not None
-                     setattr(new_page, box_name, recalculate_box(box_obj))
-            
-            new_page.merge_transformed_page(original_page, transform)
-            writer.add_page(new_page)
+            writer.add_page(standardize_page_for_gang_run(original_page, i + 1))
             
         with open(pdf_path, "wb") as f: writer.write(f)
         return True
     except Exception as e: utils_ui.print_error(f"Standardization Failed: {e}"); return False
 
-def process_dataframe(df, files_path, originals_path, sheet_name, palette_path=None, config_icons={}, shipping_rules={}):
-    if GANG_RUN_TRIGGER not in sheet_name.upper(): utils_ui.print_info(f"Skipping Standard Sheet: {sheet_name}"); return
-    
-    utils_ui.print_section(f"Processing Gang Run: {sheet_name}")
+def _share_card_pages(pages):
+    """
+    Serializes the card pages once and reads them back, so each page's content stream
+    becomes a single indirect object that every copy added to a writer points at.
+    """
+    writer = PdfWriter()
+    for p in pages: writer.add_page(p)
+    packet = BytesIO(); writer.write(packet); packet.seek(0)
+    return list(PdfReader(packet).pages)
+
+def gang_run_card_pages(reader):
+    """
+    Returns (pages, repeats) for a 1-up artwork: 1- and 2-page artwork becomes a
+    front/back pair (blank back for single-sided) that repeats per quantity, anything
+    else is used once as-is. Landscape artwork is standardized to portrait.
+    """
+    if len(reader.pages) in [1, 2]:
+        pages = [reader.pages[0]] if len(reader.pages)==1 else [reader.pages[0], reader.pages[1]]
+        if len(pages)==1: pages.append(PageObject.create_blank_page(width=pages[0].mediabox.width, height=pages[0].mediabox.height))
+        repeats = True
+    else:
+        pages = list(reader.pages); repeats = False
+    if pages and pages[0].mediabox.width > pages[0].mediabox.height:
+        pages = [standardize_page_for_gang_run(p, i + 1) for i, p in enumerate(pages)]
+    return pages, repeats
+
+def write_reference_press_file(orientation_path, target_path, qty, order=None, bg=None, store=None, icon_path=None, icon_cards=0, box_vals={}):
+    """
+    Reference mode press file: the 1- or 2-page artwork is standardized once and every
+    front/back copy references that shared content. Returns False when the artwork does
+    not qualify (other page counts) so the caller can fall back to the expanded path.
+    """
+    try:
+        reader = PdfReader(orientation_path)
+        if len(reader.pages) not in [1, 2] or qty <= 0: return False
+
+        pages, _ = gang_run_card_pages(reader)
+        card_pages = _share_card_pages(pages)
+
+        total = qty * len(card_pages)
+        headers = create_segment_headers(orientation_path, total, order, qty, bg, store, icon_path, icon_cards, box_vals)
+        writer = PdfWriter(); blank = create_header_blank()
+
+        for i, header in enumerate(headers):
+            writer.add_page(header)
+            writer.add_page(blank)
+            for n in range(i*SEGMENT_PAGES, min((i+1)*SEGMENT_PAGES, total)):
+                writer.add_page(card_pages[n % len(card_pages)])
+
+        with open(target_path, "wb") as f: writer.write(f)
+        return True
+    except Exception as e: utils_ui.print_error(f"Reference Press File Failed: {e}"); return False
+
+def build_color_map(df, palette_path):
+    """Assigns palette colors to rows by descending quantity, then natural ticket order."""
     color_map = {}
     if palette_path and os.path.exists(palette_path):
         try:
@@ -254,15 +330,33 @@ def process_dataframe(df, files_path, originals_path, sheet_name, palette_path=N
                 data.sort(key=lambda x: (-x['qty'], natural_keys(x['t'])))
                 color_map = {d['idx']: pal[i] for i, d in enumerate(data) if i < len(pal)}
         except Exception as e: utils_ui.print_warning(f"Palette Error: {e}")
+    return color_map
 
-    # Determine Product Category for rules lookup from sheet_name
-    # Sheet names match keys like "12ptBounceBack" or have prefix
-    # Logic in 20_DataSorter might produce names like '12ptBounceBack_CATEGORIZED' or '12ptBB-GR-144'
-    # The key in shipping_box_rules is either exact or has wildcards? 
-    # Current config has "12ptBounceBack" and "12ptBB-GR-*"
-    category = None
-    if "12ptBounceBack" in sheet_name or "12ptBB" in sheet_name: category = "12ptBounceBack"
-    elif "16ptBusinessCard" in sheet_name or "16ptBC" in sheet_name: category = "16ptBusinessCard"
+def resolve_row_header(row, category, bg=None, config_icons={}, shipping_rules=None):
+    """Collects the per-row values the segment header cards are drawn from (shipping_rules: utils_boxes.BoxRules)."""
+    box_vals = {col: str(row.get(col)).strip() for col in utils_boxes.box_columns(row) if pd.notna(row.get(col))}
+    qty = int(pd.to_numeric(row.get("quantity_ordered"), errors='coerce') or 1)
+    
+    # Resolve Icon Logic per Row
+    target_icon_path = None; icon_cards = 0
+    rule = shipping_rules.rule(category, qty) if shipping_rules else None
+    if rule is not None:
+        icon_cards = rule.get('icon_cards', 0)
+        icon_filename = rule.get('icon_file') # e.g. "icon_A.pdf"
+        if icon_filename:
+             # config_icons keys are "icon_A.pdf" -> "/path/to/icon_A.pdf"
+             target_icon_path = config_icons.get(icon_filename)
+
+    store = str(row.get("cost_center", "")).split('-')[0].strip()
+    return {'qty': qty, 'order': str(row.get("order_number", "")), 'bg': bg, 'store': store,
+            'icon_path': target_icon_path, 'icon_cards': icon_cards, 'box_vals': box_vals}
+
+def process_dataframe(df, files_path, originals_path, sheet_name, palette_path=None, config_icons={}, shipping_rules=None, press_file_mode=PRESS_FILE_MODE_REFERENCE):
+    if GANG_RUN_TRIGGER not in sheet_name.upper(): utils_ui.print_info(f"Skipping Standard Sheet: {sheet_name}"); return
+    
+    utils_ui.print_section(f"Processing Gang Run: {sheet_name}")
+    color_map = build_color_map(df, palette_path)
+    category = category_for_sheet(sheet_name)
 
     rows_data = list(df.iterrows())
     utils_ui.print_info(f"Preparing {len(rows_data)} files...")
@@ -274,12 +368,15 @@ def process_dataframe(df, files_path, originals_path, sheet_name, palette_path=N
                 prod_path = os.path.join(files_path, f"{base}.pdf")
                 if not os.path.exists(prod_path): progress.update(task, advance=1); continue
 
-                box_vals = {f'box_{chr(65+i)}': str(row.get(f'box_{chr(65+i)}')).strip() for i in range(8) if pd.notna(row.get(f'box_{chr(65+i)}'))}
                 os.makedirs(originals_path, exist_ok=True)
                 arch_path = os.path.join(originals_path, f"{base}.pdf")
                 shutil.copy2(prod_path, arch_path)
                 
-                qty = int(pd.to_numeric(row.get("quantity_ordered"), errors='coerce') or 1)
+                h = resolve_row_header(row, category, color_map.get(idx), config_icons, shipping_rules)
+                qty = h['qty']
+
+                if press_file_mode == PRESS_FILE_MODE_REFERENCE and write_reference_press_file(arch_path, prod_path, qty, h['order'], h['bg'], h['store'], h['icon_path'], h['icon_cards'], h['box_vals']):
+                    progress.update(task, advance=1); continue
 
                 reader = PdfReader(arch_path)
                 if len(reader.pages) in [1, 2]:
@@ -291,19 +388,7 @@ def process_dataframe(df, files_path, originals_path, sheet_name, palette_path=N
                     with open(prod_path, "wb") as f: writer.write(f)
                 
                 standardize_pdf_for_gang_run(prod_path)
-                
-                # Resolve Icon Logic per Row
-                target_icon_path = None; icon_cards = 0
-                if category and str(qty) in shipping_rules.get(category, {}):
-                    rule = shipping_rules[category][str(qty)]
-                    icon_cards = rule.get('icon_cards', 0)
-                    icon_filename = rule.get('icon_file') # e.g. "icon_A.pdf"
-                    if icon_filename:
-                         # config_icons keys are "icon_A.pdf" -> "/path/to/icon_A.pdf"
-                         target_icon_path = config_icons.get(icon_filename)
-
-                store = str(row.get("cost_center", "")).split('-')[0].strip()
-                add_segmented_headers_to_pdf(arch_path, prod_path, str(row.get("order_number", "")), qty, color_map.get(idx), store, target_icon_path, icon_cards, box_vals)
+                add_segmented_headers_to_pdf(arch_path, prod_path, h['order'], qty, h['bg'], h['store'], h['icon_path'], h['icon_cards'], h['box_vals'])
             except Exception as e: utils_ui.print_error(f"Row {idx} Failed: {e}")
             progress.update(task, advance=1)
 
@@ -311,17 +396,16 @@ def main(input_excel_path, files_base_folder, originals_base_folder, central_con
     utils_ui.setup_logging(None)
     utils_ui.print_banner("60 - Prepare Press Files")
     try:
-        config = json.loads(central_config_json)
+        config = central_config_json if isinstance(central_config_json, dict) else json.loads(central_config_json)
         
         # New: Parse full icon paths and rules
         icon_file_paths = config.get('icon_file_paths', {})
-        shipping_box_rules = config.get('shipping_box_rules', {})
+        shipping_box_rules = utils_boxes.BoxRules(config.get('shipping_box_rules', {}))
+        press_file_mode = config.get('press_file_mode', PRESS_FILE_MODE_REFERENCE)
+        utils_ui.print_info(f"Press file mode: {press_file_mode}")
         
-        xls = pd.ExcelFile(input_excel_path)
-        for sheet_name in xls.sheet_names:
-            if GANG_RUN_TRIGGER in sheet_name.upper():
-                df = pd.read_excel(xls, sheet_name=sheet_name, dtype={f'box_{chr(65+i)}': str for i in range(8)})
-                process_dataframe(df, os.path.join(files_base_folder, sanitize_filename(sheet_name)), os.path.join(originals_base_folder, sanitize_filename(sheet_name)), sheet_name, config.get('COLOR_PALETTE_PATH'), icon_file_paths, shipping_box_rules)
+        for sheet_name, df in read_workbook(input_excel_path, dtype=BOX_DTYPES, sheets=lambda name: GANG_RUN_TRIGGER in name.upper()).items():
+            process_dataframe(df, os.path.join(files_base_folder, sanitize_filename(sheet_name)), os.path.join(originals_base_folder, sanitize_filename(sheet_name)), sheet_name, config.get('COLOR_PALETTE_PATH'), icon_file_paths, shipping_box_rules, press_file_mode)
     except Exception as e: utils_ui.print_error(f"Fatal Error: {e}"); sys.exit(1)
 
 if __name__ == "__main__":
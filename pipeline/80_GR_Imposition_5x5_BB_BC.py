@@ -7,8 +7,16 @@ import traceback
 import sys
 from datetime import datetime
 import argparse
+import importlib
+import itertools
+from array import array
+
+try: import resource # Peak RSS reporting (not available on Windows)
+except ImportError: resource = None
 
 import utils_ui # <--- New UI Utility
+import utils_boxes
+from utils_io import read_workbook
 
 try:
     from pypdf import PdfReader, PdfWriter, PageObject, Transformation
@@ -17,10 +25,19 @@ try:
     from reportlab.lib.units import inch
     from reportlab.pdfbase import pdfmetrics
     from reportlab.pdfbase.ttfonts import TTFont
+    from pypdf.generic import DictionaryObject, NameObject
+    import pandas as pd
+    from utils_pdf import (CardSequence, StreamingPdfWriter, stack_order, page_to_form_xobject,
+                           page_content_key, placement_ops, add_xobject_sheet)
 except ImportError:
-    utils_ui.print_error("Required libraries not found: pypdf, reportlab")
+    utils_ui.print_error("Required libraries not found: pypdf, reportlab, pandas")
     sys.exit(1)
 
+# --- CONSTANTS ---
+ASSEMBLY_STREAM = "stream"   # XObject sheets written to disk one at a time, marks applied as they go
+ASSEMBLY_XOBJECT = "xobject" # Each card wrapped once as a Form XObject, placed with cm + Do
+ASSEMBLY_MERGE = "merge"     # Legacy: card content merged into every sheet placement
+
 # ==============================================================================
 # STAGE 1: CONFIGURATION & PLANNING
 # ==============================================================================
@@ -73,13 +90,7 @@ def standardize_pages(file_paths, profile):
                 for page in reader.pages:
                     c_w, c_h = profile['card_width_pts'], profile['card_height_pts']
                     pos_canvas = PageObject.create_blank_page(width=c_w, height=c_h)
-                    itb = page.trimbox
-                    if not itb or (itb.width == page.mediabox.width and itb.height == page.mediabox.height):
-                        bx, by = profile['bleed_left'], profile['bleed_top']
-                        itb = RectangleObject((page.mediabox.left + bx, page.mediabox.bottom + by, page.mediabox.right - bx, page.mediabox.top - by))
-
-                    dx = (c_w / 2) - ((itb.left + itb.right) / 2)
-                    dy = (c_h / 2) - ((itb.bottom + itb.top) / 2)
+                    dx, dy = card_offset(page, profile)
                     pos_canvas.merge_transformed_page(page, Transformation().translate(dx, dy))
                     all_pages.append(pos_canvas)
             except Exception as e:
@@ -89,9 +100,69 @@ def standardize_pages(file_paths, profile):
     utils_ui.print_info(f"Standardized {len(all_pages)} total pages.")
     return all_pages
 
+def card_offset(page, profile):
+    """Translation that centres a card's trim box in its cell, falling back to the mediabox less bleed."""
+    c_w, c_h = profile['card_width_pts'], profile['card_height_pts']
+    itb = page.trimbox
+    if not itb or (itb.width == page.mediabox.width and itb.height == page.mediabox.height):
+        bx, by = profile['bleed_left'], profile['bleed_top']
+        itb = RectangleObject((page.mediabox.left + bx, page.mediabox.bottom + by, page.mediabox.right - bx, page.mediabox.top - by))
+    dx = (c_w / 2) - ((itb.left + itb.right) / 2)
+    dy = (c_h / 2) - ((itb.bottom + itb.top) / 2)
+    return float(dx), float(dy)
+
+def card_form(writer, page, profile, cache, source=None):
+    """
+    Returns (xobject_ref, dx, dy) for a card page, clipped to its cell the way the
+    card-sized canvas in standardize_pages clips it. Identical pages share one form.
+    `source` is the file the page was read from; None for in-memory pages.
+    """
+    dx, dy = card_offset(page, profile)
+    key = (page_content_key(page, source or ("memory", id(page.pdf))), dx, dy)
+    if key not in cache:
+        cell = (-dx, -dy, profile['card_width_pts'] - dx, profile['card_height_pts'] - dy)
+        if isinstance(writer, StreamingPdfWriter): ref = writer.add_form(page, cell, source)
+        else: ref = page_to_form_xobject(writer, page, cell)
+        # In-memory pages are kept so their reader stays alive: the key embeds id(reader)
+        cache[key] = (ref, dx, dy, page if source is None else None)
+    return cache[key][:3]
+
+def standardize_cards(file_paths, profile, writer):
+    """XObject counterpart of standardize_pages: one (xobject_ref, dx, dy) per source page."""
+    utils_ui.print_section(f"Stage 2: Standardizing {len(file_paths)} Files")
+    all_cards, cache = [], {}
+
+    with utils_ui.create_progress() as progress:
+        task = progress.add_task("Standardizing...", total=len(file_paths))
+        for file_path in file_paths:
+            try:
+                reader = PdfReader(file_path)
+                for page in reader.pages: all_cards.append(card_form(writer, page, profile, cache, file_path))
+            except Exception as e:
+                utils_ui.print_warning(f"Error reading {os.path.basename(file_path)}: {e}")
+            progress.update(task, advance=1)
+
+    utils_ui.print_info(f"Standardized {len(all_cards)} total pages ({len(cache)} distinct cards).")
+    return all_cards
+
 # ==============================================================================
 # STAGE 3: CORE IMPOSITION ENGINE
 # ==============================================================================
+def slot_origin(profile, slot, is_back):
+    """Lower-left corner of a card cell on the sheet; backs mirror the columns."""
+    trim_w = profile['card_width_pts'] - (2 * profile['bleed_left'])
+    trim_h = profile['card_height_pts'] - (2 * profile['bleed_top'])
+    block_w = (profile['columns'] * trim_w) + ((profile['columns'] - 1) * profile['h_gutter'])
+    block_h = (profile['rows'] * trim_h) + ((profile['rows'] - 1) * profile['v_gutter'])
+    mx = (profile['paper_width'] - block_w) / 2 if profile['center'] else profile['bleed_left']
+    my = (profile['paper_height'] - block_h) / 2 if profile['center'] else profile['bleed_top']
+
+    row, col = divmod(slot, profile['columns'])
+    curr_col = (profile['columns'] - 1) - col if is_back else col
+    x = mx - profile['bleed_left'] + (curr_col * (trim_w + profile['h_gutter']))
+    y = my - profile['bleed_top'] + (row * (trim_h + profile['v_gutter']))
+    return x, y
+
 def impose_content(standardized_pages, profile):
     total_pages = len(standardized_pages)
     cards_per_sheet = profile['columns'] * profile['rows']
@@ -99,13 +170,6 @@ def impose_content(standardized_pages, profile):
     
     utils_ui.print_section(f"Stage 3: Imposing onto {num_sheets} Sheets")
     writer = PdfWriter()
-    
-    trim_w = profile['card_width_pts'] - (2 * profile['bleed_left'])
-    trim_h = profile['card_height_pts'] - (2 * profile['bleed_top'])
-    block_w = (profile['columns'] * trim_w) + ((profile['columns'] - 1) * profile['h_gutter'])
-    block_h = (profile['rows'] * trim_h) + ((profile['rows'] - 1) * profile['v_gutter'])
-    mx = (profile['paper_width'] - block_w) / 2 if profile['center'] else profile['bleed_left']
-    my = (profile['paper_height'] - block_h) / 2 if profile['center'] else profile['bleed_top']
 
     with utils_ui.create_progress() as progress:
         task = progress.add_task("Imposing Sheets...", total=num_sheets)
@@ -114,23 +178,229 @@ def impose_content(standardized_pages, profile):
             press_sheet = PageObject.create_blank_page(width=profile['paper_width'], height=profile['paper_height'])
             is_back = (sheet_idx % 2) != 0
 
-            for row in range(profile['rows']):
-                for col in range(profile['columns']):
-                    slot = (row * profile['columns']) + col
-                    p_idx = (slot * num_sheets) + sheet_idx
-                    if p_idx >= total_pages: continue
-
-                    card = standardized_pages[p_idx]
-                    curr_col = (profile['columns'] - 1) - col if is_back else col
-                    x = mx - profile['bleed_left'] + (curr_col * (trim_w + profile['h_gutter']))
-                    y = my - profile['bleed_top'] + (row * (trim_h + profile['v_gutter']))
-                    press_sheet.merge_transformed_page(card, Transformation().translate(tx=x, ty=y))
+            for slot in range(cards_per_sheet):
+                p_idx = (slot * num_sheets) + sheet_idx
+                if p_idx >= total_pages: continue
+
+                card = standardized_pages[p_idx]
+                x, y = slot_origin(profile, slot, is_back)
+                press_sheet.merge_transformed_page(card, Transformation().translate(tx=x, ty=y))
             
             writer.add_page(press_sheet)
             progress.update(task, advance=1)
 
     return writer
 
+# ==============================================================================
+# STAGE 3 (DIRECT MODE): IMPOSE FROM 1-UP ARTWORK + QUANTITY
+# ==============================================================================
+def load_bundle_rows(bundle_excel_path, batch_name):
+    """Reads the bundle sheet whose (sanitized) name matches the batch folder."""
+    prep = importlib.import_module("70_PreparePressFiles")
+    sheets = read_workbook(bundle_excel_path, dtype=prep.BOX_DTYPES, sheets=lambda name: prep.sanitize_filename(name) == batch_name)
+    return next(iter(sheets.items()), (None, None))
+
+def plan_direct_cards(rows_df, sheet_name, artwork_folder, profile, central_config, writer):
+    """
+    Builds the stack's CardSequence straight from the bundle rows, reusing stage 70's
+    header and card-page rules. Every distinct card (artwork front/back, segment
+    header, blank) is standardized once and stored as a Form XObject in `writer`;
+    each row then contributes a handful of runs instead of qty expanded pages.
+    Returns (sequence, cards) where cards maps key -> (xobject_ref, dx, dy).
+    """
+    prep = importlib.import_module("70_PreparePressFiles")
+    color_map = prep.build_color_map(rows_df, central_config.get('COLOR_PALETTE_PATH'))
+    category = prep.category_for_sheet(sheet_name)
+    icons = central_config.get('icon_file_paths', {}); rules = utils_boxes.BoxRules(central_config.get('shipping_box_rules', {}))
+
+    # Same stacking order as folder mode, which reads the prepared files sorted by name
+    rows = []
+    for idx, row in rows_df.iterrows():
+        file_name = f"{prep.sanitize_filename(str(row.get('job_ticket_number')))}.pdf"
+        art_path = os.path.join(artwork_folder, file_name)
+        if os.path.exists(art_path): rows.append((file_name, idx, row, art_path))
+        else: utils_ui.print_warning(f"Artwork not found: {file_name}")
+    rows.sort(key=lambda r: r[0])
+
+    sequence, cards, forms = CardSequence(), {}, {}
+    def register(key, page, source=None):
+        cards[key] = card_form(writer, page, profile, forms, source)
+    register('blank', prep.create_header_blank())
+
+    utils_ui.print_section(f"Stage 2: Planning {len(rows)} Jobs (Direct Mode)")
+    with utils_ui.create_progress() as progress:
+        task = progress.add_task("Planning...", total=len(rows))
+        for file_name, idx, row, art_path in rows:
+            try:
+                h = prep.resolve_row_header(row, category, color_map.get(idx), icons, rules)
+                pages, repeats = prep.gang_run_card_pages(PdfReader(art_path))
+                keys = []
+                for i, page in enumerate(pages):
+                    register((file_name, i), page, art_path); keys.append((file_name, i))
+                total = h['qty'] * len(keys) if repeats else len(keys)
+
+                headers = prep.create_segment_headers(art_path, total, h['order'], h['qty'], h['bg'], h['store'], h['icon_path'], h['icon_cards'], h['box_vals'])
+                for seg, header in enumerate(headers):
+                    register((file_name, 'header', seg), header)
+                    sequence.add_run([(file_name, 'header', seg)], 1)
+                    sequence.add_run(['blank'], 1)
+                    start = seg * prep.SEGMENT_PAGES
+                    shift = start % len(keys)
+                    sequence.add_run(keys[shift:] + keys[:shift], min(prep.SEGMENT_PAGES, total - start))
+            except Exception as e:
+                utils_ui.print_warning(f"Error planning {file_name}: {e}")
+            progress.update(task, advance=1)
+
+    utils_ui.print_info(f"Planned {sequence.total} card positions from {len(cards)} distinct cards.")
+    return sequence, cards
+
+def impose_placements(total_pages, card_at, profile, writer):
+    """
+    Stack-order imposition with Form XObjects: `card_at(p_idx)` gives the
+    (xobject_ref, dx, dy) for each position, each sheet is a short cm/Do stream.
+    """
+    cards_per_sheet = profile['columns'] * profile['rows']
+    num_sheets = math.ceil(total_pages / cards_per_sheet)
+    utils_ui.print_section(f"Stage 3: Imposing onto {num_sheets} Sheets")
+
+    sheets = [[] for _ in range(num_sheets)]
+    for sheet_idx, slot, p_idx in stack_order(total_pages, cards_per_sheet):
+        ref, dx, dy = card_at(p_idx)
+        x, y = slot_origin(profile, slot, (sheet_idx % 2) != 0)
+        sheets[sheet_idx].append((ref, x + dx, y + dy))
+
+    with utils_ui.create_progress() as progress:
+        task = progress.add_task("Imposing Sheets...", total=num_sheets)
+        for placements in sheets:
+            add_xobject_sheet(writer, profile['paper_width'], profile['paper_height'], placements)
+            progress.update(task, advance=1)
+    return writer
+
+def impose_cards(cards, profile, writer):
+    """Folder mode with XObject assembly: cards come from standardize_cards."""
+    return impose_placements(len(cards), cards.__getitem__, profile, writer)
+
+def impose_sequence(sequence, cards, profile, writer):
+    """Direct-mode imposition: the stack-order layout is computed from the sequence, never expanded."""
+    return impose_placements(sequence.total, lambda p_idx: cards[sequence.card_at(p_idx)], profile, writer)
+
+# ==============================================================================
+# STAGES 3 + 4 (STREAMING): IMPOSE AND FINISH ONE SHEET AT A TIME
+# ==============================================================================
+def slug_line_ops(profile, batch_name, sheet_num, total_sheets, font_name):
+    """Content operators for the slug line, laid out as create_slug_line_overlay draws it."""
+    hf = profile['header_footer']
+    text = hf['text'].replace('[file-name]', batch_name).replace('[page-number]', str(sheet_num)).replace('[page-count]', str(total_sheets))
+    tw = pdfmetrics.stringWidth(text, hf['font'], hf['size'])
+    cy = (profile['paper_height'] / 2) + (tw / 2)
+    escaped = text.encode('cp1252', 'replace').decode('latin-1').replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return f"q 0 -1 1 0 {0.25 * inch:.4f} {cy:.4f} cm BT {font_name} {hf['size']:g} Tf 0 0 Td ({escaped}) Tj ET Q"
+
+def index_cards(file_paths, profile, writer):
+    """
+    Streaming Stage 2: reads the sources front to back with one file open at a time,
+    writing each distinct card to `writer` as a form. Returns (forms, index) where
+    index[p_idx] is a 4-byte position in forms, so the stack order can jump around
+    the batch without going back to the source files.
+    """
+    utils_ui.print_section(f"Stage 2: Indexing {len(file_paths)} Files")
+    forms, form_ids, cache, index = [], {}, {}, array('I')
+
+    with utils_ui.create_progress() as progress:
+        task = progress.add_task("Indexing...", total=len(file_paths))
+        for file_path in file_paths:
+            try:
+                for page in PdfReader(file_path).pages:
+                    card = card_form(writer, page, profile, cache, file_path)
+                    if card[0].idnum not in form_ids:
+                        form_ids[card[0].idnum] = len(forms); forms.append(card)
+                    index.append(form_ids[card[0].idnum])
+            except Exception as e:
+                utils_ui.print_warning(f"Error reading {os.path.basename(file_path)}: {e}")
+            progress.update(task, advance=1)
+
+    utils_ui.print_info(f"Indexed {len(index)} total pages ({len(forms)} distinct cards).")
+    return forms, index
+
+def stream_sheets(writer, total_pages, card_at, profile, batch_name, central_config):
+    """
+    Streaming Stages 3 + 4: each sheet's placements are resolved through `card_at`,
+    then the sheet is written with the marks template and slug line and dropped.
+    Nothing but page references accumulates, so memory stays flat with sheet count.
+    """
+    tmpl_path = central_config['marks_template']
+    try:
+        marks_ref = writer.add_form(PdfReader(tmpl_path).pages[0], source=tmpl_path)
+    except Exception as e:
+        utils_ui.print_error(f"Stage 4 Failed: Could not open template '{tmpl_path}': {e}")
+        return False
+    font_ref = writer.add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"), NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject(f"/{profile['header_footer']['font']}"),
+        NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+    }))
+
+    cards_per_sheet = profile['columns'] * profile['rows']
+    num_sheets = math.ceil(total_pages / cards_per_sheet)
+    utils_ui.print_section(f"Stage 3: Imposing onto {num_sheets} Sheets (Streaming)")
+
+    with utils_ui.create_progress() as progress:
+        task = progress.add_task("Imposing Sheets...", total=num_sheets)
+        order = itertools.groupby(stack_order(total_pages, cards_per_sheet), key=lambda t: t[0])
+        for sheet_idx, positions in order:
+            placements = []
+            for _, slot, p_idx in positions:
+                ref, dx, dy = card_at(p_idx)
+                x, y = slot_origin(profile, slot, (sheet_idx % 2) != 0)
+                placements.append((ref, x + dx, y + dy))
+
+            ops, names = placement_ops(placements + [(marks_ref, 0, 0)])
+            ops.append(slug_line_ops(profile, batch_name, sheet_idx + 1, num_sheets, "/FSlug"))
+            resources = DictionaryObject({
+                NameObject("/XObject"): DictionaryObject({NameObject(name): ref for name, ref in names.values()}),
+                NameObject("/Font"): DictionaryObject({NameObject("/FSlug"): font_ref}),
+            })
+            writer.add_page(profile['paper_width'], profile['paper_height'], "\n".join(ops).encode("latin-1"), resources)
+            progress.update(task, advance=1)
+    return True
+
+def peak_rss_mb():
+    """High-water mark of this process's resident memory, or None where unavailable."""
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024 # bytes on macOS, KB on Linux
+
+def impose_streaming(batch_folder, out_path, profile, batch_name, central_config, bundle_rows=None):
+    """
+    Bounded-memory imposition: sources are read once, one file at a time, into a
+    compact card index, and every sheet goes to disk as soon as it is built.
+    """
+    part_path = out_path + ".part"
+    try:
+        with StreamingPdfWriter(part_path) as writer:
+            if bundle_rows is not None:
+                sheet_name, rows_df = bundle_rows
+                sequence, cards = plan_direct_cards(rows_df, sheet_name, batch_folder, profile, central_config, writer)
+                total_pages, card_at = sequence.total, lambda p_idx: cards[sequence.card_at(p_idx)]
+            else:
+                file_paths = [os.path.join(batch_folder, f) for f in sorted(os.listdir(batch_folder)) if f.lower().endswith(".pdf")]
+                forms, index = index_cards(file_paths, profile, writer)
+                total_pages, card_at = len(index), lambda p_idx: forms[index[p_idx]]
+
+            if not total_pages: raise ValueError("No card pages to impose.")
+            if not stream_sheets(writer, total_pages, card_at, profile, batch_name, central_config): raise ValueError("Finishing failed.")
+            sheets = len(writer)
+        os.replace(part_path, out_path)
+    except Exception as e:
+        utils_ui.print_error(f"Streaming Imposition Failed: {e}"); traceback.print_exc()
+        if os.path.exists(part_path): os.remove(part_path)
+        return False
+
+    utils_ui.print_success(f"Saved: {out_path} ({sheets} sheets)")
+    peak = peak_rss_mb()
+    if peak is not None: utils_ui.print_info(f"Peak memory (RSS high-water mark): {peak:.1f} MB")
+    return True
+
 # ==============================================================================
 # STAGE 4: FINISHING
 # ==============================================================================
@@ -177,43 +447,71 @@ def apply_finishing(imposed_writer, profile, batch_name, central_config):
 # ==============================================================================
 # MAIN
 # ==============================================================================
-def main(batch_folder, output_dir, central_config_json):
+def main(batch_folder, output_dir, central_config_json, bundle_excel_path=None):
+    """Imposes one batch. Returns False on failure (the script then exits 1); nothing to impose is not one."""
     utils_ui.setup_logging(None)
     utils_ui.print_banner("70 - Imposition Engine")
     
-    try: central_config = json.loads(central_config_json)
-    except Exception as e: utils_ui.print_error(f"Config Error: {e}"); return
+    try: central_config = central_config_json if isinstance(central_config_json, dict) else json.loads(central_config_json)
+    except Exception as e: utils_ui.print_error(f"Config Error: {e}"); return False
     
     os.makedirs(output_dir, exist_ok=True)
     batch_name = os.path.basename(batch_folder)
     utils_ui.print_info(f"Processing Batch: {batch_name}")
 
-    if not os.path.isdir(batch_folder): utils_ui.print_error(f"Batch folder not found: {batch_folder}"); return
+    if not os.path.isdir(batch_folder): utils_ui.print_error(f"Batch folder not found: {batch_folder}"); return False
 
     profile = load_and_plan(central_config)
-    if not profile: return
+    if not profile: return False
+
+    assembly = central_config.get('imposition_assembly', ASSEMBLY_STREAM)
+    out_path = os.path.join(output_dir, f"{batch_name}.pdf")
+
+    if bundle_excel_path:
+        # Direct mode: batch_folder holds the 1-up artwork, quantities come from the bundle rows
+        sheet_name, rows_df = load_bundle_rows(bundle_excel_path, batch_name)
+        if rows_df is None or rows_df.empty: utils_ui.print_warning(f"No bundle rows found for {batch_name}."); return True
+        if assembly == ASSEMBLY_STREAM:
+            return impose_streaming(batch_folder, out_path, profile, batch_name, central_config, (sheet_name, rows_df))
+
+        imp_writer = PdfWriter()
+        sequence, cards = plan_direct_cards(rows_df, sheet_name, batch_folder, profile, central_config, imp_writer)
+        if not sequence.total: utils_ui.print_error("Planning failed."); return False
+        impose_sequence(sequence, cards, profile, imp_writer)
+    else:
+        file_paths = [os.path.join(batch_folder, f) for f in sorted(os.listdir(batch_folder)) if f.lower().endswith(".pdf")]
+        if not file_paths: utils_ui.print_warning("No PDF files found."); return True
+        if assembly == ASSEMBLY_STREAM:
+            return impose_streaming(batch_folder, out_path, profile, batch_name, central_config)
+
+        if assembly == ASSEMBLY_MERGE:
+            std_pages = standardize_pages(file_paths, profile)
+            if not std_pages: utils_ui.print_error("Standardization failed."); return False
+            imp_writer = impose_content(std_pages, profile)
+        else:
+            imp_writer = PdfWriter()
+            std_cards = standardize_cards(file_paths, profile, imp_writer)
+            if not std_cards: utils_ui.print_error("Standardization failed."); return False
+            impose_cards(std_cards, profile, imp_writer)
 
-    file_paths = [os.path.join(batch_folder, f) for f in sorted(os.listdir(batch_folder)) if f.lower().endswith(".pdf")]
-    if not file_paths: utils_ui.print_warning("No PDF files found."); return
-        
-    std_pages = standardize_pages(file_paths, profile)
-    if not std_pages: utils_ui.print_error("Standardization failed."); return
-        
-    imp_writer = impose_content(std_pages, profile)
     final_writer = apply_finishing(imp_writer, profile, batch_name, central_config)
-    if not final_writer: return
+    if not final_writer: return False
 
-    out_path = os.path.join(output_dir, f"{batch_name}.pdf")
     try:
         with open(out_path, "wb") as f: final_writer.write(f)
         utils_ui.print_success(f"Saved: {out_path} ({len(final_writer.pages)} sheets)")
+        return True
     except Exception as e:
         utils_ui.print_error(f"Save Failed: {e}"); traceback.print_exc()
+        return False
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("batch_folder_to_impose")
     parser.add_argument("output_dir")
     parser.add_argument("central_config_json")
+    parser.add_argument("--bundle-excel", dest="bundle_excel_path", default=None,
+                        help="Impose directly from 1-up artwork using this bundle's rows (skips stage 70 expansion).")
     args = parser.parse_args()
-    main(args.batch_folder_to_impose, args.output_dir, args.central_config_json)
\ No newline at end of file
+    if not main(args.batch_folder_to_impose, args.output_dir, args.central_config_json, args.bundle_excel_path):
+        sys.exit(1) # run_scripts_parallel reports the batch FAILED
@@ -11,6 +11,7 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
 import utils_ui
+from utils_io import ensure_excel_export, read_workbook
 
 def load_config(config_path):
     try:
@@ -33,7 +34,7 @@ def attach_files(msg, file_paths):
             utils_ui.print_error(f"Attachment Error {file_path}: {e}")
     return msg
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description="80 - Send Email Notification.")
     parser.add_argument("dynamic_folder_name")
     parser.add_argument("bundled_excel_path")
@@ -41,7 +42,7 @@ def main():
     parser.add_argument("oneup_files_dir")
     parser.add_argument("job_tickets_dir")
     parser.add_argument("config_path")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     utils_ui.setup_logging(None)
     utils_ui.print_banner("80 - Email Notification")
@@ -67,16 +68,17 @@ def main():
     msg = MIMEMultipart(); msg['From'] = sender_email; msg['To'] = ", ".join(recipients)
 
     body_lines = ["Attachments are for reference only. No outside services are required for these orders."]
+    ensure_excel_export(args.bundled_excel_path) # Attached for people, so it must exist whatever the export mode
     standard_attachments = [args.bundled_excel_path, args.runlist_pdf_path]
     conditional_attachments = []
 
     try:
         # utils_ui.print_info(f"Checking for 'Outsource' in: {os.path.basename(args.bundled_excel_path)}")
-        xls = pd.ExcelFile(args.bundled_excel_path)
-        if 'Outsource' in xls.sheet_names:
+        sheets = read_workbook(args.bundled_excel_path, sheets=['Outsource'], columns=['job_ticket_number'])
+        if 'Outsource' in sheets:
             utils_ui.print_warning("'Outsource' sheet FOUND.")
             subject += " OUTSIDE SERVICES REQUIRED"
-            df_outsource = pd.read_excel(xls, sheet_name='Outsource')
+            df_outsource = sheets['Outsource']
             if 'job_ticket_number' in df_outsource.columns:
                 outsource_oneup_dir = os.path.join(args.oneup_files_dir, 'Outsource')
                 outsource_ticket_dir = os.path.join(args.job_tickets_dir, 'Outsource')
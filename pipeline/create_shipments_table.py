@@ -1,39 +1,18 @@
-
-import psycopg2
 import sys
 
 import os
-from dotenv import load_dotenv
-load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
 
-DB_NAME = os.getenv("DB_NAME", "marcom_production_suite")
-DB_USER = os.getenv("DB_USER", "jimmyswindler")
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", "5432")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Project root, for shared_lib
+from shared_lib import database, schema
 
 def create_table():
+    # The shipments DDL now lives in shared_lib/schema.py (migration 2); this applies every pending migration.
     try:
-        conn = psycopg2.connect(dbname=DB_NAME, user=DB_USER, host=DB_HOST, port=DB_PORT)
-        cur = conn.cursor()
-        
-        print("Creating shipments table...")
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS shipments (
-                id SERIAL PRIMARY KEY,
-                job_ticket_number VARCHAR(50),
-                tracking_number VARCHAR(100),
-                marcom_sync_status VARCHAR(50) DEFAULT 'PENDING',
-                marcom_response_message TEXT,
-                reference_id VARCHAR(100),
-                created_at TIMESTAMP DEFAULT NOW()
-            );
-        """)
-        
-        conn.commit()
-        cur.close()
-        conn.close()
-        print("Table 'shipments' created successfully.")
-        
+        with database.db_connection() as conn:
+            print("Applying schema migrations (shipments table included)...")
+            applied = schema.apply_migrations(conn)
+        print(f"Applied migrations: {applied}" if applied else f"Schema already at version {schema.SCHEMA_VERSION}.")
+
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
@@ -0,0 +1,114 @@
+# utils_boxes.py
+# Shipping box rules from config.yaml (shipping_box_rules + product_ids), flattened once into
+# a (category, qty) table. Stage 1 derives the box barcode columns from it, Stage 1b ingests
+# whatever box columns the report has, and Stage 3b reads icon rules from it.
+import re
+
+import numpy as np
+import pandas as pd
+
+BOX_COLUMN_PREFIX = 'box_'
+DEFAULT_BOX_COLUMNS = 8 # box_A..box_H are always written, even if no rule needs that many
+BUSINESS_CARD_CATEGORY = '16ptBusinessCard'
+_BOX_COLUMN = re.compile(r'^box_([A-Z]+)$')
+
+def box_suffix(i):
+    """Barcode/column suffix of the i-th box (0 -> 'A', 25 -> 'Z', 26 -> 'AA', ...)."""
+    suffix = ''
+    i += 1
+    while i:
+        i, rem = divmod(i - 1, 26)
+        suffix = chr(65 + rem) + suffix
+    return suffix
+
+def box_column(i): return f'{BOX_COLUMN_PREFIX}{box_suffix(i)}'
+
+def _suffix_index(suffix):
+    n = 0
+    for ch in suffix: n = n * 26 + ord(ch) - 64
+    return n - 1
+
+def box_columns(columns):
+    """The box_* columns among `columns` (a DataFrame, Series/row index or list), in box order."""
+    if isinstance(columns, (pd.DataFrame, pd.Series)): columns = columns.index if isinstance(columns, pd.Series) else columns.columns
+    found = [(_suffix_index(m.group(1)), c) for c in columns if isinstance(c, str) and (m := _BOX_COLUMN.match(c))]
+    return [c for _, c in sorted(found)]
+
+def box_dtype(column):
+    """read_workbook dtype function: box barcodes stay text."""
+    return str if isinstance(column, str) and _BOX_COLUMN.match(column) else None
+
+def category_for_sheet(sheet_name):
+    # Determine Product Category for rules lookup from sheet_name
+    # Sheet names match keys like "12ptBounceBack" or have prefix
+    # Logic in 20_DataSorter might produce names like '12ptBounceBack_CATEGORIZED' or '12ptBB-GR-144'
+    if "12ptBounceBack" in sheet_name or "12ptBB" in sheet_name: return "12ptBounceBack"
+    elif "16ptBusinessCard" in sheet_name or "16ptBC" in sheet_name: return "16ptBusinessCard"
+    return None
+
+def _product_key(value):
+    return str(value).split('.')[0].strip()
+
+class BoxRules:
+    """
+    shipping_box_rules keyed for lookup: `table` has one row per (category, qty) rule
+    with its box_count, `rule()` returns the raw rule dict. `product_ids` (category ->
+    ids) maps order rows to categories.
+    """
+    def __init__(self, shipping_box_rules=None, product_ids=None):
+        self.rules = {}
+        rows = []
+        for category, by_qty in (shipping_box_rules or {}).items():
+            if not isinstance(by_qty, dict): continue
+            for qty, rule in by_qty.items():
+                rule = rule if isinstance(rule, dict) else {}
+                self.rules[(category, str(qty))] = rule
+                rows.append((category, str(qty), len(rule.get('box_sequence') or [])))
+        self.table = pd.DataFrame(rows, columns=['category', 'qty', 'box_count'])
+        self.max_boxes = int(self.table['box_count'].max()) if rows else 0
+
+        self.product_categories = {}
+        for category, pids in (product_ids or {}).items():
+            if isinstance(pids, list):
+                for pid in pids: self.product_categories[str(pid)] = category
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get('shipping_box_rules', {}), config.get('product_ids', {}))
+
+    def rule(self, category, qty):
+        return self.rules.get((category, str(qty))) if category else None
+
+    @property
+    def column_count(self):
+        return max(DEFAULT_BOX_COLUMNS, self.max_boxes)
+
+    def categories(self, df):
+        """Rule category per row: product id first, then 16pt paper as Business Card; None if neither."""
+        codes, uniques = pd.factorize(df['product_id'])
+        lookup = np.array([self.product_categories.get(_product_key(u)) for u in uniques] + [None], dtype=object)
+        category = lookup[codes] # Missing ids have code -1, the trailing None
+        if 'paper_description' in df.columns:
+            paper = df['paper_description'].astype(object).map(str).str.lower()
+            is_16pt = (paper.str.contains('16pt', regex=False) | paper.str.contains('16 pt', regex=False)).to_numpy()
+            category = np.where(pd.isnull(category) & is_16pt, BUSINESS_CARD_CATEGORY, category)
+        return category
+
+    def box_counts(self, df):
+        """Boxes each row ships in, from its (category, qty) rule (0 without one)."""
+        qty = pd.to_numeric(df['quantity_ordered'], errors='coerce').fillna(0).astype(int).astype(str)
+        keys = pd.DataFrame({'category': self.categories(df), 'qty': qty.to_numpy()})
+        counts = keys.merge(self.table, on=['category', 'qty'], how='left')['box_count']
+        return counts.fillna(0).astype(int).to_numpy()
+
+    def barcode_columns(self, df):
+        """{box_X: barcodes} for every box column: order_item_id + box letter where the row has that box."""
+        codes, uniques = pd.factorize(df['order_item_id'])
+        ids = np.array([str(u).replace('<NA>', '').replace('nan', '') for u in uniques] + [''], dtype=object)[codes]
+        counts = self.box_counts(df)
+        has_id = ids != ''
+        columns = {}
+        for i in range(self.column_count):
+            suffix = box_suffix(i)
+            columns[box_column(i)] = np.where(has_id & (counts > i), ids + suffix, None)
+        return columns
@@ -0,0 +1,94 @@
+# utils_calendar.py
+# Business-day calendar shared by the stages: US holidays (observed, via CustomUS) plus
+# weekends, built once per year span and applied to whole columns with numpy's busday functions.
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import utils_ui
+
+try:
+    from holidays.countries import UnitedStates
+except ImportError:
+    utils_ui.print_warning("Library 'holidays' not found. Ship date calc will ignore holidays.")
+    UnitedStates = None
+
+WEEKMASK = "1111100" # Mon-Fri
+DEFAULT_LEAD_TIME_DAYS = 5
+
+class CustomUS(UnitedStates if UnitedStates else object):
+    def _populate(self, year):
+        if UnitedStates:
+            super()._populate(year)
+            thanksgiving_date = None
+            for date_obj, name in self.items():
+                if name == "Thanksgiving":
+                    thanksgiving_date = date_obj
+                    break
+            if thanksgiving_date:
+                self[thanksgiving_date + timedelta(days=1)] = "Day after Thanksgiving"
+
+@lru_cache(maxsize=None)
+def _year_holidays(year):
+    return tuple(CustomUS(observed=True, years=year).keys()) if UnitedStates else ()
+
+class BusinessCalendar:
+    """Weekend + holiday mask (np.busdaycalendar) for first_year..last_year inclusive."""
+    def __init__(self, first_year, last_year, holidays=True):
+        self.first_year, self.last_year = first_year, last_year
+        days = set()
+        if holidays:
+            for year in range(first_year, last_year + 1): days.update(_year_holidays(year))
+        self.holidays = np.array(sorted(days), dtype='datetime64[D]')
+        self.busdaycal = np.busdaycalendar(weekmask=WEEKMASK, holidays=self.holidays)
+
+    def roll_forward(self, days):
+        """First business day on or after each datetime64[D] value (NaT stays NaT)."""
+        days = np.asarray(days, dtype='datetime64[D]')
+        out = np.full(days.shape, np.datetime64('NaT'), dtype='datetime64[D]')
+        valid = ~np.isnat(days)
+        out[valid] = np.busday_offset(days[valid], 0, roll='forward', busdaycal=self.busdaycal)
+        return out
+
+@lru_cache(maxsize=16)
+def get_calendar(first_year, last_year, holidays=True):
+    return BusinessCalendar(first_year, last_year, holidays)
+
+def _calendar_for(days, holidays=True):
+    """Calendar spanning `days` plus the following year (ship dates roll over New Year)."""
+    valid = days[~np.isnat(days)]
+    if not valid.size: return get_calendar(1970, 1970, holidays)
+    years = valid.astype('datetime64[Y]').astype(int) + 1970
+    return get_calendar(int(years.min()), int(years.max()) + 1, holidays)
+
+def _calendar_days(values):
+    """Wall-clock calendar day (datetime64[D]) of each value; unparseable values become NaT."""
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if isinstance(series.dtype, pd.DatetimeTZDtype): series = series.dt.tz_localize(None)
+    if not pd.api.types.is_datetime64_dtype(series.dtype):
+        def one(v):
+            if pd.isna(v): return pd.NaT
+            try: return pd.Timestamp(v.date() if isinstance(v, datetime) else v).tz_localize(None).normalize()
+            except Exception: return pd.NaT
+        series = pd.to_datetime(series.map(one))
+    return series.to_numpy(dtype='datetime64[D]')
+
+def ship_dates(order_dates, lead_time_days=DEFAULT_LEAD_TIME_DAYS):
+    """Order date + lead time, rolled forward past weekends and holidays, for a whole column."""
+    order_days = _calendar_days(order_dates)
+    target = order_days + np.timedelta64(lead_time_days, 'D')
+    calendar = _calendar_for(target, holidays=True)
+    index = order_dates.index if isinstance(order_dates, pd.Series) else None
+    return pd.Series(calendar.roll_forward(target).astype('datetime64[s]'), index=index)
+
+def ship_date(order_date, lead_time_days=DEFAULT_LEAD_TIME_DAYS):
+    if pd.isna(order_date): return pd.NaT
+    return ship_dates([order_date], lead_time_days).iloc[0]
+
+def next_weekday(value):
+    """`value` moved forward to Monday if it falls on a weekend (time of day and type kept)."""
+    day = np.datetime64(value.date() if isinstance(value, datetime) else value, 'D')
+    shift = np.busday_offset(day, 0, roll='forward', weekmask=WEEKMASK) - day
+    return value + timedelta(days=int(shift.astype(int)))
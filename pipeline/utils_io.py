@@ -0,0 +1,359 @@
+# utils_io.py
+import os
+import glob
+import hashlib
+import json
+import shutil
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from pandas.api.types import infer_dtype, is_bool_dtype, is_float_dtype, is_numeric_dtype
+
+import utils_ui
+
+# --- CONSTANTS ---
+WORKBOOK_CACHE_LIMIT = 32 # Parsed sheets kept per process
+FRAMES_SUFFIX = ".frames" # Columnar sidecar: <name>.frames/ next to <name>.xlsx
+FRAMES_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+# Excel export of stage handoffs (the .xlsx files are for people; stages read the frames)
+EXCEL_EXPORT_ENV = "PIPELINE_EXCEL_EXPORT"
+EXCEL_EXPORT_SYNC = "sync"             # Write the .xlsx before the stage continues
+EXCEL_EXPORT_BACKGROUND = "background" # Write it on a worker thread
+EXCEL_EXPORT_OFF = "off"               # Frames only
+EXCEL_EXPORT_MODES = (EXCEL_EXPORT_SYNC, EXCEL_EXPORT_BACKGROUND, EXCEL_EXPORT_OFF)
+
+_WORKBOOK_CACHE = OrderedDict()
+_EXPORTS = {}
+_EXPORTS_LOCK = threading.Lock()
+
+# --- EXPORT SETTINGS ---
+def set_excel_export(mode):
+    """Sets the export mode for this process and any stage it launches."""
+    if mode not in EXCEL_EXPORT_MODES:
+        raise ValueError(f"Unknown excel_export '{mode}' (expected one of {', '.join(EXCEL_EXPORT_MODES)})")
+    os.environ[EXCEL_EXPORT_ENV] = mode
+
+def excel_export_mode():
+    mode = os.environ.get(EXCEL_EXPORT_ENV, EXCEL_EXPORT_SYNC)
+    return mode if mode in EXCEL_EXPORT_MODES else EXCEL_EXPORT_SYNC
+
+# --- PATHS ---
+def frames_path(path):
+    """The columnar sidecar directory for workbook `path`."""
+    return os.path.splitext(path)[0] + FRAMES_SUFFIX
+
+def workbook_exists(path):
+    return os.path.exists(os.path.join(frames_path(path), MANIFEST_NAME)) or os.path.exists(path)
+
+def _version_path(path):
+    manifest = os.path.join(frames_path(path), MANIFEST_NAME)
+    return manifest if os.path.exists(manifest) else path
+
+def find_workbooks(*patterns):
+    """
+    Glob for workbooks (e.g. 'dir/MarcomOrderDate*.xlsx') that matches either the
+    .xlsx or its frames, so it works whatever the export mode. Newest first.
+    """
+    found = set()
+    for pattern in patterns:
+        base = os.path.splitext(pattern)[0]
+        found.update(glob.glob(base + ".xlsx"))
+        found.update(os.path.splitext(d)[0] + ".xlsx" for d in glob.glob(base + FRAMES_SUFFIX) if os.path.isdir(d))
+    return sorted(found, key=lambda p: os.path.getmtime(_version_path(p)), reverse=True)
+
+def move_workbook(src, dst):
+    """Moves a workbook's frames and .xlsx (once any pending export has finished)."""
+    wait_for_exports(src)
+    moved = False
+    if os.path.isdir(frames_path(src)):
+        if os.path.isdir(frames_path(dst)): shutil.rmtree(frames_path(dst))
+        shutil.move(frames_path(src), frames_path(dst)); moved = True
+    if os.path.exists(src):
+        shutil.move(src, dst); moved = True
+    if not moved: raise FileNotFoundError(f"Workbook not found: {src}")
+    return dst
+
+# --- EXCEL SEMANTICS ---
+def _is_integral(v):
+    return isinstance(v, float) and v.is_integer()
+
+def _excel_like(df):
+    """
+    Applies the value changes an .xlsx round trip makes, so frames read back the way
+    the exported workbook does: empty strings become missing, whole-number floats
+    without gaps become ints, dates become datetimes, all-empty columns become float
+    and the columns of a sheet without rows become object.
+    Columns that mix text and numbers are stored as text. Returns (df, text_columns).
+    """
+    df = df.reset_index(drop=True)
+    df.columns = [str(c) for c in df.columns]
+    text_columns = []
+    if df.empty: return df.astype(object), text_columns
+    for col in df.columns:
+        s = df[col]
+        if is_bool_dtype(s) or (is_numeric_dtype(s) and not is_float_dtype(s)): continue
+        if is_float_dtype(s):
+            if len(s) and s.notna().all() and (s == s.round()).all() and s.abs().max() < 2**53:
+                df[col] = s.astype("int64")
+            continue
+        if not (s.dtype == object or pd.api.types.is_string_dtype(s)): continue
+
+        s = s.mask(s.eq("") if s.dtype != object else s.map(lambda v: isinstance(v, str) and v == ""))
+        values = s.dropna()
+        if values.empty:
+            df[col] = pd.Series(float("nan"), index=s.index); continue
+        kind = infer_dtype(values, skipna=True)
+        if kind in ("date", "datetime", "datetime64"):
+            df[col] = pd.to_datetime(s).astype("datetime64[us]"); continue
+        if kind in ("string", "boolean"):
+            df[col] = s; continue
+        if kind in ("integer", "floating", "mixed-integer-float"):
+            df[col] = pd.to_numeric(s)
+            if df[col].notna().all() and (df[col] == df[col].round()).all(): df[col] = df[col].astype("int64")
+            continue
+        # Mixed text/number cells: keep the cell text (ints without a trailing .0, as Excel shows them)
+        df[col] = s.map(lambda v: v if pd.isna(v) else str(int(v)) if _is_integral(v) else str(v))
+        text_columns.append(col)
+    return df, text_columns
+
+def _excel_text(s):
+    """Column as read_excel(dtype=str) returns it: whole-number cells without '.0', gaps kept."""
+    if is_bool_dtype(s) or not is_numeric_dtype(s) or not is_float_dtype(s):
+        return s.map(lambda v: v if pd.isna(v) else str(v)).astype(str)
+    return s.map(lambda v: v if pd.isna(v) else str(int(v)) if _is_integral(v) else str(v)).astype(str)
+
+def _resolve_dtype(dtype, columns):
+    """A per-column dtype function (column -> type or None) as the dict read_excel takes."""
+    if not callable(dtype) or isinstance(dtype, type): return dtype
+    return {c: kind for c in columns if (kind := dtype(c)) is not None}
+
+def _apply_dtype(df, dtype):
+    if dtype is None: return df
+    dtype = _resolve_dtype(dtype, df.columns)
+    targets = dtype if isinstance(dtype, dict) else {c: dtype for c in df.columns}
+    for col, kind in targets.items():
+        if col in df.columns:
+            df[col] = _excel_text(df[col]) if kind is str else df[col].astype(kind)
+    return df
+
+# --- WRITING ---
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f: json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+def write_workbook(path, sheets, export=None):
+    """
+    Writes {sheet_name: DataFrame} as the stage handoff for `path`: one Parquet file
+    per sheet under <name>.frames/ plus a manifest of sheet order and columns. The
+    .xlsx itself is an export for people, written per `export` (default: the
+    PIPELINE_EXCEL_EXPORT setting). Returns `path`.
+    """
+    export = export or excel_export_mode()
+    wait_for_exports(path)
+    target = frames_path(path)
+    staging = os.path.join(os.path.dirname(target) or ".", f".{os.path.basename(target)}.{os.getpid()}.tmp")
+    if os.path.isdir(staging): shutil.rmtree(staging)
+    os.makedirs(staging)
+
+    frames = OrderedDict(); manifest = {'version': FRAMES_VERSION, 'sheets': [], 'excel': None}
+    for i, (name, df) in enumerate(sheets.items()):
+        frame, text_columns = _excel_like(df)
+        file_name = f"{i:03d}.parquet"
+        frame.to_parquet(os.path.join(staging, file_name), index=False)
+        manifest['sheets'].append({'name': str(name), 'file': file_name, 'columns': list(frame.columns),
+                                   'rows': len(frame), 'text_columns': text_columns})
+        frames[str(name)] = frame
+    _write_json(os.path.join(staging, MANIFEST_NAME), manifest)
+
+    if os.path.isdir(target): shutil.rmtree(target)
+    os.replace(staging, target)
+    if os.path.exists(path): os.remove(path) # A stale export must not outlive the frames it came from
+
+    if export == EXCEL_EXPORT_SYNC:
+        _export_excel(path, frames)
+    elif export == EXCEL_EXPORT_BACKGROUND:
+        worker = threading.Thread(target=_export_excel, args=(path, frames), name=f"export-{os.path.basename(path)}")
+        with _EXPORTS_LOCK: _EXPORTS[os.path.abspath(path)] = worker
+        worker.start()
+    return path
+
+def _export_excel(path, frames):
+    tmp = os.path.join(os.path.dirname(path) or ".", f".{os.getpid()}.{os.path.basename(path)}")
+    try:
+        with pd.ExcelWriter(tmp, engine='openpyxl') as writer:
+            if not frames: pd.DataFrame().to_excel(writer, index=False)
+            for name, df in frames.items(): df.to_excel(writer, sheet_name=name, index=False)
+        os.replace(tmp, path)
+        # Recorded so a later hand edit of the .xlsx can be told apart from the export
+        manifest_path = os.path.join(frames_path(path), MANIFEST_NAME)
+        with open(manifest_path) as f: manifest = json.load(f)
+        st = os.stat(path)
+        manifest['excel'] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+        _write_json(manifest_path, manifest)
+    except Exception as e:
+        if os.path.exists(tmp): os.remove(tmp)
+        utils_ui.print_warning(f"Excel export failed for {os.path.basename(path)}: {e}")
+
+def wait_for_exports(path=None):
+    """Blocks until the background export of `path` (or of every workbook) has finished."""
+    with _EXPORTS_LOCK:
+        if path is None: workers = list(_EXPORTS.values()); _EXPORTS.clear()
+        else: workers = [w for w in [_EXPORTS.pop(os.path.abspath(path), None)] if w]
+    for worker in workers: worker.join()
+
+def ensure_excel_export(path):
+    """Makes sure the .xlsx for `path` exists (e.g. before attaching it), exporting it from the frames if needed."""
+    wait_for_exports(path)
+    if not os.path.exists(path) and os.path.isdir(frames_path(path)):
+        _export_excel(path, read_workbook(path))
+    return os.path.exists(path)
+
+# --- READING ---
+def _read_source(path):
+    """('frames', manifest) for the columnar handoff, or ('excel', None) for a plain or hand-edited workbook."""
+    manifest_path = os.path.join(frames_path(path), MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        if not os.path.exists(path): raise FileNotFoundError(f"Workbook not found: {path}")
+        return 'excel', None
+    with open(manifest_path) as f: manifest = json.load(f)
+    exported = manifest.get('excel')
+    if exported and os.path.exists(path) and os.path.abspath(path) not in _EXPORTS:
+        st = os.stat(path)
+        if (st.st_mtime_ns, st.st_size) != (exported['mtime_ns'], exported['size']):
+            utils_ui.print_warning(f"{os.path.basename(path)} was edited after export; reading the workbook instead of its frames.")
+            return 'excel', None
+    return 'frames', manifest
+
+def _wanted(name, sheets):
+    if sheets is None: return True
+    if callable(sheets): return sheets(name)
+    return name in sheets
+
+def read_workbook(path, dtype=None, sheets=None, columns=None):
+    """
+    Loads a workbook as {sheet_name: DataFrame}, in sheet order. Reads the Parquet
+    frames when present, else the .xlsx. `sheets` (names or a predicate) and `columns`
+    limit what is loaded; absent sheets/columns are skipped. `dtype` follows
+    read_excel, or is a function column -> type (None leaves it as read). Parses are cached per file version, so stages that run in the same
+    process share them. Callers always get their own copies.
+    """
+    kind, manifest = _read_source(path)
+    version_path = os.path.join(frames_path(path), MANIFEST_NAME) if kind == 'frames' else path
+    st = os.stat(version_path)
+    version = (os.path.abspath(path), kind, st.st_mtime_ns, st.st_size, repr(dtype), tuple(columns) if columns else None)
+
+    result = {}
+    if kind == 'frames':
+        for sheet in manifest['sheets']:
+            if not _wanted(sheet['name'], sheets): continue
+            key = version + (sheet['name'],)
+            df = _cache_get(key)
+            if df is None:
+                use = [c for c in sheet['columns'] if c in columns] if columns else None
+                df = pd.read_parquet(os.path.join(frames_path(path), sheet['file']), columns=use)
+                df = _cache_put(key, _apply_dtype(df, dtype))
+            result[sheet['name']] = df.copy()
+        return result
+
+    usecols = (lambda c: c in columns) if columns else None
+    with pd.ExcelFile(path) as xl:
+        for name in xl.sheet_names:
+            if not _wanted(name, sheets): continue
+            key = version + (name,)
+            df = _cache_get(key)
+            if df is None:
+                kinds = _resolve_dtype(dtype, xl.parse(name, nrows=0, usecols=usecols).columns) if callable(dtype) else dtype
+                df = _cache_put(key, xl.parse(name, dtype=kinds, usecols=usecols))
+            result[name] = df.copy()
+    return result
+
+def read_sheet(path, sheet=0, dtype=None, columns=None):
+    """A single sheet of a workbook, by name or position (default: the first)."""
+    if isinstance(sheet, int):
+        kind, manifest = _read_source(path)
+        if kind == 'frames': sheet = manifest['sheets'][sheet]['name']
+        else:
+            with pd.ExcelFile(path) as xl: sheet = xl.sheet_names[sheet]
+    return read_workbook(path, dtype=dtype, sheets=[sheet], columns=columns)[sheet]
+
+def _cache_get(key):
+    df = _WORKBOOK_CACHE.get(key)
+    if df is not None: _WORKBOOK_CACHE.move_to_end(key)
+    return df
+
+def _cache_put(key, df):
+    _WORKBOOK_CACHE[key] = df
+    while len(_WORKBOOK_CACHE) > WORKBOOK_CACHE_LIMIT: _WORKBOOK_CACHE.popitem(last=False)
+    return df
+
+def clear_workbook_cache():
+    _WORKBOOK_CACHE.clear()
+
+# --- PARSE CACHE ---
+PARSE_CACHE_DIR_NAME = "_PARSE_CACHE" # Next to the staging dir
+PARSE_CACHE_MAX_MB = 1024
+_HASH_BLOCK = 1 << 20
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""): digest.update(block)
+    return digest.hexdigest()
+
+class ParseCache:
+    """
+    Parsed source files as Parquet, keyed by the source's content hash and the parser's
+    name/version (bump the version whenever the parser's output changes). Hits refresh
+    the entry's mtime; evict() drops least recently used entries past max_mb.
+    """
+    def __init__(self, folder, max_mb=PARSE_CACHE_MAX_MB):
+        self.folder = folder
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+    def key(self, path, parser, version):
+        return f"{parser}-v{version}-{file_digest(path)}"
+
+    def _entry(self, key): return os.path.join(self.folder, key + ".parquet")
+
+    def get(self, key):
+        entry = self._entry(key)
+        try:
+            df = pd.read_parquet(entry)
+            os.utime(entry)
+            return df
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            utils_ui.print_warning(f"Ignoring unreadable parse cache entry {os.path.basename(entry)}: {e}")
+            return None
+
+    def put(self, key, df):
+        entry = self._entry(key)
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, entry)
+        except Exception as e:
+            utils_ui.print_warning(f"Could not cache parsed {key.split('-')[0]} file: {e}")
+            if os.path.exists(tmp): os.remove(tmp)
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits max_mb. Returns the count removed."""
+        entries = []
+        for entry in glob.glob(os.path.join(self.folder, "*.parquet")):
+            try: st = os.stat(entry)
+            except FileNotFoundError: continue
+            entries.append((st.st_mtime, st.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes: break
+            try: os.remove(entry)
+            except FileNotFoundError: pass
+            total -= size; removed += 1
+        return removed
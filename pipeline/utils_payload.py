@@ -0,0 +1,119 @@
+# utils_payload.py
+# Reader for the Python-literal dicts Marcom embeds in JobTickets XML items, e.g.
+#   {'ID': 1, 'JobTicketNumber': '500001-01', 'CreateDate': datetime.datetime(2025, 1, 6, 9, 30), ...}
+# Only the requested keys are decoded; every other value is skipped without being built.
+import ast
+import re
+import datetime
+from datetime import date, timedelta
+
+# Callables/attributes the payloads use (the names the old eval context exposed)
+PAYLOAD_NAMES = {
+    'datetime.datetime': datetime.datetime, 'datetime.date': datetime.date, 'datetime.time': datetime.time,
+    'datetime.timedelta': datetime.timedelta, 'datetime.timezone': datetime.timezone,
+    'datetime.timezone.utc': datetime.timezone.utc, 'date': date, 'timedelta': timedelta,
+}
+PAYLOAD_CONSTANTS = {'True': True, 'False': False, 'None': None}
+
+_WS = re.compile(r"\s*")
+_STRING = "|".join([ # Python string literals: triple-quoted first, then single-line
+    r"'''(?:[^\\]|\\.)*?'''", r'"""(?:[^\\]|\\.)*?"""', r"'(?:[^'\\\n]|\\.)*'", r'"(?:[^"\\\n]|\\.)*"',
+])
+_KEY = re.compile(r"[rRbBuU]{0,2}(?:" + _STRING + ")", re.S)
+# Runs of value text and whole strings, stopping at the next bracket (and, at the value's own level, comma)
+_RUN_TOP = re.compile(r"(?:[^'\"{}\[\](),]+|" + _STRING + ")*", re.S)
+_RUN_NESTED = re.compile(r"(?:[^'\"{}\[\]()]+|" + _STRING + ")*", re.S)
+_CLOSERS = {')': '(', ']': '[', '}': '{'}
+
+def _skip_value(text, pos):
+    """End index of the value starting at `pos`: the ',' or closing bracket that follows it."""
+    stack = []
+    while True:
+        pos = (_RUN_NESTED if stack else _RUN_TOP).match(text, pos).end()
+        if pos >= len(text): raise ValueError("Unexpected end of payload")
+        ch = text[pos]
+        if ch in "([{":
+            stack.append(ch); pos += 1
+        elif ch in ")]}":
+            if not stack: return pos
+            if stack.pop() != _CLOSERS[ch]: raise ValueError(f"Mismatched '{ch}' at {pos}")
+            pos += 1
+        elif ch == ',': # At the value's own level
+            return pos
+        else:
+            raise ValueError(f"Unterminated string at {pos}")
+
+def _name(node):
+    if isinstance(node, ast.Name): return node.id
+    if isinstance(node, ast.Attribute): return f"{_name(node.value)}.{node.attr}"
+    raise ValueError(f"Unsupported expression: {ast.dump(node)}")
+
+def _evaluate(node):
+    """Literals, containers and the whitelisted date/time constructors; anything else is rejected."""
+    if isinstance(node, ast.Constant): return node.value
+    if isinstance(node, ast.Dict): return {_evaluate(k): _evaluate(v) for k, v in zip(node.keys, node.values)}
+    if isinstance(node, ast.List): return [_evaluate(v) for v in node.elts]
+    if isinstance(node, ast.Tuple): return tuple(_evaluate(v) for v in node.elts)
+    if isinstance(node, ast.Set): return {_evaluate(v) for v in node.elts}
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _evaluate(node.operand)
+        if isinstance(value, (int, float, complex)): return -value if isinstance(node.op, ast.USub) else +value
+    if isinstance(node, ast.Call):
+        func = PAYLOAD_NAMES.get(_name(node.func))
+        if callable(func):
+            return func(*[_evaluate(a) for a in node.args], **{k.arg: _evaluate(k.value) for k in node.keywords})
+    if isinstance(node, (ast.Name, ast.Attribute)):
+        name = _name(node)
+        if name in PAYLOAD_CONSTANTS: return PAYLOAD_CONSTANTS[name]
+        if name in PAYLOAD_NAMES and not callable(PAYLOAD_NAMES[name]): return PAYLOAD_NAMES[name]
+    raise ValueError(f"Unsupported expression: {ast.dump(node)}")
+
+def literal_value(source):
+    """Safely decodes one payload value (the text between ':' and the next ',')."""
+    source = source.strip()
+    if source == 'None': return None
+    if len(source) >= 2 and source[0] == source[-1] and source[0] in "'\"" and '\\' not in source and source[0] not in source[1:-1]:
+        return source[1:-1] # Plain quoted string, the common case
+    return _evaluate(ast.parse(source, mode='eval').body)
+
+def extract_fields(text, wanted, pos=0):
+    """
+    Decodes only the `wanted` keys of the dict literal at `text[pos:]`. `wanted` maps
+    key -> None (decode the value) or a nested `wanted` dict (the value is a dict or None,
+    read the same way). Returns {key: value} for the keys present; scanning stops once
+    every wanted key has been seen.
+    """
+    found = {}
+    pos = _WS.match(text, pos).end()
+    if text[pos:pos + 1] != '{': raise ValueError("Payload is not a dict literal")
+    pos += 1
+    while True:
+        pos = _WS.match(text, pos).end()
+        if text[pos:pos + 1] == '}': return found
+        m = _KEY.match(text, pos)
+        if not m: raise ValueError(f"Expected a string key at {pos}")
+        key = literal_value(m.group(0))
+        pos = _WS.match(text, m.end()).end()
+        if text[pos:pos + 1] != ':': raise ValueError(f"Expected ':' at {pos}")
+        start = _WS.match(text, pos + 1).end()
+        end = _skip_value(text, start)
+
+        if key in wanted:
+            nested = wanted[key]
+            value_text = text[start:end]
+            if nested is None: found[key] = literal_value(value_text)
+            elif value_text.strip() == 'None': found[key] = None
+            else: found[key] = extract_fields(value_text, nested)
+            if len(found) == len(wanted): return found # The rest is never read
+
+        if text[end] == ',': pos = end + 1
+        elif text[end] == '}': return found
+        else: raise ValueError(f"Unexpected '{text[end]}' at {end}")
+
+def extract_batch(texts, wanted):
+    """extract_fields over a list of payloads (one pool task). A payload that fails comes back as its exception."""
+    results = []
+    for text in texts:
+        try: results.append(extract_fields(text, wanted))
+        except (ValueError, SyntaxError, TypeError, IndexError) as e: results.append(e)
+    return results
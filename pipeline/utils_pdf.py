@@ -0,0 +1,232 @@
+import bisect
+import hashlib
+
+from pypdf import PageObject
+from pypdf.generic import (
+    ArrayObject, DecodedStreamObject, DictionaryObject, IndirectObject, NameObject,
+    NumberObject, RectangleObject, StreamObject,
+)
+
+# --- CARD SEQUENCES ---
+class CardSequence:
+    """
+    Run-length description of the page stream a gang-run stack is built from.
+    Each run repeats a short cycle of card keys (e.g. front/back) for `length` pages,
+    so a 4000-qty job is one entry instead of 8000 expanded pages.
+    """
+    def __init__(self):
+        self._starts = []
+        self._runs = []
+        self.total = 0
+
+    def add_run(self, cards, length):
+        if length <= 0 or not cards: return
+        self._starts.append(self.total)
+        self._runs.append(tuple(cards))
+        self.total += length
+
+    def card_at(self, index):
+        if index < 0 or index >= self.total: raise IndexError(index)
+        run = bisect.bisect_right(self._starts, index) - 1
+        cards = self._runs[run]
+        return cards[(index - self._starts[run]) % len(cards)]
+
+    def __len__(self):
+        return self.total
+
+def stack_order(total_pages, cards_per_sheet):
+    """
+    Yields (sheet_idx, slot, p_idx) in stack order: each slot holds a contiguous
+    stack of the source, so p_idx = slot * num_sheets + sheet_idx.
+    """
+    num_sheets = -(-total_pages // cards_per_sheet)
+    for sheet_idx in range(num_sheets):
+        for slot in range(cards_per_sheet):
+            p_idx = (slot * num_sheets) + sheet_idx
+            if p_idx < total_pages:
+                yield sheet_idx, slot, p_idx
+
+# --- FORM XOBJECTS ---
+def page_to_form_xobject(writer, page, bbox=None):
+    """
+    Wraps a page's content and resources as a Form XObject owned by `writer` and
+    returns its indirect reference. The content is encoded once, however often it is drawn.
+    `bbox` (page coordinates) clips the form; it defaults to the page's mediabox.
+    """
+    form = DecodedStreamObject()
+    contents = page.get_contents()
+    form.set_data(contents.get_data() if contents is not None else b"")
+    form[NameObject("/Type")] = NameObject("/XObject")
+    form[NameObject("/Subtype")] = NameObject("/Form")
+    form[NameObject("/BBox")] = RectangleObject(bbox if bbox is not None else page.mediabox)
+    resources = page.get("/Resources")
+    if resources is not None:
+        form[NameObject("/Resources")] = resources.get_object().clone(writer)
+    return writer._add_object(form.flate_encode())
+
+def _stable_key(obj, source):
+    """Hashable form of a PDF value, with indirect references qualified by `source`."""
+    if isinstance(obj, IndirectObject): return (source, obj.idnum, obj.generation)
+    if isinstance(obj, dict): return tuple(sorted((k, _stable_key(v, source)) for k, v in obj.items()))
+    if isinstance(obj, list): return tuple(_stable_key(v, source) for v in obj)
+    return repr(obj)
+
+def page_content_key(page, source):
+    """
+    Identity of what a page draws: a digest of its content plus its resources and
+    mediabox. Pages repeated by reference (or copied verbatim) share a key, so they
+    can share one Form XObject. `source` names the file the page came from, since
+    object numbers are only unique within one file.
+    """
+    contents = page.get_contents()
+    digest = hashlib.sha1(contents.get_data() if contents is not None else b"").hexdigest()
+    # Unresolved, so shared resources compare by reference
+    res_key = _stable_key(page.raw_get("/Resources"), source) if "/Resources" in page else None
+    return digest, res_key, tuple(float(v) for v in page.mediabox)
+
+def placement_ops(placements, names=None):
+    """
+    Content operators drawing each (xobject_ref, tx, ty) placement with a single
+    `cm` + `Do`. Returns (ops, names) where names maps idnum -> (resource name, ref).
+    """
+    names = {} if names is None else names
+    ops = []
+    for ref, tx, ty in placements:
+        name = names.setdefault(ref.idnum, (f"/Fx{len(names)}", ref))[0]
+        ops.append(f"q 1 0 0 1 {tx:.4f} {ty:.4f} cm {name} Do Q")
+    return ops, names
+
+def add_xobject_sheet(writer, width, height, placements):
+    """
+    Adds a page to `writer` that draws each placement with placement_ops, so the
+    sheet content stays a few hundred bytes.
+    """
+    sheet = PageObject.create_blank_page(width=width, height=height)
+    ops, names = placement_ops(placements)
+
+    xobjects = DictionaryObject({NameObject(name): ref for name, ref in names.values()})
+    sheet[NameObject("/Resources")] = DictionaryObject({NameObject("/XObject"): xobjects})
+    content = DecodedStreamObject()
+    content.set_data("\n".join(ops).encode("latin-1"))
+    sheet[NameObject("/Contents")] = writer._add_object(content.flate_encode())
+    return writer.add_page(sheet)
+
+# --- STREAMING WRITER ---
+class StreamingPdfWriter:
+    """
+    Minimal PDF writer that serializes every object to disk as soon as it is added,
+    so memory does not grow with the page count. Objects imported from source files
+    are renumbered once per (source, object) and reused by reference afterwards.
+    Only the page references and the xref offsets are kept until close().
+    """
+    def __init__(self, path):
+        self.path = path
+        self._stream = open(path, "wb")
+        self._stream.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+        self._offsets = []
+        self._imported = {}
+        self._pending = []
+        self._page_refs = []
+        self._sources = 0
+        self._pages_ref = self._reserve()
+
+    def __enter__(self): return self
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None: self.close()
+        else: self._stream.close()
+
+    def __len__(self):
+        return len(self._page_refs)
+
+    def _reserve(self):
+        self._offsets.append(None)
+        return IndirectObject(len(self._offsets), 0, None)
+
+    def _write(self, ref, obj):
+        self._offsets[ref.idnum - 1] = self._stream.tell()
+        self._stream.write(f"{ref.idnum} 0 obj\n".encode())
+        obj.write_to_stream(self._stream)
+        self._stream.write(b"\nendobj\n")
+
+    def add_object(self, obj):
+        ref = self._reserve()
+        self._write(ref, obj)
+        return ref
+
+    def new_source(self):
+        """A fresh source key for pages that do not come from a file (e.g. in-memory readers)."""
+        self._sources += 1
+        return ("memory", self._sources)
+
+    def import_object(self, obj, source):
+        """Copies a value from a source file, writing any objects it references that are not yet in the output."""
+        value = self._copy(obj, source)
+        while self._pending:
+            ref, original, original_source = self._pending.pop()
+            self._write(ref, self._copy(original, original_source))
+        return value
+
+    def _copy(self, obj, source):
+        if isinstance(obj, IndirectObject):
+            key = (source, obj.idnum, obj.generation)
+            ref = self._imported.get(key)
+            if ref is None:
+                ref = self._imported[key] = self._reserve()
+                self._pending.append((ref, obj.get_object(), source))
+            return ref
+        if isinstance(obj, StreamObject):
+            new = obj.__class__()
+            new._data = obj._data
+            for k, v in obj.items():
+                if k != "/Length": new[k] = self._copy(v, source)
+            return new
+        if isinstance(obj, DictionaryObject):
+            new = DictionaryObject()
+            for k, v in obj.items():
+                if k != "/Parent": new[k] = self._copy(v, source)
+            return new
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._copy(v, source) for v in obj)
+        return obj
+
+    def add_form(self, page, bbox=None, source=None):
+        """Streaming counterpart of page_to_form_xobject."""
+        form = DecodedStreamObject()
+        contents = page.get_contents()
+        form.set_data(contents.get_data() if contents is not None else b"")
+        form[NameObject("/Type")] = NameObject("/XObject")
+        form[NameObject("/Subtype")] = NameObject("/Form")
+        form[NameObject("/BBox")] = RectangleObject(bbox if bbox is not None else page.mediabox)
+        if "/Resources" in page:
+            form[NameObject("/Resources")] = self.import_object(page.raw_get("/Resources"), source or self.new_source())
+        return self.add_object(form.flate_encode())
+
+    def add_page(self, width, height, content, resources):
+        """Writes a page with the given content bytes and resources dictionary."""
+        stream = DecodedStreamObject()
+        stream.set_data(content)
+        page = DictionaryObject({
+            NameObject("/Type"): NameObject("/Page"),
+            NameObject("/Parent"): self._pages_ref,
+            NameObject("/MediaBox"): RectangleObject((0, 0, width, height)),
+            NameObject("/Resources"): resources,
+            NameObject("/Contents"): self.add_object(stream.flate_encode()),
+        })
+        ref = self.add_object(page)
+        self._page_refs.append(ref)
+        return ref
+
+    def close(self):
+        self._write(self._pages_ref, DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Kids"): ArrayObject(self._page_refs),
+            NameObject("/Count"): NumberObject(len(self._page_refs)),
+        }))
+        root = self.add_object(DictionaryObject({NameObject("/Type"): NameObject("/Catalog"), NameObject("/Pages"): self._pages_ref}))
+
+        xref = self._stream.tell()
+        lines = [f"xref\n0 {len(self._offsets) + 1}\n", "0000000000 65535 f \n"]
+        lines += [f"{off:010d} 00000 n \n" for off in self._offsets]
+        lines.append(f"trailer\n<< /Size {len(self._offsets) + 1} /Root {root.idnum} 0 R >>\nstartxref\n{xref}\n%%EOF\n")
+        self._stream.write("".join(lines).encode())
+        self._stream.close()
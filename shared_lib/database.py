@@ -1,15 +1,26 @@
+import os
+import time
+import threading
+import weakref
+from contextlib import contextmanager
+
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
 from .config import get_env_var
 
+def connection_params():
+    return {
+        'dbname': get_env_var("DB_NAME", "marcom_production_suite"),
+        'user': get_env_var("DB_USER", "jimmyswindler"),
+        'host': get_env_var("DB_HOST", "localhost"),
+        'port': get_env_var("DB_PORT", "5432"),
+    }
+
 def get_db_connection():
+    """A new, unpooled connection (one-off scripts). Request handlers and stages use db_connection()."""
     try:
-        conn = psycopg2.connect(
-            dbname=get_env_var("DB_NAME", "marcom_production_suite"),
-            user=get_env_var("DB_USER", "jimmyswindler"),
-            host=get_env_var("DB_HOST", "localhost"),
-            port=get_env_var("DB_PORT", "5432")
-        )
+        conn = psycopg2.connect(**connection_params())
         return conn
     except Exception as e:
         print(f"DB Connection Error: {e}")
@@ -17,3 +28,144 @@ def get_db_connection():
 
 def get_real_dict_cursor(conn):
     return conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+_prepared = weakref.WeakKeyDictionary() # conn -> statement names PREPAREd on it
+
+def execute_prepared(cur, name, sql, params=()):
+    """
+    Runs `sql` (written with $1, $2... placeholders) as a server-side prepared statement.
+    It is PREPAREd once per connection; pooled connections outlive requests, so repeat
+    calls skip parsing and planning. A reconnected (new) connection prepares it again.
+    """
+    names = _prepared.setdefault(cur.connection, set())
+    if name not in names:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        names.add(name)
+    args = f"({', '.join(['%s'] * len(params))})" if params else ""
+    cur.execute(f"EXECUTE {name}{args}", tuple(params))
+
+# --- CONNECTION POOL ---
+# One pool per process. Connections are checked out with `with db_connection() as conn:` and
+# always come back: rolled back if left mid-transaction, discarded if broken (e.g. Postgres
+# restarted), so the next checkout reconnects. Sized by env vars:
+DB_POOL_MIN = int(get_env_var("DB_POOL_MIN", "1"))                # Opened up front and kept idle
+DB_POOL_MAX = int(get_env_var("DB_POOL_MAX", "10"))               # Checked out at once; further callers wait
+DB_POOL_TIMEOUT = float(get_env_var("DB_POOL_TIMEOUT", "10"))     # Seconds to wait for a free connection
+DB_POOL_HEALTHCHECK_SECS = float(get_env_var("DB_POOL_HEALTHCHECK_SECS", "5")) # Idle longer than this: SELECT 1 before reuse
+DB_CONNECT_TIMEOUT = int(get_env_var("DB_CONNECT_TIMEOUT", "5"))
+
+class DatabaseUnavailable(Exception):
+    """No connection could be checked out (database down, or the pool stayed exhausted)."""
+
+class ConnectionPool:
+    def __init__(self, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, timeout=DB_POOL_TIMEOUT,
+                 healthcheck_secs=DB_POOL_HEALTHCHECK_SECS, **params):
+        self.minconn, self.maxconn = minconn, maxconn
+        self.timeout, self.healthcheck_secs = timeout, healthcheck_secs
+        self.params = {'connect_timeout': DB_CONNECT_TIMEOUT, **(params or connection_params())}
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._idle = [] # (conn, last returned, monotonic)
+        self._in_use = 0
+        self.stats = {'checkouts': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0, 'timeouts': 0,
+                      'connections_opened': 0, 'connections_discarded': 0, 'health_check_failures': 0}
+        for _ in range(minconn): # Best effort: a database that is down now is retried on checkout
+            try: self._idle.append((self._connect(), time.monotonic()))
+            except psycopg2.Error: break
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.params)
+        with self._lock: self.stats['connections_opened'] += 1
+        return conn
+
+    def _discard(self, conn):
+        with self._lock: self.stats['connections_discarded'] += 1
+        try: conn.close()
+        except psycopg2.Error: pass
+
+    def _healthy(self, conn, last_used):
+        if conn.closed: return False
+        if time.monotonic() - last_used < self.healthcheck_secs: return True
+        try:
+            with conn.cursor() as cur: cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        while True:
+            with self._lock: item = self._idle.pop() if self._idle else None # Most recently used first
+            if item is None: return self._connect()
+            conn, last_used = item
+            if self._healthy(conn, last_used): return conn
+            with self._lock: self.stats['health_check_failures'] += 1
+            self._discard(conn)
+
+    def acquire(self):
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock: self.stats['timeouts'] += 1
+            raise DatabaseUnavailable(f"No database connection free after {self.timeout}s (pool max {self.maxconn})")
+        waited = time.monotonic() - start
+        try:
+            conn = self._checkout()
+        except psycopg2.Error as e:
+            self._slots.release()
+            raise DatabaseUnavailable(f"DB Connection Error: {e}") from e
+        with self._lock:
+            self._in_use += 1
+            self.stats['checkouts'] += 1
+            self.stats['wait_seconds_total'] += waited
+            self.stats['wait_seconds_max'] = max(self.stats['wait_seconds_max'], waited)
+        return conn
+
+    def release(self, conn, broken=False):
+        try:
+            if not broken and not conn.closed:
+                status = conn.info.transaction_status
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN: broken = True
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE: conn.rollback()
+        except psycopg2.Error:
+            broken = True
+        if broken or conn.closed:
+            self._discard(conn)
+        else:
+            with self._lock: self._idle.append((conn, time.monotonic()))
+        with self._lock: self._in_use -= 1
+        self._slots.release()
+
+    def metrics(self):
+        with self._lock:
+            snapshot = dict(self.stats, in_use=self._in_use, idle=len(self._idle), min_size=self.minconn, max_size=self.maxconn)
+        snapshot['wait_seconds_avg'] = snapshot['wait_seconds_total'] / snapshot['checkouts'] if snapshot['checkouts'] else 0.0
+        return snapshot
+
+    def close(self):
+        with self._lock: idle, self._idle = self._idle, []
+        for conn, _ in idle: conn.close()
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """The process's pool, created on first use (and again in a forked child: sockets are not shared)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool, _pool_pid = ConnectionPool(), os.getpid()
+        return _pool
+
+@contextmanager
+def db_connection():
+    """Pooled connection for the duration of the block. Commit inside it; anything uncommitted is rolled back."""
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn) # A connection lost mid-block (closed by psycopg2) is discarded here
+
+def pool_metrics():
+    return get_pool().metrics()
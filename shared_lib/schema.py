@@ -0,0 +1,269 @@
+# schema.py
+# The production database schema, as an ordered list of migrations. apply_migrations() runs
+# the ones a database has not recorded in schema_migrations yet; every statement is also
+# idempotent (IF NOT EXISTS), so databases created by the older ad-hoc scripts (Stage 1b's
+# create_tables_if_not_exist, pipeline/create_shipments_table.py) migrate cleanly.
+# Run directly to migrate and then check the lookup queries use their indexes:
+#   python -m shared_lib.schema [--check]
+import sys
+import json
+import argparse
+
+# (version, description, sql). Append only: never edit a migration once it has shipped.
+MIGRATIONS = [
+    (1, "Order tables", """
+        CREATE TABLE IF NOT EXISTS orders (
+            id SERIAL PRIMARY KEY,
+            order_number TEXT UNIQUE,
+            order_date TIMESTAMP,
+            ship_date TIMESTAMP,
+            ship_to_company TEXT,
+            ship_to_name TEXT,
+            address1 TEXT, address2 TEXT, address3 TEXT, address4 TEXT,
+            city TEXT, state TEXT, zip TEXT, country TEXT
+        );
+        CREATE TABLE IF NOT EXISTS jobs (
+            id SERIAL PRIMARY KEY,
+            job_ticket_number TEXT UNIQUE,
+            order_id INTEGER REFERENCES orders(id),
+            project_description TEXT,
+            general_description TEXT,
+            paper_description TEXT,
+            press_instructions TEXT,
+            bindery_instructions TEXT,
+            shipping_instructions TEXT,
+            special_instructions TEXT
+        );
+        CREATE TABLE IF NOT EXISTS items (
+            id SERIAL PRIMARY KEY,
+            order_item_id TEXT UNIQUE,
+            job_id INTEGER REFERENCES jobs(id),
+            product_id TEXT,
+            product_name TEXT,
+            product_description TEXT,
+            sku TEXT,
+            sku_description TEXT,
+            quantity_ordered INTEGER,
+            cost_center TEXT,
+            file_url TEXT
+        );
+        CREATE TABLE IF NOT EXISTS item_boxes (
+            id SERIAL PRIMARY KEY,
+            order_item_id TEXT REFERENCES items(order_item_id) ON DELETE CASCADE,
+            box_sequence INT,
+            barcode_value TEXT,
+            UNIQUE(order_item_id, box_sequence)
+        );
+        -- Packing state, set by the shipping station
+        ALTER TABLE item_boxes ADD COLUMN IF NOT EXISTS status TEXT DEFAULT 'pending';
+        ALTER TABLE item_boxes ADD COLUMN IF NOT EXISTS packed_at TIMESTAMP;
+    """),
+    (2, "Shipping tables", """
+        CREATE TABLE IF NOT EXISTS shipments (
+            id SERIAL PRIMARY KEY,
+            job_ticket_number VARCHAR(50),
+            tracking_number VARCHAR(100),
+            marcom_sync_status VARCHAR(50) DEFAULT 'PENDING',
+            marcom_response_message TEXT,
+            reference_id VARCHAR(100),
+            created_at TIMESTAMP DEFAULT NOW()
+        );
+        ALTER TABLE shipments ADD COLUMN IF NOT EXISTS shipment_uid VARCHAR(100);
+        ALTER TABLE shipments ADD COLUMN IF NOT EXISTS tracking_numbers TEXT; -- JSON list from the UPS .out file
+        ALTER TABLE shipments ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+        CREATE TABLE IF NOT EXISTS shipment_drafts (
+            job_ticket_number TEXT PRIMARY KEY,
+            scanned_barcodes JSONB,
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+        CREATE TABLE IF NOT EXISTS product_categories (
+            product_id TEXT PRIMARY KEY,
+            category_name TEXT
+        );
+        CREATE TABLE IF NOT EXISTS product_shipping_rules (
+            category_name TEXT,
+            quantity INTEGER,
+            box_weight NUMERIC,
+            white_box_weight NUMERIC,
+            blue_box_weight NUMERIC,
+            white_box_qty INTEGER,
+            blue_box_qty INTEGER,
+            PRIMARY KEY (category_name, quantity)
+        );
+        CREATE TABLE IF NOT EXISTS shipping_cartons (
+            code TEXT PRIMARY KEY,
+            weight NUMERIC,
+            length NUMERIC,
+            width NUMERIC,
+            height NUMERIC
+        );
+    """),
+    (3, "Lookup indexes", """
+        -- jobs.job_ticket_number, orders.order_number and items.order_item_id are indexed by
+        -- their UNIQUE constraints; item_boxes.order_item_id by UNIQUE(order_item_id, box_sequence).
+        CREATE INDEX IF NOT EXISTS idx_jobs_order_id ON jobs (order_id);
+        CREATE INDEX IF NOT EXISTS idx_items_job_id ON items (job_id);
+        CREATE INDEX IF NOT EXISTS idx_item_boxes_barcode_value ON item_boxes (barcode_value);
+        CREATE INDEX IF NOT EXISTS idx_shipments_shipment_uid ON shipments (shipment_uid);
+        CREATE INDEX IF NOT EXISTS idx_shipments_created_at ON shipments (created_at);
+    """),
+    (4, "Row fingerprints for Stage 1b change detection", """
+        ALTER TABLE orders ADD COLUMN IF NOT EXISTS row_fingerprint TEXT;
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS row_fingerprint TEXT;
+        ALTER TABLE items ADD COLUMN IF NOT EXISTS row_fingerprint TEXT;
+    """),
+    (5, "Marcom sync queue", """
+        -- Line items each shipment closed out, with their packing-slip sync state
+        CREATE TABLE IF NOT EXISTS shipment_items (
+            shipment_id INTEGER REFERENCES shipments(id) ON DELETE CASCADE,
+            order_item_id TEXT,
+            sync_status TEXT DEFAULT 'PENDING',
+            sync_message TEXT,
+            attempts INTEGER DEFAULT 0,
+            synced_at TIMESTAMP,
+            PRIMARY KEY (shipment_id, order_item_id)
+        );
+        ALTER TABLE shipments ADD COLUMN IF NOT EXISTS sync_attempts INTEGER DEFAULT 0;
+        ALTER TABLE shipments ADD COLUMN IF NOT EXISTS next_sync_at TIMESTAMP;
+        CREATE INDEX IF NOT EXISTS idx_shipments_sync_queue ON shipments (next_sync_at)
+            WHERE marcom_sync_status IN ('PENDING', 'SYNCING');
+        -- Unsynced shipments closed before items were linked: every item of their job ticket or order
+        INSERT INTO shipment_items (shipment_id, order_item_id)
+        SELECT s.id, i.order_item_id
+        FROM shipments s
+        JOIN jobs j ON j.job_ticket_number = s.job_ticket_number
+        JOIN items i ON i.job_id = j.id
+        WHERE s.marcom_sync_status IN ('PROCESSING', 'PENDING')
+        UNION
+        SELECT s.id, i.order_item_id
+        FROM shipments s
+        JOIN orders o ON o.order_number = s.job_ticket_number
+        JOIN jobs j ON j.order_id = o.id
+        JOIN items i ON i.job_id = j.id
+        WHERE s.marcom_sync_status IN ('PROCESSING', 'PENDING')
+        ON CONFLICT DO NOTHING;
+    """),
+    (6, "Shipment activity notifications", """
+        -- Every insert/update of a shipment takes the next activity_seq (the feed's event id) and
+        -- NOTIFYs its feed row on shipment_activity; delivered when the transaction commits.
+        CREATE SEQUENCE IF NOT EXISTS shipment_activity_seq;
+        ALTER TABLE shipments ADD COLUMN IF NOT EXISTS activity_seq BIGINT;
+        UPDATE shipments s SET activity_seq = nextval('shipment_activity_seq')
+        FROM (SELECT id FROM shipments WHERE activity_seq IS NULL ORDER BY id) o
+        WHERE s.id = o.id;
+        CREATE INDEX IF NOT EXISTS idx_shipments_activity_seq ON shipments (activity_seq);
+        CREATE OR REPLACE FUNCTION notify_shipment_activity() RETURNS trigger AS $$
+        BEGIN
+            NEW.activity_seq := nextval('shipment_activity_seq');
+            PERFORM pg_notify('shipment_activity', json_build_object(
+                'id', NEW.id, 'seq', NEW.activity_seq,
+                'job_ticket_number', NEW.job_ticket_number, 'tracking_number', NEW.tracking_number,
+                'marcom_sync_status', NEW.marcom_sync_status,
+                'marcom_response_message', left(NEW.marcom_response_message, 500),
+                'reference_id', NEW.reference_id, 'created_at', to_char(NEW.created_at, 'HH24:MI:SS')
+            )::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+        DROP TRIGGER IF EXISTS shipments_activity ON shipments;
+        CREATE TRIGGER shipments_activity BEFORE INSERT OR UPDATE ON shipments
+            FOR EACH ROW EXECUTE FUNCTION notify_shipment_activity();
+    """),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+MIGRATION_LOCK_ID = 7313001 # pg_advisory_xact_lock key: the web app and the pipeline may start together
+
+# The lookups the shipping station and Stage 1b run per scan/row: (table, sql, params).
+# check_indexes() expects each to reach its table through an index.
+INDEXED_LOOKUPS = {
+    'job by ticket': ('jobs', "SELECT id FROM jobs WHERE job_ticket_number = %s", ('0',)),
+    'order by number': ('orders', "SELECT id FROM orders WHERE order_number = %s", ('0',)),
+    'jobs by order': ('jobs', "SELECT id FROM jobs WHERE order_id = %s", (0,)),
+    'items by job': ('items', "SELECT order_item_id FROM items WHERE job_id = ANY(%s)", ([0],)),
+    'item by id': ('items', "SELECT id FROM items WHERE order_item_id = %s", ('0',)),
+    'boxes by barcode': ('item_boxes', "SELECT id FROM item_boxes WHERE barcode_value = ANY(%s)", (['0'],)),
+    'boxes by item': ('item_boxes', "SELECT id FROM item_boxes WHERE order_item_id = %s", ('0',)),
+    'shipment by uid': ('shipments', "SELECT id FROM shipments WHERE shipment_uid = %s", ('0',)),
+}
+INDEX_SCAN_NODES = ('Index Scan', 'Index Only Scan', 'Bitmap Heap Scan')
+
+def applied_versions(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT NOW()
+        );
+    """)
+    cur.execute("SELECT version FROM schema_migrations;")
+    return {row[0] for row in cur.fetchall()}
+
+def apply_migrations(conn):
+    """Runs pending migrations in order, in one transaction. Returns the versions applied."""
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATION_LOCK_ID,))
+        done = applied_versions(cur)
+        applied = []
+        for version, description, sql in MIGRATIONS:
+            if version in done: continue
+            cur.execute(sql)
+            cur.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s);", (version, description))
+            applied.append(version)
+        conn.commit()
+        return applied
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def _scans(plan, table):
+    """Node types of every plan node that reads `table`."""
+    found = [plan['Node Type']] if plan.get('Relation Name') == table else []
+    for child in plan.get('Plans', []): found += _scans(child, table)
+    return found
+
+def check_indexes(conn):
+    """
+    EXPLAINs each INDEXED_LOOKUPS query with sequential scans discouraged (small or empty
+    tables would otherwise always be scanned) and returns {name: (ok, node types)}: a lookup
+    whose table still needs a Seq Scan has no usable index.
+    """
+    results = {}
+    cur = conn.cursor()
+    try:
+        cur.execute("SET LOCAL enable_seqscan = off;")
+        for name, (table, sql, params) in INDEXED_LOOKUPS.items():
+            cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cur.fetchone()[0]
+            if isinstance(plan, str): plan = json.loads(plan)
+            nodes = _scans(plan[0]['Plan'], table)
+            results[name] = (bool(nodes) and all(n in INDEX_SCAN_NODES for n in nodes), nodes)
+    finally:
+        conn.rollback()
+        cur.close()
+    return results
+
+def main():
+    from .database import db_connection, DatabaseUnavailable
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument("--check", action="store_true", help="Also EXPLAIN the lookup queries and verify they use indexes")
+    args = parser.parse_args()
+
+    try:
+        with db_connection() as conn:
+            applied = apply_migrations(conn)
+            print(f"Applied migrations: {applied}" if applied else f"Schema up to date (version {SCHEMA_VERSION}).")
+            results = check_indexes(conn) if args.check else {}
+    except DatabaseUnavailable as e:
+        print(e)
+        sys.exit(1)
+    failed = 0
+    for name, (ok, nodes) in results.items():
+        print(f"  [{'OK' if ok else 'SEQ SCAN'}] {name}: {', '.join(nodes) or 'not scanned'}")
+        failed += not ok
+    if failed: sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,46 @@
-
+import os
 from flask import Flask, render_template
 from flask_cors import CORS
+from shared_lib import schema
+from shared_lib.config import get_env_var
+from shared_lib.database import db_connection, DatabaseUnavailable
+
+# Static files are cached by the browsers for STATIC_MAX_AGE_SECS. Their URLs carry ?v=<mtime>,
+# so an updated app.js or main.css is a new URL and is fetched right away.
+STATIC_MAX_AGE_SECS = int(get_env_var("STATIC_MAX_AGE_SECS", "31536000"))
+
+def migrate_database():
+    try:
+        with db_connection() as conn:
+            applied = schema.apply_migrations(conn)
+        if applied: print(f"Applied schema migrations: {applied}")
+    except DatabaseUnavailable as e:
+        print(f"Schema migrations skipped: {e}")
+    except Exception as e:
+        print(f"Schema migration failed: {e}")
 
 def create_app():
     app = Flask(__name__, template_folder='templates', static_folder='static')
+    app.config['SEND_FILE_MAX_AGE_DEFAULT'] = STATIC_MAX_AGE_SECS
     CORS(app)
-    
+    migrate_database()
+
+    @app.url_defaults
+    def version_static_urls(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            try:
+                values.setdefault('v', int(os.stat(os.path.join(app.static_folder, values['filename'])).st_mtime))
+            except OSError:
+                pass
+
     from .api.routes import api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
+
+    # Reference data invalidations reach every worker process over the feed's LISTEN connection
+    from .services.activity_feed import broadcaster
+    from .services.reference_data import reference_cache, REFERENCE_CHANNEL
+    broadcaster.on(REFERENCE_CHANNEL, lambda payload: reference_cache.invalidate())
+    broadcaster.start()
     
     @app.route('/')
     def index():
@@ -1,6 +1,8 @@
 
-from flask import Blueprint, jsonify, request
-from ..services import order_service, shipment_service
+from flask import Blueprint, Response, jsonify, request
+from ..services import order_service, shipment_service, activity_feed
+from ..services.reference_data import reference_cache, invalidate_everywhere
+from shared_lib.database import pool_metrics, DatabaseUnavailable
 
 api_bp = Blueprint('api', __name__)
 
@@ -21,3 +23,24 @@ def process_shipment():
     
     result, status = shipment_service.process_shipment_logic(orders, scanned, pkgs)
     return jsonify(result), status
+
+@api_bp.route('/reference/invalidate', methods=['POST'])
+def invalidate_reference():
+    # Call after editing product_categories, product_shipping_rules or shipping_cartons
+    try:
+        invalidate_everywhere()
+    except DatabaseUnavailable as e:
+        return jsonify({"error": f"Cleared this process only (other workers reload within the TTL): {e}"}), 503
+    return jsonify({"success": True})
+
+@api_bp.route('/activity/stream', methods=['GET'])
+def activity_stream():
+    # Server-sent events; the browser sends Last-Event-ID when it reconnects
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return Response(activity_feed.stream(last_event_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api_bp.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({"db_pool": pool_metrics(), "reference_cache": reference_cache.metrics(),
+                    "activity_feed": activity_feed.broadcaster.metrics()})
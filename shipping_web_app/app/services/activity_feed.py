@@ -0,0 +1,172 @@
+
+import json
+import time
+import queue
+import select
+import threading
+import psycopg2
+from shared_lib.database import db_connection, get_real_dict_cursor, connection_params, DatabaseUnavailable, DB_CONNECT_TIMEOUT
+from shared_lib.config import get_env_var
+
+# Live shipment feed for the stations' sidebar, pushed as server-sent events. One listener
+# thread per process holds a dedicated connection LISTENing on shipment_activity (NOTIFYed by
+# the shipments trigger, migration 6) and fans each change out to the connected streams, so
+# the database does no per-station work. A stream starts with the latest FEED_SIZE shipments,
+# or, when the browser reconnects with Last-Event-ID, with the changes it missed. Events
+# carry the whole feed row and the page keys them by shipment: a repeat is harmless. The same
+# connection carries the app's other process-wide notifications (see ActivityBroadcaster.on).
+#
+# activity_seq is taken when a row is written, not when its transaction commits, so writers
+# (close_shipment, the UPS watcher, the sync worker) can commit out of order: after seeing 101
+# a station may still be owed 100. Replays therefore reach back REPLAY_WINDOW_SEQS before the
+# last event seen, and streams drop any event not newer than what they sent for that shipment.
+FEED_CHANNEL = 'shipment_activity'
+FEED_SIZE = 50
+SSE_KEEPALIVE_SECS = float(get_env_var("SSE_KEEPALIVE_SECS", "15")) # Comment line on idle streams (proxies drop silent ones)
+SSE_RETRY_MS = 3000                                                   # Browser reconnect delay
+SUBSCRIBER_QUEUE_SIZE = 1000                                          # A stream this far behind is closed; it resumes by Last-Event-ID
+REPLAY_WINDOW_SEQS = 500                                              # Writes that may still commit behind a later one
+
+FEED_COLUMNS = """
+    id, activity_seq AS seq, job_ticket_number, tracking_number, marcom_sync_status,
+    left(marcom_response_message, 500) AS marcom_response_message, reference_id,
+    to_char(created_at, 'HH24:MI:SS') AS created_at
+"""
+
+def recent_activity(limit=FEED_SIZE):
+    """The latest `limit` feed rows, oldest first."""
+    with db_connection() as conn:
+        cur = get_real_dict_cursor(conn)
+        cur.execute(f"SELECT {FEED_COLUMNS} FROM shipments WHERE activity_seq IS NOT NULL ORDER BY activity_seq DESC LIMIT %s", (limit,))
+        rows = cur.fetchall()
+        cur.close()
+    return rows[::-1]
+
+def activity_since(seq, limit=1000):
+    """
+    Feed rows changed after event `seq`, or committed late behind it (REPLAY_WINDOW_SEQS), in
+    event order. After a long gap only the newest `limit` are returned: the page shows the
+    latest shipments, so the oldest changes are the ones to drop.
+    """
+    with db_connection() as conn:
+        cur = get_real_dict_cursor(conn)
+        cur.execute(f"SELECT {FEED_COLUMNS} FROM shipments WHERE activity_seq > %s ORDER BY activity_seq DESC LIMIT %s",
+                    (seq - REPLAY_WINDOW_SEQS, limit))
+        rows = cur.fetchall()
+        cur.close()
+    return rows[::-1]
+
+class ActivityBroadcaster:
+    def __init__(self, channel=FEED_CHANNEL):
+        self.channel = channel
+        self._handlers = {} # Other channels on the same connection -> handler(payload or None)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.last_seq = None
+        self.stats = {'notifications': 0, 'reconnects': 0, 'dropped_subscribers': 0}
+
+    def on(self, channel, handler):
+        """Also LISTENs on `channel`. handler(payload) runs on the listener thread; handler(None)
+        after a reconnect, as notifications sent while it was down are lost."""
+        self._handlers[channel] = handler
+
+    def start(self):
+        with self._lock: self._start()
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._listen, name='activity-listener', daemon=True)
+            self._thread.start()
+
+    def subscribe(self):
+        with self._lock:
+            self._start() # Already running if the app registered handlers; else the first stream starts it
+            q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock: self._subscribers.discard(q)
+
+    def publish(self, event):
+        self.last_seq = max(self.last_seq or 0, event['seq'])
+        with self._lock: subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full: # Stalled client: close its stream
+                self.unsubscribe(q)
+                self.stats['dropped_subscribers'] += 1
+                try: q.get_nowait()
+                except queue.Empty: pass
+                q.put_nowait(None)
+
+    def _listen(self):
+        delay = 1
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(connect_timeout=DB_CONNECT_TIMEOUT, **connection_params()) # Held for good: not pooled
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    for channel in [self.channel, *self._handlers]: cur.execute(f"LISTEN {channel};")
+                if self.stats['reconnects']:
+                    for handler in self._handlers.values(): handler(None)
+                if self.last_seq is not None: # Changes committed while the listener was down
+                    for event in activity_since(self.last_seq): self.publish(event)
+                delay = 1
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []): continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        if notify.channel in self._handlers:
+                            self._handlers[notify.channel](notify.payload)
+                            continue
+                        self.stats['notifications'] += 1
+                        self.publish(json.loads(notify.payload))
+            except (psycopg2.Error, DatabaseUnavailable, OSError) as e:
+                self.stats['reconnects'] += 1
+                print(f"Activity feed listener: {e}; reconnecting in {delay}s")
+            finally:
+                if conn is not None: conn.close()
+            time.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    def metrics(self):
+        with self._lock: streams = len(self._subscribers)
+        return dict(self.stats, streams=streams, last_seq=self.last_seq)
+
+broadcaster = ActivityBroadcaster()
+
+def format_event(event):
+    return f"id: {event['seq']}\nevent: shipment\ndata: {json.dumps(event)}\n\n"
+
+def stream(last_event_id=None):
+    """SSE body for one station: backlog, then live changes, with keepalives."""
+    q = broadcaster.subscribe() # Before the backlog query: nothing committed in between is missed
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        try:
+            backlog = activity_since(int(last_event_id)) if last_event_id else recent_activity()
+        except ValueError:
+            backlog = recent_activity()
+        except DatabaseUnavailable:
+            return # The browser retries
+        sent = {} # shipment id -> seq of the row last sent
+        for event in backlog:
+            sent[event['id']] = event['seq']
+            yield format_event(event)
+        while True:
+            try:
+                event = q.get(timeout=SSE_KEEPALIVE_SECS)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            if event is None: return # Dropped for lagging
+            if sent.get(event['id'], 0) >= event['seq']: continue # Sent already (backlog, replay) or older than what was
+            sent[event['id']] = event['seq']
+            yield format_event(event)
+    finally:
+        broadcaster.unsubscribe(q)
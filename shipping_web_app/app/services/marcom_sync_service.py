@@ -0,0 +1,286 @@
+
+import os
+import time
+import random
+import argparse
+import datetime
+import traceback
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import xml.etree.ElementTree as ET
+import requests
+import psycopg2.extras
+from requests.adapters import HTTPAdapter
+from shared_lib.database import db_connection, get_real_dict_cursor, DatabaseUnavailable
+from shared_lib.config import get_env_var
+from .shipment_service import XML_OUTPUT_FOLDER
+
+# Background worker: sends a CreatePackingSlipByLineItem call for every line item of each
+# shipment the UPS watcher marked PENDING (tracking number stored). Shipments are claimed in
+# batches (SKIP LOCKED: several workers may run), their calls made concurrently over one
+# pooled HTTP session, and the results written back in one transaction. Transient failures
+# (timeouts, connection errors, 429/5xx gateway statuses) are retried with backoff, first
+# within the batch, then by re-queueing the shipment; Marcom errors fail the item for good.
+MARCOM_URL = get_env_var("MARCOM_URL", "https://services.printable.com/trans/1.0/PackingSlip.asmx")
+MARCOM_SOAP_ACTION = get_env_var("MARCOM_SOAP_ACTION", "http://www.printable.com/WebService/PackingSlip/CreatePackingSlipByLineItem")
+MARCOM_PARTNER_TOKEN = get_env_var("MARCOM_PARTNER_TOKEN")
+MARCOM_CARRIER = 'UPS'
+MARCOM_SIMULATION = get_env_var("MARCOM_SIMULATION", "1") == "1"               # Write payloads to marcom_debug/ instead of sending
+MARCOM_SYNC_CONCURRENCY = int(get_env_var("MARCOM_SYNC_CONCURRENCY", "8"))      # Calls in flight (and HTTP connections kept)
+MARCOM_SYNC_BATCH = int(get_env_var("MARCOM_SYNC_BATCH", "50"))                 # Shipments claimed at a time
+MARCOM_SYNC_POLL_SECS = float(get_env_var("MARCOM_SYNC_POLL_SECS", "2"))        # Idle wait between queue checks
+MARCOM_TIMEOUT_SECS = float(get_env_var("MARCOM_TIMEOUT_SECS", "20"))
+MARCOM_RETRIES = int(get_env_var("MARCOM_RETRIES", "3"))                        # Per call, within a batch
+MARCOM_MAX_SYNC_ATTEMPTS = int(get_env_var("MARCOM_MAX_SYNC_ATTEMPTS", "8"))    # Batches per shipment before FAILED
+MARCOM_DEBUG_FOLDER = os.path.join(XML_OUTPUT_FOLDER, 'marcom_debug')
+TRANSIENT_STATUSES = {429, 502, 503, 504}
+MAX_RETRY_WAIT_SECS = 30.0 # Cap on backoff and on Retry-After between a call's attempts
+LEASE_MARGIN_SECS = 600    # Added to a batch's worst-case length (see claim_lease_secs)
+
+# A claim is a lease: next_sync_at is set to when the batch must be over (its calls' worst case,
+# from the pending items and the timeout/retry settings). A SYNCING shipment past it was claimed
+# by a worker that died and is claimed again. The results are only written while the claim is
+# still the worker's own (same sync_attempts), so a batch outliving its lease cannot overwrite
+# the newer claim's outcome.
+CLAIM_SQL = """
+    WITH claimed AS (
+        SELECT id FROM shipments
+        WHERE (marcom_sync_status = 'PENDING' AND tracking_number IS NOT NULL
+               AND (next_sync_at IS NULL OR next_sync_at <= NOW()))
+           OR (marcom_sync_status = 'SYNCING'
+               AND COALESCE(next_sync_at, updated_at + make_interval(secs => %(margin)s)) < NOW())
+        ORDER BY id
+        LIMIT %(batch)s
+        FOR UPDATE SKIP LOCKED
+    ), calls AS (
+        SELECT count(*) AS n FROM shipment_items
+        WHERE shipment_id IN (SELECT id FROM claimed) AND sync_status IS DISTINCT FROM 'SUCCESS'
+    )
+    UPDATE shipments s
+    SET marcom_sync_status = 'SYNCING', sync_attempts = s.sync_attempts + 1, updated_at = NOW(),
+        next_sync_at = NOW() + make_interval(secs => ceil((SELECT n FROM calls) / %(concurrency)s::float) * %(per_call)s + %(margin)s)
+    FROM claimed c
+    WHERE s.id = c.id
+    RETURNING s.id, s.shipment_uid, s.tracking_number, s.sync_attempts
+"""
+
+UPDATE_SHIPMENTS_SQL = """
+    UPDATE shipments s
+    SET marcom_sync_status = v.status, marcom_response_message = v.message,
+        next_sync_at = NOW() + make_interval(secs => v.delay), updated_at = NOW()
+    FROM (VALUES %s) AS v (id, status, message, delay, claimed_attempts)
+    WHERE s.id = v.id AND s.marcom_sync_status = 'SYNCING' AND s.sync_attempts = v.claimed_attempts
+    RETURNING s.id
+"""
+
+UPDATE_ITEMS_SQL = """
+    UPDATE shipment_items si
+    SET sync_status = v.status, sync_message = v.message, attempts = si.attempts + v.attempts,
+        synced_at = CASE WHEN v.status = 'SUCCESS' THEN NOW() END
+    FROM (VALUES %s) AS v (shipment_id, order_item_id, status, message, attempts)
+    WHERE si.shipment_id = v.shipment_id AND si.order_item_id = v.order_item_id
+"""
+
+def generate_marcom_xml_payload(line_item_id, tracking_number, token, carrier):
+    return f"""
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:pac="http://www.printable.com/WebService/PackingSlip">
+    <soapenv:Header/>
+    <soapenv:Body>
+        <pac:CreatePackingSlipByLineItem>
+            <pac:pRequest>
+                <PartnerCredentials>
+                    <Token>{token}</Token>
+                </PartnerCredentials>
+                <PackingSlipNode>
+                    <CarrierName>{carrier}</CarrierName>
+                    <TrackingNumber>{tracking_number}</TrackingNumber>
+                </PackingSlipNode>
+                <LineItems>
+                    <LineItem>
+                        <ID type="Printable">{line_item_id}</ID>
+                    </LineItem>
+                </LineItems>
+            </pac:pRequest>
+        </pac:CreatePackingSlipByLineItem>
+    </soapenv:Body>
+</soapenv:Envelope>
+"""
+
+def backoff(attempt, base=0.5, cap=30.0):
+    """Exponential backoff with full jitter: attempt 1 waits up to base, then 2x, 4x... capped."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+def _fault_message(res):
+    """faultstring of a SOAP fault, else the start of the body."""
+    try:
+        for elem in ET.fromstring(res.content).iter():
+            if elem.tag.endswith('faultstring') and elem.text: return elem.text.strip()
+    except ET.ParseError:
+        pass
+    return f"Marcom Error (HTTP {res.status_code}): {res.text[:200]}"
+
+class MarcomClient:
+    def __init__(self, url=MARCOM_URL, token=MARCOM_PARTNER_TOKEN, concurrency=MARCOM_SYNC_CONCURRENCY,
+                 timeout=MARCOM_TIMEOUT_SECS, retries=MARCOM_RETRIES, simulation=MARCOM_SIMULATION):
+        self.url, self.token, self.timeout, self.retries, self.simulation = url, token, timeout, retries, simulation
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=0) # Retries are ours (POST)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Content-Type': 'text/xml; charset=utf-8', 'SOAPAction': MARCOM_SOAP_ACTION})
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='marcom')
+        self._lock = threading.Lock()
+        self.stats = Counter() # HTTP status codes, transport errors and item outcomes
+
+    def count(self, key, n=1):
+        with self._lock: self.stats[key] += n
+
+    def send(self, line_item_id, tracking_number):
+        """One packing slip, retried on transient failures. Returns (status, message, attempts)."""
+        payload = generate_marcom_xml_payload(line_item_id, tracking_number, self.token, MARCOM_CARRIER)
+        if self.simulation:
+            os.makedirs(MARCOM_DEBUG_FOLDER, exist_ok=True)
+            filename = f"MARCOM_SIM_{tracking_number}_{line_item_id}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xml"
+            with open(os.path.join(MARCOM_DEBUG_FOLDER, filename), "w") as f:
+                f.write(payload)
+            self.count('simulated')
+            return 'SUCCESS', "SIMULATED: Packing Slip Created", 1
+
+        for attempt in range(1, self.retries + 2):
+            wait = None
+            try:
+                res = self.session.post(self.url, data=payload.encode('utf-8'), timeout=self.timeout)
+                self.count(f"http_{res.status_code}")
+                if res.status_code in TRANSIENT_STATUSES:
+                    message = f"HTTP {res.status_code}"
+                    retry_after = res.headers.get('Retry-After', '')
+                    if retry_after.isdigit(): wait = min(float(retry_after), MAX_RETRY_WAIT_SECS)
+                elif res.status_code == 200 and "ProcessComplete" in res.text:
+                    return 'SUCCESS', "Packing Slip Created", attempt
+                else:
+                    return 'FAILED', _fault_message(res), attempt
+            except requests.Timeout:
+                self.count('timeout')
+                message = "Timeout"
+            except requests.ConnectionError as e:
+                self.count('connection_error')
+                message = f"Connection error: {e}"
+            except requests.RequestException as e: # Cut-off body, bad encoding, redirect loop...
+                self.count('request_error')
+                message = f"{type(e).__name__}: {e}"
+            if attempt <= self.retries:
+                self.count('retries')
+                time.sleep(wait if wait is not None else backoff(attempt, cap=MAX_RETRY_WAIT_SECS))
+        return 'PENDING', message, attempt
+
+    def worst_call_secs(self):
+        """Longest one send() can take: every attempt timing out, each wait at its cap."""
+        return (self.retries + 1) * self.timeout + self.retries * MAX_RETRY_WAIT_SECS
+
+    def send_all(self, calls):
+        """[(line_item_id, tracking_number)] -> results in the same order, at most `concurrency` in flight."""
+        return list(self.executor.map(lambda call: self.send(*call), calls))
+
+    def close(self):
+        self.executor.shutdown()
+        self.session.close()
+
+def shipment_outcome(shipment, results, max_attempts=MARCOM_MAX_SYNC_ATTEMPTS):
+    """(status, message, seconds until the next try) for a shipment from its items' results."""
+    statuses = Counter(status for status, _, _ in results)
+    if not results:
+        return 'SKIPPED', "No line items linked to shipment", 0 # Closed without scanned boxes
+    if statuses['FAILED']:
+        message = next(m for s, m, _ in results if s == 'FAILED')
+        return 'FAILED', f"{statuses['FAILED']} of {len(results)} line items failed: {message}", 0
+    if statuses['PENDING']:
+        if shipment['sync_attempts'] >= max_attempts:
+            return 'FAILED', f"Gave up after {shipment['sync_attempts']} attempts: {results[-1][1]}", 0
+        return 'PENDING', f"Retrying {statuses['PENDING']} line items", backoff(shipment['sync_attempts'] + 1, base=30, cap=1800)
+    return 'SUCCESS', f"Packing Slip Created ({len(results)} line items)", 0
+
+def sync_batch(client, batch_size=MARCOM_SYNC_BATCH):
+    """Claims, syncs and records one batch. Returns the number of shipments claimed."""
+    with db_connection() as conn:
+        cur = get_real_dict_cursor(conn)
+        cur.execute(CLAIM_SQL, {'batch': batch_size, 'concurrency': client.concurrency,
+                                'per_call': client.worst_call_secs(), 'margin': LEASE_MARGIN_SECS})
+        shipments = cur.fetchall()
+        items = []
+        if shipments:
+            cur.execute("""
+                SELECT shipment_id, order_item_id FROM shipment_items
+                WHERE shipment_id = ANY(%s) AND sync_status IS DISTINCT FROM 'SUCCESS'
+                ORDER BY shipment_id, order_item_id
+            """, ([s['id'] for s in shipments],))
+            items = cur.fetchall()
+        conn.commit() # The claim, before any HTTP call
+        cur.close()
+    if not shipments: return 0
+
+    # Calls happen with no connection checked out
+    tracking = {s['id']: s['tracking_number'] for s in shipments}
+    results = client.send_all([(i['order_item_id'], tracking[i['shipment_id']]) for i in items])
+
+    by_shipment = {s['id']: [] for s in shipments}
+    for item, result in zip(items, results):
+        by_shipment[item['shipment_id']].append(result)
+    outcomes = {s['id']: shipment_outcome(s, by_shipment[s['id']]) for s in shipments}
+    shipment_rows = [(s['id'], *outcomes[s['id']], s['sync_attempts']) for s in shipments]
+
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            # Shipments first: the update locks the ones still ours, then only their items are written
+            owned = {r[0] for r in psycopg2.extras.execute_values(cur, UPDATE_SHIPMENTS_SQL, shipment_rows,
+                                                                  template="(%s, %s, %s, %s::float8, %s)", fetch=True)}
+            item_rows = [(item['shipment_id'], item['order_item_id'], *result)
+                         for item, result in zip(items, results) if item['shipment_id'] in owned]
+            if item_rows: psycopg2.extras.execute_values(cur, UPDATE_ITEMS_SQL, item_rows)
+        conn.commit()
+
+    for s in shipments:
+        if s['id'] not in owned:
+            client.count('claims_lost') # Lease ran out and another worker claimed it
+            continue
+        client.count(f"shipment_{outcomes[s['id']][0].lower()}")
+        for status, _, _ in by_shipment[s['id']]: client.count(f"item_{status.lower()}")
+    return len(shipments)
+
+def run(client, stop=None, poll_secs=MARCOM_SYNC_POLL_SECS):
+    stop = stop or threading.Event()
+    print(f"Marcom sync worker: {'SIMULATION (marcom_debug/)' if client.simulation else client.url}")
+    while not stop.is_set():
+        try:
+            claimed = sync_batch(client)
+        except (DatabaseUnavailable, psycopg2.Error) as e:
+            print(f"Marcom sync: database error, retrying: {e}")
+            claimed = 0
+        except Exception as e: # Keep the worker up; the batch's claims go stale and are retried
+            print(f"Marcom sync: batch failed, continuing: {e}"); traceback.print_exc()
+            claimed = 0
+        if claimed:
+            print(f"Synced {claimed} shipments. Totals: {dict(client.stats)}")
+        else:
+            stop.wait(poll_secs) # Queue empty
+
+def main():
+    parser = argparse.ArgumentParser(description="Send Marcom packing slips for shipments with tracking numbers")
+    parser.add_argument("--once", action="store_true", help="Drain the queue once and exit")
+    args = parser.parse_args()
+
+    if not MARCOM_SIMULATION and not MARCOM_PARTNER_TOKEN:
+        print("MARCOM_PARTNER_TOKEN not set (required unless MARCOM_SIMULATION=1).")
+        raise SystemExit(1)
+    client = MarcomClient()
+    try:
+        if args.once:
+            while sync_batch(client): pass
+            print(f"Totals: {dict(client.stats)}")
+        else:
+            run(client)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
@@ -1,123 +1,112 @@
 
-from shared_lib.database import get_db_connection, get_real_dict_cursor
+from shared_lib.database import db_connection, get_real_dict_cursor, execute_prepared, DatabaseUnavailable
 from shared_lib.utils import extract_store_number_strict
+from .reference_data import get_weight_rules, get_mixed_box_info
 from fuzzywuzzy import fuzz
 
+# One round-trip per scan: the lookup ID resolves as a job ticket first, then as an order
+# number (all of that order's jobs). Every row repeats the header; a target without boxes
+# comes back as one row with NULL box columns, an unknown ID as no rows. Prepared once per
+# pooled connection: planning this costs more than running it.
+JOB_DETAILS_SQL = """
+    WITH job_hit AS (
+        SELECT 'job' AS matched_as, j.id AS job_id, j.job_ticket_number AS lookup_ref,
+               o.id AS order_id, o.order_number, o.ship_to_company, o.ship_to_name,
+               o.address1, o.city, o.state, o.zip, o.country
+        FROM jobs j
+        JOIN orders o ON j.order_id = o.id
+        WHERE j.job_ticket_number = $1
+    ), target AS (
+        SELECT * FROM job_hit
+        UNION ALL
+        SELECT 'order', NULL, o.order_number,
+               o.id, o.order_number, o.ship_to_company, o.ship_to_name,
+               o.address1, o.city, o.state, o.zip, o.country
+        FROM orders o
+        WHERE o.order_number = $1 AND NOT EXISTS (SELECT 1 FROM job_hit)
+    ), target_jobs AS (
+        SELECT j.id, j.job_ticket_number FROM job_hit h JOIN jobs j ON j.id = h.job_id
+        UNION ALL
+        SELECT j.id, j.job_ticket_number FROM target t JOIN jobs j ON j.order_id = t.order_id WHERE t.matched_as = 'order'
+    )
+    SELECT t.*, EXISTS (SELECT 1 FROM target_jobs) AS has_jobs,
+           x.barcode_value, x.status, x.packed_at, x.sku, x.sku_description, x.order_item_id,
+           x.quantity_ordered, x.cost_center, x.product_id, x.job_ticket_number
+    FROM target t
+    LEFT JOIN LATERAL (
+        SELECT b.barcode_value, b.status, b.packed_at, b.box_sequence, i.sku, i.sku_description, i.order_item_id,
+               i.quantity_ordered, i.cost_center, i.product_id, tj.job_ticket_number
+        FROM target_jobs tj
+        JOIN items i ON i.job_id = tj.id
+        JOIN item_boxes b ON b.order_item_id = i.order_item_id
+    ) x ON TRUE
+    ORDER BY x.job_ticket_number, x.order_item_id, x.box_sequence
+"""
+
 def get_job_details(lookup_id):
-    conn = get_db_connection()
-    if not conn: return None, "DB Connection Error"
-    
     try:
-        cur = get_real_dict_cursor(conn)
-        
-        # 1. Job Ticket Check
-        cur.execute("""
-            SELECT j.id as job_id, j.order_id, j.job_ticket_number, o.order_number, 
-                   o.ship_to_company, o.ship_to_name, 
-                   o.address1, o.city, o.state, o.zip, o.country 
-            FROM jobs j
-            JOIN orders o ON j.order_id = o.id
-            WHERE j.job_ticket_number = %s
-        """, (lookup_id,))
-        job_data = cur.fetchone()
-        
-        target_job_ids = []
-        
-        if job_data:
-            target_job_ids = [job_data['job_id']]
-            response_data = {
-                "order_number": job_data['job_ticket_number'], 
-                "related_order_number": job_data['order_number'],
-                "ship_to": {
-                    "name": job_data['ship_to_name'],
-                    "company": job_data['ship_to_company'],
-                    "address1": job_data['address1'],
-                    "city": job_data['city'],
-                    "state": job_data['state'],
-                    "zip": job_data['zip'],
-                    "country": job_data['country'],
-                    "account_number": "Y76383"
-                },
-                "reference2": job_data['job_ticket_number']
-            }
-        else:
-            # 2. Order Number Check
-            cur.execute("""
-                SELECT id, order_number, ship_to_company, ship_to_name, 
-                       address1, city, state, zip, country 
-                FROM orders 
-                WHERE order_number = %s
-            """, (lookup_id,))
-            order_data = cur.fetchone()
-            
-            if not order_data:
-                conn.close()
-                return None, f"ID {lookup_id} not found."
-            
-            cur.execute("SELECT id FROM jobs WHERE order_id = %s", (order_data['id'],))
-            target_job_ids = [r['id'] for r in cur.fetchall()]
-            
-            response_data = {
-                "order_number": order_data['order_number'], 
-                "related_order_number": order_data['order_number'],
-                "ship_to": {
-                    "name": order_data['ship_to_name'],
-                    "company": order_data['ship_to_company'],
-                    "address1": order_data['address1'],
-                    "city": order_data['city'],
-                    "state": order_data['state'],
-                    "zip": order_data['zip'],
-                    "country": order_data['country'],
-                    "account_number": "Y76383"
-                },
-                "reference2": order_data['order_number']
-            }
-
-        # 3. Items
-        if target_job_ids:
-            cur.execute("""
-                SELECT b.barcode_value, b.status, b.packed_at, i.sku, i.sku_description, i.order_item_id, 
-                       i.quantity_ordered, i.cost_center, i.product_id, j.job_ticket_number
-                FROM item_boxes b
-                JOIN items i ON b.order_item_id = i.order_item_id
-                JOIN jobs j ON i.job_id = j.id
-                WHERE i.job_id = ANY(%s)
-                ORDER BY j.job_ticket_number, i.order_item_id, b.box_sequence
-            """, (target_job_ids,))
-            
+        with db_connection() as conn:
+            cur = get_real_dict_cursor(conn)
+            execute_prepared(cur, 'job_details', JOB_DETAILS_SQL, (lookup_id,))
             rows = cur.fetchall()
-            
-            # Map items logic (simplified from original for brevity, but retaining structure)
-            # note: weights calc omitted for now to save tokens, assuming 'get_mixed_box_info' 
-            # would be imported if fully implemented.
-            
+            cur.close()
+
+        if not rows:
+            return None, f"ID {lookup_id} not found."
+
+        header = rows[0]
+        response_data = {
+            "order_number": header['lookup_ref'],
+            "related_order_number": header['order_number'],
+            "ship_to": {
+                "name": header['ship_to_name'],
+                "company": header['ship_to_company'],
+                "address1": header['address1'],
+                "city": header['city'],
+                "state": header['state'],
+                "zip": header['zip'],
+                "country": header['country'],
+                "account_number": "Y76383"
+            },
+            "reference2": header['lookup_ref']
+        }
+
+        # Items
+        if header['has_jobs']:
+            product_map, rules = get_weight_rules() # Cached reference data, no query in the steady state
             all_barcodes = []
-            line_items_list = []
-            # ... (Full reconstruction would typically go here)
-            
-            # Minimal reconstruction for the plan:
-            seen_items = {}
+            seen_items, item_weights = {}, {}
             for row in rows:
+                if row['order_item_id'] is None: continue # Target's jobs have no boxes
                 all_barcodes.append(row['barcode_value'])
                 oid = row['order_item_id']
                 if oid not in seen_items:
+                    item_weights[oid], instructions = get_mixed_box_info(
+                        product_map, rules, row['quantity_ordered'], row['cost_center'], row['sku'], row['product_id'])
                     seen_items[oid] = {
                         "job_ticket": row['job_ticket_number'],
                         "sku": row['sku'],
-                        "barcodes": []
+                        "sku_description": row['sku_description'],
+                        "quantity_ordered": row['quantity_ordered'],
+                        "cost_center": row['cost_center'],
+                        "barcodes": [],
+                        "packaging_instructions": instructions
                     }
+                weights, n = item_weights[oid], len(seen_items[oid]['barcodes'])
                 seen_items[oid]['barcodes'].append({
                     "value": row['barcode_value'],
-                    "status": row.get('status')
+                    "status": row.get('status'),
+                    "estimated_weight": weights[n] if n < len(weights) else 1.0
                 })
-            
+
             response_data['expected_barcodes'] = all_barcodes
             response_data['line_items'] = list(seen_items.values())
 
-        conn.close()
         return response_data, None
 
+    except DatabaseUnavailable as e:
+        print(e)
+        return None, "DB Connection Error"
     except Exception as e:
-        if conn: conn.close()
         print(e)
         return None, str(e)
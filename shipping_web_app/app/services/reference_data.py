@@ -0,0 +1,126 @@
+
+import time
+import threading
+from shared_lib.database import db_connection, get_real_dict_cursor
+from shared_lib.config import get_env_var
+
+# Reference tables (product categories, shipping rules, cartons) change a few times a year
+# but were re-read on every scan and shipment. They are loaded together into one in-process
+# snapshot, reloaded after REFERENCE_CACHE_TTL_SECS or on POST /api/reference/invalidate
+# (after editing the tables). Numerics come back as floats (psycopg2 returns Decimal).
+# Each worker process holds its own snapshot: an invalidation is NOTIFYed on
+# REFERENCE_CHANNEL and every process's listener (app/__init__.py) clears its copy.
+REFERENCE_CACHE_TTL_SECS = float(get_env_var("REFERENCE_CACHE_TTL_SECS", "300"))
+REFERENCE_CHANNEL = 'reference_invalidate'
+
+def _num(value, cast=float):
+    return cast(value) if value else cast(0)
+
+def load_reference_data(conn):
+    cur = get_real_dict_cursor(conn)
+
+    # 1. Product Map: ID -> Category
+    cur.execute("SELECT product_id, category_name FROM product_categories")
+    product_map = {row['product_id']: row['category_name'] for row in cur.fetchall()}
+
+    # 2. Rules: (category, qty) -> per-box weight, and (lowercased category, qty) -> mixed box info
+    cur.execute("""
+        SELECT category_name, quantity, box_weight,
+               white_box_weight, blue_box_weight,
+               white_box_qty, blue_box_qty
+        FROM product_shipping_rules
+    """)
+    box_weights, rules = {}, {}
+    for r in cur.fetchall():
+        box_weights[(r['category_name'], r['quantity'])] = _num(r['box_weight'])
+        rules[(str(r['category_name']).lower(), int(r['quantity']))] = {
+            'w_wt': _num(r['white_box_weight']),
+            'b_wt': _num(r['blue_box_weight']),
+            'w_qty': _num(r['white_box_qty'], int),
+            'b_qty': _num(r['blue_box_qty'], int)
+        }
+
+    # 3. Cartons: code -> weight and dims
+    cur.execute("SELECT code, weight, length, width, height FROM shipping_cartons")
+    cartons = {c['code']: {k: (v if k == 'code' else _num(v)) for k, v in c.items()} for c in cur.fetchall()}
+
+    cur.close()
+    conn.rollback() # Read-only: end the transaction rather than leave it to the pool
+    return {'product_map': product_map, 'rules': rules, 'box_weights': box_weights, 'cartons': cartons}
+
+class ReferenceCache:
+    def __init__(self, loader=load_reference_data, ttl=REFERENCE_CACHE_TTL_SECS):
+        self.loader, self.ttl = loader, ttl
+        self._lock = threading.Lock()
+        self._data, self._expires = None, 0.0
+        self.stats = {'hits': 0, 'loads': 0, 'invalidations': 0}
+
+    def get(self):
+        """The current snapshot (treat as read-only); loads it when missing or expired."""
+        data, expires = self._data, self._expires
+        if data is not None and time.monotonic() < expires:
+            self.stats['hits'] += 1
+            return data
+        with self._lock: # One request reloads, concurrent ones wait for its result
+            if self._data is None or time.monotonic() >= self._expires:
+                with db_connection() as conn:
+                    data = self.loader(conn)
+                self._data, self._expires = data, time.monotonic() + self.ttl
+                self.stats['loads'] += 1
+            else:
+                self.stats['hits'] += 1
+            return self._data
+
+    def invalidate(self):
+        with self._lock:
+            self._data, self._expires = None, 0.0
+            self.stats['invalidations'] += 1
+
+    def metrics(self):
+        loaded = self._data is not None
+        return dict(self.stats, loaded=loaded, ttl_seconds=self.ttl,
+                    expires_in_seconds=round(max(0.0, self._expires - time.monotonic()), 1) if loaded else None)
+
+reference_cache = ReferenceCache()
+
+def invalidate_everywhere():
+    """Clears this process's snapshot and NOTIFYs the others (raises DatabaseUnavailable if it cannot)."""
+    reference_cache.invalidate()
+    with db_connection() as conn:
+        with conn.cursor() as cur: cur.execute("SELECT pg_notify(%s, '')", (REFERENCE_CHANNEL,))
+        conn.commit()
+
+def get_weight_rules():
+    data = reference_cache.get()
+    return data['product_map'], data['rules']
+
+def get_mixed_box_info(product_map, rules, quantity, category, sku, product_id):
+    # 1. Determine Category
+    cat_name = None
+    if product_id and product_id in product_map:
+        cat_name = product_map[product_id]
+    if not cat_name and category:
+        cat_name = category
+    if not cat_name:
+        cat_name = sku
+
+    # 2. Lookup Rule
+    weights_list = []
+    instructions = ""
+
+    if cat_name:
+        rule = rules.get((str(cat_name).lower(), quantity))
+        if rule:
+            # Flattened list of weights: [W, W, W, B]
+            weights_list = [rule['w_wt']] * rule['w_qty'] + [rule['b_wt']] * rule['b_qty']
+            parts = []
+            if rule['w_qty']: parts.append(f"{rule['w_qty']}x White")
+            if rule['b_qty']: parts.append(f"{rule['b_qty']}x Blue")
+            instructions = ", ".join(parts)
+
+    # Default fallback if no rule or empty rule
+    if not weights_list:
+        weights_list = [1.0] * 10 # Fallback: assume 1lb for next 10 boxes
+        instructions = "No specific rule"
+
+    return weights_list, instructions
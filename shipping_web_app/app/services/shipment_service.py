@@ -3,9 +3,10 @@ import math
 import os
 import datetime
 import random
-from shared_lib.database import get_db_connection, get_real_dict_cursor
+from shared_lib.database import db_connection, get_real_dict_cursor
 from shared_lib.config import get_env_var
 from shared_lib.utils import get_store_number
+from .reference_data import reference_cache
 
 XML_OUTPUT_FOLDER = 'xml_output'
 # Ensure absolute path relative to root if running from root
@@ -104,65 +105,92 @@ def generate_worldship_xml(shipment_data, packages, store_number_arg=None):
 </OpenShipments>""")
     return "".join(xml_parts)
 
+# The whole close-out in one statement. Items with a scanned box are locked (in a fixed order,
+# so stations sharing items cannot deadlock) and checked against ALL their boxes. Only when
+# none is partial are the boxes marked packed and the shipment (and its line items, for the
+# Marcom sync) inserted. A box another station packed first (re-checked after its lock is
+# released) is left out of packed_boxes.
+# Returns one row per item: the completeness counts and the weight inputs.
+CLOSE_SHIPMENT_SQL = """
+    WITH target_items AS (
+        SELECT i.order_item_id, i.sku, i.quantity_ordered, i.cost_center
+        FROM items i
+        WHERE i.order_item_id IN (SELECT order_item_id FROM item_boxes WHERE barcode_value = ANY(%(barcodes)s))
+        ORDER BY i.order_item_id
+        FOR UPDATE
+    ), box_counts AS (
+        SELECT b.order_item_id, count(*) AS total_boxes,
+               count(*) FILTER (WHERE b.barcode_value = ANY(%(barcodes)s)) AS scanned_boxes
+        FROM item_boxes b
+        JOIN target_items t ON t.order_item_id = b.order_item_id
+        GROUP BY b.order_item_id
+    ), partial AS (
+        SELECT 1 FROM box_counts WHERE scanned_boxes < total_boxes
+    ), packed AS (
+        UPDATE item_boxes b
+        SET status = 'packed', packed_at = NOW()
+        WHERE b.barcode_value = ANY(%(barcodes)s)
+          AND b.order_item_id IN (SELECT order_item_id FROM target_items)
+          AND b.status IS DISTINCT FROM 'packed'
+          AND NOT EXISTS (SELECT 1 FROM partial)
+        RETURNING b.order_item_id
+    ), shipment AS (
+        INSERT INTO shipments (shipment_uid, job_ticket_number, marcom_sync_status, created_at)
+        SELECT %(shipment_uid)s, %(reference)s, 'PROCESSING', NOW()
+        WHERE NOT EXISTS (SELECT 1 FROM partial)
+        RETURNING id
+    ), shipment_lines AS (
+        -- Inserts nothing when an item is partial: `shipment` then returns no row to join (the 400 path)
+        INSERT INTO shipment_items (shipment_id, order_item_id)
+        SELECT s.id, t.order_item_id FROM shipment s CROSS JOIN target_items t
+    )
+    SELECT t.sku, t.quantity_ordered, t.cost_center, c.total_boxes, c.scanned_boxes,
+           (SELECT count(*) FROM packed p WHERE p.order_item_id = t.order_item_id) AS packed_boxes
+    FROM target_items t
+    JOIN box_counts c ON c.order_item_id = t.order_item_id
+    ORDER BY t.order_item_id
+"""
+
 def process_shipment_logic(orders, scanned_boxes, package_list_in):
-    conn = get_db_connection()
-    if not conn: raise Exception("DB Connection Failed")
-    
     try:
-        cur = get_real_dict_cursor(conn)
-        
-        # 1a. Partial Check
-        if scanned_boxes:
-            cur.execute("""
-                SELECT i.sku, count(b.id) as total_boxes,
-                       count(CASE WHEN b.barcode_value = ANY(%s) THEN 1 END) as current_scan_count
-                FROM item_boxes b
-                JOIN items i ON b.order_item_id = i.order_item_id
-                WHERE b.barcode_value = ANY(%s)
-                GROUP BY i.sku, i.order_item_id
-            """, (scanned_boxes, scanned_boxes))
-            
-            for row in cur.fetchall():
-                if row['current_scan_count'] != row['total_boxes']:
-                    conn.close()
-                    return {"error": f"Partial Line Item detected for SKU {row['sku']}. Scan all boxes."}, 400
+        reference = reference_cache.get() # Weight rules and cartons, cached across requests
+        rules = reference['box_weights']
+        cartons = reference['cartons']
+        for pkg_in in package_list_in: # Before anything is written
+            carton_id = pkg_in.get('id')
+            if carton_id != 'CUSTOM' and carton_id not in cartons:
+                return {"error": f"Unknown carton: {carton_id}"}, 400
 
-        # 1. Update Box Status
-        if scanned_boxes:
-            cur.execute("""
-                UPDATE item_boxes 
-                SET status = 'packed', packed_at = NOW()
-                WHERE barcode_value = ANY(%s)
-            """, (scanned_boxes,))
+        timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        rand_suffix = str(random.randint(1000, 9999))
+        shipment_uid = f"SHIP_{timestamp_str}_{rand_suffix}"
+        ref_order_number = orders[0]['order_number'] if orders else None
+
+        # 1. Partial check, box status and shipment row: one round-trip
+        with db_connection() as conn:
+            cur = get_real_dict_cursor(conn)
+            cur.execute(CLOSE_SHIPMENT_SQL, {
+                'barcodes': list(scanned_boxes), 'shipment_uid': shipment_uid, 'reference': ref_order_number})
+            items = cur.fetchall()
+            cur.close()
+
+            for row in items:
+                if row['scanned_boxes'] != row['total_boxes']:
+                    return {"error": f"Partial Line Item detected for SKU {row['sku']}. Scan all boxes."}, 400
+            for row in items:
+                if row['packed_boxes'] != row['scanned_boxes']:
+                    conn.rollback()
+                    return {"error": f"Boxes for SKU {row['sku']} are already packed (shipped from another station?)."}, 409
+            conn.commit()
 
         # 2. Calculate Weights (Simplified for now, similar to original)
-        cur.execute("SELECT category_name, quantity, box_weight FROM product_shipping_rules")
-        rules = {(r['category_name'], r['quantity']): r['box_weight'] for r in cur.fetchall()}
-        
-        cur.execute("SELECT code, weight, length, width, height FROM shipping_cartons")
-        cartons = {c['code']: c for c in cur.fetchall()}
-        
         total_shipment_product_weight = 0.0
         store_number = None
-        
-        if scanned_boxes:
-             cur.execute("""
-                SELECT i.quantity_ordered, i.cost_center 
-                FROM item_boxes b
-                JOIN items i ON b.order_item_id = i.order_item_id
-                WHERE b.barcode_value = ANY(%s)
-             """, (scanned_boxes,))
-             for row in cur.fetchall():
-                 q = row['quantity_ordered']
-                 cat = row['cost_center']
-                 w = rules.get((cat, q), 1.0)
-                 total_shipment_product_weight += w
-                 if not store_number and row['cost_center']:
-                     store_number = row['cost_center']
-
-        if not store_number and orders:
-             # Logic to fetch from orders logic if needed... or just use first order
-             pass # Kept simple for now
+        for row in items:
+            w = rules.get((row['cost_center'], row['quantity_ordered']), 1.0)
+            total_shipment_product_weight += w * row['scanned_boxes']
+            if not store_number and row['cost_center']:
+                store_number = row['cost_center']
 
         # 3. Pack Cartons
         final_packages = []
@@ -172,42 +200,23 @@ def process_shipment_logic(orders, scanned_boxes, package_list_in):
                 weight = float(pkg_in.get('weight', 0))
                 dims = {'L': pkg_in.get('L'), 'W': pkg_in.get('W'), 'H': pkg_in.get('H')}
             else:
-                carton_data = cartons.get(carton_id)
-                if not carton_data: return {"error": f"Unknown carton: {carton_id}"}, 400
+                carton_data = cartons[carton_id]
                 dims = {'L': carton_data['length'], 'W': carton_data['width'], 'H': carton_data['height']}
                 if 'weight' in pkg_in and pkg_in['weight']:
                      weight = float(pkg_in['weight'])
                 else:
                      weight = total_shipment_product_weight + carton_data['weight']
-            
+
             final_packages.append({"weight": round(weight, 1), **dims})
 
-        # 4. Generate Shipment
-        timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        rand_suffix = str(random.randint(1000, 9999))
-        shipment_uid = f"SHIP_{timestamp_str}_{rand_suffix}"
-        
-        ref_order_number = orders[0]['order_number'] if orders else None
-        
-        cur.execute("""
-            INSERT INTO shipments (shipment_uid, job_ticket_number, marcom_sync_status, created_at)
-            VALUES (%s, %s, 'PROCESSING', NOW())
-            RETURNING id
-        """, (shipment_uid, ref_order_number))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
-        
-        # 5. XML
+        # 4. XML (connection already back in the pool)
         xml_string = generate_worldship_xml({"orders": orders}, final_packages, store_number)
         filename = f"{shipment_uid}.xml"
         with open(os.path.join(XML_OUTPUT_FOLDER, filename), "w") as f:
             f.write(xml_string)
-            
+
         return {"success": True, "shipment_uid": shipment_uid}, 200
 
     except Exception as e:
         print(e)
-        if conn: conn.close()
         return {"error": str(e)}, 500
@@ -0,0 +1,213 @@
+
+import os
+import time
+import json
+import queue
+import shutil
+import argparse
+import threading
+import xml.etree.ElementTree as ET
+import psycopg2.extras
+from shared_lib.database import db_connection, DatabaseUnavailable
+from shared_lib.config import get_env_var
+from .shipment_service import XML_OUTPUT_FOLDER
+
+# Optional: file system events (inotify on Linux, FSEvents on macOS). Without it the folder is polled.
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+# WorldShip writes SHIP_<...>.out next to the .xml it imported. The watcher picks each burst of
+# them up within UPS_BATCH_WINDOW_SECS, stores every tracking number of the burst in one
+# transaction and archives the files to processed/. Files it cannot use yet (still being written,
+# shipment not found) stay put and are retried when they change, or on the next full rescan.
+UPS_BATCH_WINDOW_SECS = float(get_env_var("UPS_BATCH_WINDOW_SECS", "0.2"))  # Collect a burst this long after its first file
+UPS_POLL_SECS = float(get_env_var("UPS_POLL_SECS", "1"))                    # Polling fallback interval (no watchdog)
+UPS_RESCAN_SECS = float(get_env_var("UPS_RESCAN_SECS", "60"))               # Full rescan, retries skipped files
+
+UPDATE_TRACKING_SQL = """
+    UPDATE shipments s
+    SET tracking_number = u.tracking_number,
+        tracking_numbers = u.tracking_numbers,
+        marcom_sync_status = 'PENDING',
+        marcom_response_message = 'Ready for sync',
+        updated_at = NOW()
+    FROM (VALUES %s) AS u (shipment_uid, tracking_number, tracking_numbers)
+    WHERE s.shipment_uid = u.shipment_uid
+    RETURNING s.shipment_uid
+"""
+
+def is_out_file(path):
+    return os.path.splitext(path)[1].lower() == '.out' # WorldShip may write .Out
+
+def parse_out_file(filepath):
+    """Tracking numbers in a UPS .out file (any TrackingNumber element, namespace-agnostic, in order)."""
+    root = ET.parse(filepath).getroot()
+    tracking_numbers = []
+    for elem in root.iter():
+        if 'TrackingNumber' in elem.tag and elem.text:
+            tn = elem.text.strip()
+            if tn and tn not in tracking_numbers:
+                tracking_numbers.append(tn)
+    return tracking_numbers
+
+class UpsOutputProcessor:
+    def __init__(self, folder=XML_OUTPUT_FOLDER, processed_folder=None):
+        self.folder = folder
+        self.processed_folder = processed_folder or os.path.join(folder, 'processed')
+        os.makedirs(self.processed_folder, exist_ok=True)
+        self._skipped = {} # path -> (mtime, size) when last left in place
+        self.stats = {'batches': 0, 'updated': 0, 'skipped': 0}
+
+    def scan(self):
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.folder, n) for n in names if is_out_file(n)]
+
+    def _signature(self, path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _skip(self, path, signature, reason):
+        self._skipped[path] = signature
+        self.stats['skipped'] += 1
+        print(f"Skipping {os.path.basename(path)}: {reason}")
+
+    def forget_skipped(self):
+        self._skipped.clear()
+
+    def process(self, paths):
+        """Parses, stores and archives a batch of .out files. Returns the shipment UIDs updated."""
+        updates = {} # shipment_uid -> (path, signature, tracking numbers)
+        for path in sorted(set(paths)):
+            try:
+                signature = self._signature(path) # Before parsing: a write that lands meanwhile changes it
+                if self._skipped.get(path) == signature: continue # Unchanged since last skipped
+                tracking_numbers = parse_out_file(path)
+            except FileNotFoundError:
+                continue # Already archived (an earlier event for the same file)
+            except ET.ParseError as e:
+                self._skip(path, signature, f"not readable yet ({e})")
+                continue
+            except OSError as e: # Locked by WorldShip, no permission...: only this file waits
+                self._skip(path, None, f"cannot open ({e})") # Not memoized: retried as soon as it is seen again
+                continue
+            if not tracking_numbers:
+                self._skip(path, signature, "no tracking numbers")
+                continue
+            shipment_uid = os.path.splitext(os.path.basename(path))[0]
+            updates[shipment_uid] = (path, signature, tracking_numbers)
+        if not updates: return []
+
+        rows = [(uid, tns[0], json.dumps(tns)) for uid, (_, _, tns) in updates.items()]
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                found = {r[0] for r in psycopg2.extras.execute_values(cur, UPDATE_TRACKING_SQL, rows, fetch=True)}
+            conn.commit()
+        self.stats['batches'] += 1
+        self.stats['updated'] += len(found)
+
+        for shipment_uid, (path, signature, tracking_numbers) in updates.items():
+            if shipment_uid not in found:
+                self._skip(path, signature, f"shipment {shipment_uid} not found in DB")
+                continue
+            self._skipped.pop(path, None)
+            self._archive(path)
+            xml_path = os.path.join(self.folder, f"{shipment_uid}.xml")
+            if os.path.exists(xml_path): self._archive(xml_path)
+            print(f"Updated {shipment_uid}: {tracking_numbers}")
+        return sorted(found)
+
+    def _archive(self, path):
+        try:
+            shutil.move(path, os.path.join(self.processed_folder, os.path.basename(path)))
+        except OSError as e:
+            print(f"Could not archive {path}: {e}")
+
+class _QueueHandler:
+    """watchdog event handler: queues every .out path that appears or changes in `folder`."""
+    def __init__(self, folder, paths):
+        self.folder, self.paths = os.path.abspath(folder), paths
+
+    def dispatch(self, event):
+        if event.is_directory: return
+        path = getattr(event, 'dest_path', None) or event.src_path # Moves: the new name
+        if not is_out_file(path): return
+        if os.path.dirname(os.path.abspath(path)) != self.folder: return # Our own archive moves into processed/
+        self.paths.put(path)
+
+class UpsOutputWatcher:
+    def __init__(self, processor, use_events=True, batch_window=UPS_BATCH_WINDOW_SECS,
+                 poll_secs=UPS_POLL_SECS, rescan_secs=UPS_RESCAN_SECS, on_batch=None):
+        self.processor = processor
+        self.use_events = use_events and Observer is not None
+        self.batch_window, self.poll_secs, self.rescan_secs = batch_window, poll_secs, rescan_secs
+        self.on_batch = on_batch # Called with the updated UIDs after each batch
+        self._paths = queue.Queue()
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _next_batch(self, timeout):
+        """Paths of the next burst: waits for a first event, then collects for batch_window."""
+        try:
+            first = self._paths.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        time.sleep(self.batch_window)
+        batch = [first]
+        while True:
+            try: batch.append(self._paths.get_nowait())
+            except queue.Empty: return batch
+
+    def _run_batch(self, paths):
+        try:
+            updated = self.processor.process(paths)
+        except (DatabaseUnavailable, psycopg2.Error, OSError) as e:
+            print(f"Tracking update failed, files left for retry: {e}")
+            return
+        if updated and self.on_batch: self.on_batch(updated)
+
+    def run(self):
+        observer = None
+        if self.use_events:
+            observer = Observer()
+            observer.schedule(_QueueHandler(self.processor.folder, self._paths), self.processor.folder, recursive=False)
+            observer.start()
+        print(f"Watching {self.processor.folder} for UPS .out files "
+              f"({'file events' if observer else f'polling every {self.poll_secs}s'})")
+        try:
+            next_rescan = 0.0 # Files written while the watcher was down are picked up first
+            while not self._stop.is_set():
+                if time.monotonic() >= next_rescan:
+                    self.processor.forget_skipped()
+                    self._run_batch(self.processor.scan())
+                    next_rescan = time.monotonic() + self.rescan_secs
+                if observer:
+                    paths = self._next_batch(timeout=min(1.0, self.rescan_secs))
+                else:
+                    self._stop.wait(self.poll_secs)
+                    paths = self.processor.scan()
+                if paths: self._run_batch(paths)
+        finally:
+            if observer:
+                observer.stop()
+                observer.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="Store UPS WorldShip tracking numbers from .out files")
+    parser.add_argument("--folder", default=XML_OUTPUT_FOLDER, help="Folder WorldShip writes .out files to")
+    parser.add_argument("--poll", action="store_true", help="Poll the folder instead of using file events")
+    args = parser.parse_args()
+
+    if Observer is None and not args.poll:
+        print("Library 'watchdog' not found. Polling instead of file events.")
+    watcher = UpsOutputWatcher(UpsOutputProcessor(args.folder), use_events=not args.poll)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
@@ -43,9 +43,40 @@ function resetAll() {
 window.onload = function () {
     initBarcodes();
     initListeners();
+    initActivityFeed();
     if (orderInput) orderInput.focus();
 };
 
+// Live Marcom Sync feed: pushed by the server (SSE); EventSource reconnects and resumes by itself
+const feedItems = new Map(); // shipment id -> latest row, oldest first
+
+function initActivityFeed() {
+    if (!window.EventSource || !el('live-feed-list')) return;
+    const indicator = document.querySelector('.status-indicator');
+    const source = new EventSource('/api/activity/stream');
+    source.addEventListener('shipment', (e) => {
+        const s = JSON.parse(e.data);
+        const shown = feedItems.get(s.id);
+        if (shown && shown.seq >= s.seq) return; // Replayed, or older than the row shown
+        feedItems.delete(s.id);
+        feedItems.set(s.id, s);
+        while (feedItems.size > 50) feedItems.delete(feedItems.keys().next().value);
+        renderActivityFeed();
+    });
+    source.onopen = () => { indicator.textContent = '● Connected'; indicator.style.color = '#28a745'; };
+    source.onerror = () => { indicator.textContent = '● Reconnecting...'; indicator.style.color = '#dc3545'; };
+}
+
+function renderActivityFeed() {
+    const colors = { SUCCESS: '#28a745', FAILED: '#dc3545' };
+    el('live-feed-list').innerHTML = Array.from(feedItems.values()).reverse().map(i => `
+        <li style="border-left:4px solid ${colors[i.marcom_sync_status] || '#ffc107'}; padding:5px; margin-bottom:5px; background:white;">
+            <div><strong>${i.job_ticket_number || i.reference_id || ''}</strong> <small>${i.created_at || ''}</small></div>
+            <small>${i.marcom_sync_status}${i.tracking_number ? ' · ' + i.tracking_number : ''}</small>
+        </li>
+    `).join('');
+}
+
 function initBarcodes() {
     const cmds = [
         { id: "#bc-process", val: "CMD-PROCESS" },
@@ -0,0 +1,47 @@
+import os
+import sys
+
+# Production serving profile for the Shipping App (gunicorn; `python shipping_web_app/serve.py`).
+# Several worker processes, each with a pool of threads: a scan or a shipment close waits on
+# Postgres, so threads overlap those waits, and the processes spread the JSON/XML work over cores.
+# Every open station page holds one thread for its live feed stream (server-sent events), so
+# WEB_THREADS x WEB_WORKERS must stay well above the number of stations.
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(HERE))
+from shared_lib.config import get_env_var # Loads .env first: its values win over the defaults below
+
+bind = get_env_var("WEB_BIND", "0.0.0.0:5001")
+workers = int(get_env_var("WEB_WORKERS", str(min(4, os.cpu_count() or 1)))) # Processes: each has its own DB pool, caches and feed listener
+threads = int(get_env_var("WEB_THREADS", "32"))                                # Requests (and feed streams) in flight per process
+worker_class = "gthread"
+keepalive = 5
+graceful_timeout = 10 # Feed streams never finish on their own; browsers reconnect after a restart
+chdir = HERE          # xml_output/ is relative to the working directory, as with run.py
+wsgi_app = "run:app"
+# No preload_app: the DB pool and the feed listener thread must be created after the fork.
+
+# Per-worker connection pool. The processes share Postgres' max_connections with Stage 1b and
+# the watchers, so WEB_DB_CONNECTIONS is split between them (plus one feed listener each).
+# A request holds at most one connection and feed streams hold none, so a pool smaller than
+# WEB_THREADS is fine. WEB_DB_POOL_MAX sets the per-worker size outright; failing that, a
+# DB_POOL_MAX in .env or the environment is kept (it sizes every process's pool, not only these).
+WEB_DB_CONNECTIONS = int(get_env_var("WEB_DB_CONNECTIONS", "40"))
+if get_env_var("WEB_DB_POOL_MAX"):
+    os.environ["DB_POOL_MAX"] = get_env_var("WEB_DB_POOL_MAX")
+    pool_source = "WEB_DB_POOL_MAX"
+elif get_env_var("DB_POOL_MAX"):
+    pool_source = "DB_POOL_MAX"
+else:
+    os.environ["DB_POOL_MAX"] = str(max(2, min(threads, WEB_DB_CONNECTIONS // workers - 1)))
+    pool_source = f"WEB_DB_CONNECTIONS={WEB_DB_CONNECTIONS} split over {workers} workers"
+os.environ.setdefault("DB_POOL_MIN", "2")
+
+accesslog = get_env_var("WEB_ACCESS_LOG") # e.g. "-" for stdout; off by default
+
+def when_ready(server):
+    pool_max = int(os.environ['DB_POOL_MAX'])
+    server.log.info(f"Shipping App: {workers} workers x {threads} threads, "
+                    f"DB pool max {pool_max} per worker (from {pool_source})")
+    if workers * (pool_max + 1) > WEB_DB_CONNECTIONS:
+        server.log.warning(f"Up to {workers * (pool_max + 1)} DB connections (pools + feed listeners), "
+                           f"over WEB_DB_CONNECTIONS={WEB_DB_CONNECTIONS}")
@@ -0,0 +1,10 @@
+import sys
+import os
+
+# Add root to path to allow shared_lib import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shipping_web_app.app.services.marcom_sync_service import main
+
+if __name__ == '__main__':
+    main()
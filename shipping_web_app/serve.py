@@ -0,0 +1,16 @@
+import sys
+import os
+
+# Production server: gunicorn with gunicorn.conf.py. run.py stays the development server.
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+try:
+    from gunicorn.app.wsgiapp import run
+except ImportError:
+    run = None
+
+if __name__ == '__main__':
+    if run is None:
+        sys.exit("Library 'gunicorn' not found (pip install gunicorn). For development use run.py.")
+    sys.argv = [sys.argv[0], '-c', os.path.join(HERE, 'gunicorn.conf.py')] + sys.argv[1:] # Extra args override the config
+    run()